@@ -0,0 +1,13 @@
+"""
+ASGI config for buddybud project.
+Serves the async views (the live feedback stream) without holding a thread per open
+connection, e.g. uvicorn buddybud.asgi:application --workers 4
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'buddybud.settings')
+
+application = get_asgi_application()
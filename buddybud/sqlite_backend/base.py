@@ -0,0 +1,29 @@
+"""
+SQLite backend tuned for concurrent writers (web requests + AI workers)
+
+- journal_mode=WAL: readers no longer block the writer and vice versa
+- synchronous=NORMAL: safe with WAL, fsyncs at checkpoints instead of every commit
+- busy timeout (OPTIONS['timeout']): wait for the write lock instead of failing
+- BEGIN IMMEDIATE for atomic blocks: take the write lock when the transaction starts.
+  A deferred transaction that reads and then writes cannot wait for the lock and fails
+  with "database is locked" if another connection committed in between.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.journal_mode = params.pop('journal_mode', 'WAL')
+        self.synchronous = params.pop('synchronous', 'NORMAL')
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        if not self.is_in_memory_db():
+            conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
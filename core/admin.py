@@ -1,7 +1,9 @@
 from django.contrib import admin
 from .models import (
     Homework, HomeworkFile, Submission, InterviewSession,
-    QuestionFeedback, InterviewQuestion, StudyPlan
+    QuestionFeedback, InterviewQuestion, StudyPlan, AnalysisJob, HomeworkStats,
+    FeedbackPoint, StudyTopic, InterviewQuestionSet, ExtractedText,
+    MarkSchemeEntry
 )
 
 @admin.register(Homework)
@@ -12,9 +14,14 @@ class HomeworkAdmin(admin.ModelAdmin):
 
 @admin.register(HomeworkFile)
 class HomeworkFileAdmin(admin.ModelAdmin):
-    list_display = ['homework', 'file_type', 'file_name', 'uploaded_at']
+    list_display = ['homework', 'file_type', 'file_name', 'uploaded_at', 'indexed_at']
     list_filter = ['file_type']
 
+@admin.register(MarkSchemeEntry)
+class MarkSchemeEntryAdmin(admin.ModelAdmin):
+    list_display = ['homework', 'source', 'question_number']
+    list_filter = ['source', 'homework']
+
 @admin.register(Submission)
 class SubmissionAdmin(admin.ModelAdmin):
     list_display = ['student_name', 'homework', 'written_score', 'interview_score', 'overall_score', 'status', 'submitted_at']
@@ -29,7 +36,8 @@ class QuestionFeedbackAdmin(admin.ModelAdmin):
 
 @admin.register(InterviewSession)
 class InterviewSessionAdmin(admin.ModelAdmin):
-    list_display = ['submission', 'status', 'started_at', 'completed_at', 'duration_seconds']
+    list_display = ['submission', 'status', 'started_at', 'completed_at', 'duration_seconds',
+                    'audio_original_bytes', 'asr_bytes', 'audio_original_seconds', 'asr_seconds']
     list_filter = ['status']
     readonly_fields = ['started_at', 'completed_at']
 
@@ -42,3 +50,38 @@ class InterviewQuestionAdmin(admin.ModelAdmin):
 class StudyPlanAdmin(admin.ModelAdmin):
     list_display = ['submission', 'created_at']
     readonly_fields = ['created_at']
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ['submission', 'homework_file', 'kind', 'status', 'attempts', 'force_fresh', 'worker', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+@admin.register(HomeworkStats)
+class HomeworkStatsAdmin(admin.ModelAdmin):
+    list_display = ['homework', 'total_submissions', 'completed_submissions', 'average_score', 'updated_at']
+    readonly_fields = ['updated_at']
+
+@admin.register(FeedbackPoint)
+class FeedbackPointAdmin(admin.ModelAdmin):
+    list_display = ['submission', 'kind', 'question_number', 'text']
+    list_filter = ['kind', 'homework']
+    search_fields = ['text']
+
+@admin.register(StudyTopic)
+class StudyTopicAdmin(admin.ModelAdmin):
+    list_display = ['submission', 'kind', 'topic', 'priority', 'current_score']
+    list_filter = ['kind', 'homework']
+    search_fields = ['topic']
+
+@admin.register(InterviewQuestionSet)
+class InterviewQuestionSetAdmin(admin.ModelAdmin):
+    list_display = ['homework', 'weak_areas', 'uses', 'created_at', 'last_used_at']
+    list_filter = ['homework']
+    readonly_fields = ['created_at', 'last_used_at']
+
+@admin.register(ExtractedText)
+class ExtractedTextAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'extractor', 'pages', 'created_at']
+    list_filter = ['extractor']
+    readonly_fields = ['created_at']
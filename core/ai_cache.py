@@ -0,0 +1,178 @@
+"""
+Content-addressed cache for OpenAI chat completions
+Identical requests (model, messages, temperature, max_tokens, response_format)
+are answered from a bounded in-process LRU, backed by a SQLite file shared by
+all processes. Entries expire after a TTL and the oldest are evicted by size.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+
+def cache_key(model, messages, temperature, max_tokens, response_format):
+    """SHA-256 of the canonical JSON form of the request"""
+    payload = json.dumps(
+        {
+            'model': model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'response_format': response_format,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path, memory_entries=256, max_entries=10000, max_bytes=100 * 1024 * 1024, ttl_seconds=7 * 24 * 3600):
+        self.path = str(path)
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._memory = OrderedDict()  # key -> (stored_at, content)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " content TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+
+    def _connect(self):
+        """One SQLite connection per thread; WAL lets worker processes share the file"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _expired(self, stored_at):
+        return self.ttl_seconds and time.time() - stored_at > self.ttl_seconds
+
+    def get(self, key):
+        """Returns: cached response content, or None on a miss"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return entry[1]
+                del self._memory[key]
+
+        conn = self._connect()
+        row = conn.execute("SELECT content, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or self._expired(row[1]):
+            if row is not None:
+                with conn:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            with self._lock:
+                self.stats['misses'] += 1
+            return None
+
+        with conn:
+            conn.execute("UPDATE responses SET accessed_at = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+        with self._lock:
+            self._remember(key, row[1], row[0])
+            self.stats['disk_hits'] += 1
+        return row[0]
+
+    def set(self, key, content):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, size, created_at, accessed_at, hits)"
+                " VALUES (?, ?, ?, ?, ?, 0)",
+                (key, content, len(content.encode('utf-8')), now, now),
+            )
+        with self._lock:
+            self._remember(key, now, content)
+            self.stats['stores'] += 1
+        self._evict()
+
+    def _remember(self, key, stored_at, content):
+        self._memory[key] = (stored_at, content)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        """Drop expired rows, then least recently used rows beyond the entry/byte limits"""
+        conn = self._connect()
+        with conn:
+            evicted = 0
+            if self.ttl_seconds:
+                evicted += conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+                ).rowcount
+
+            count, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            if count > self.max_entries or total_bytes > self.max_bytes:
+                rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+                doomed = []
+                for key, size in rows:
+                    if count <= self.max_entries and total_bytes <= self.max_bytes:
+                        break
+                    doomed.append((key,))
+                    count -= 1
+                    total_bytes -= size
+                conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+                evicted += len(doomed)
+
+        if evicted:
+            with self._lock:
+                self.stats['evictions'] += evicted
+
+    def disk_stats(self):
+        """Returns: dict with entry count, total bytes and hits recorded in the SQLite tier"""
+        count, total_bytes, hits = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM responses"
+        ).fetchone()
+        return {'entries': count, 'bytes': total_bytes, 'hits': hits}
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide cache instance, or None when AI_CACHE_ENABLED is off"""
+    global _response_cache
+    if not settings.AI_CACHE_ENABLED:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                settings.AI_CACHE_PATH,
+                memory_entries=settings.AI_CACHE_MEMORY_ENTRIES,
+                max_entries=settings.AI_CACHE_MAX_ENTRIES,
+                max_bytes=settings.AI_CACHE_MAX_BYTES,
+                ttl_seconds=settings.AI_CACHE_TTL_SECONDS,
+            )
+    return _response_cache
@@ -2,10 +2,93 @@
 AI Service for generating feedback using OpenAI GPT-4
 NO FALLBACK DATA - Requires valid API key to function
 """
+import base64
 import os
 import json
-from openai import OpenAI
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.conf import settings
+from .ai_cache import cache_key, get_response_cache
+from .openai_client import call_openai, call_openai_stream, get_openai_client
+from .json_stream import ArrayItemParser
+from .tokens import count_tokens, split_by_tokens
+from .mark_scheme import guide_excerpt
+from .prompts import compile_prefix
+from .metrics import observe, span
+
+
+# Parts of the written-work response schema. The questions come first so that, streamed,
+# the first question's feedback arrives before the overall summary is generated.
+WRITTEN_SUMMARY_SCHEMA = """    "overall_score": <percentage 0-100>,
+    "overall_strengths": ["strength1", "strength2", ...],
+    "overall_improvements": ["improvement1", "improvement2", ...]"""
+WRITTEN_QUESTIONS_SCHEMA = """    "questions": [
+        {
+            "number": 1,
+            "title": "Question Topic",
+            "marks_awarded": <int>,
+            "marks_total": <int>,
+            "percentage": <int>,
+            "strengths": ["strength1", "strength2"],
+            "improvements": ["improvement1", "improvement2"]
+        },
+        ...
+    ]"""
+
+
+# Same for every student, so the whole instruction block is a cacheable prefix
+STUDY_PLAN_INSIGHTS_PREFIX = """You are creating a personalized study plan.
+Write the insights section of the study plan from the student's performance data.
+
+Generate JSON:
+{
+    "written_vs_verbal_analysis": "Analysis comparing written vs interview performance",
+    "learning_style_insights": "Insights about how the student learns best"
+}
+
+Keep each field to 2-3 specific, actionable sentences."""
+
+
+# Rough prompt cost of one high-detail image (85 tokens + 170 per 512px tile)
+IMAGE_TOKEN_ESTIMATE = 1100
+
+
+def _message_tokens(message, model):
+    content = message['content']
+    if isinstance(content, str):
+        return count_tokens(content, model)
+    return sum(
+        count_tokens(part['text'], model) if part['type'] == 'text' else IMAGE_TOKEN_ESTIMATE
+        for part in content
+    )
+
+
+def _cached_prompt_tokens(usage):
+    """Prompt tokens the provider read from its prompt cache (0 if it doesn't report them)"""
+    details = getattr(usage, 'prompt_tokens_details', None)
+    return getattr(details, 'cached_tokens', None) or 0
+
+
+def _usage_attributes(usage):
+    """Token counts of a response, as span attributes"""
+    return {
+        'prompt_tokens': usage.prompt_tokens,
+        'completion_tokens': usage.completion_tokens,
+        'cached_prompt_tokens': _cached_prompt_tokens(usage),
+    }
+
+
+def _merge_points(lists, limit=6):
+    """Union of feedback point lists, first occurrence wins, case-insensitive"""
+    merged, seen = [], set()
+    for points in lists:
+        for point in points or []:
+            key = str(point).strip().lower()
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(point)
+    return merged[:limit]
 
 
 class AIFeedbackService:
@@ -23,18 +106,251 @@ class AIFeedbackService:
                 "Get key from: https://platform.openai.com/api-keys"
             )
         
-        self.client = OpenAI(api_key=api_key)
+        self.client = get_openai_client()
         self.model = settings.OPENAI_MODEL
         self.max_tokens = settings.OPENAI_MAX_TOKENS
+        self.cache = get_response_cache()
+        # Token usage per method: {method: {'calls', 'cached', 'prompt_tokens', 'cached_prompt_tokens', 'completion_tokens'}}
+        # ('cached' counts responses from the local cache, 'cached_prompt_tokens' the prompt tokens
+        # the provider served from its prefix cache)
+        self.token_usage = {}
+        self._usage_lock = threading.Lock()
         print(f"[OK] AI Service initialized with model: {self.model}")
     
-    def analyze_written_work(self, homework_data, answer_text, answer_file_path=None):
+    def _record_usage(self, method, usage=None):
+        with self._usage_lock:
+            totals = self.token_usage.setdefault(
+                method, {'calls': 0, 'cached': 0, 'prompt_tokens': 0, 'cached_prompt_tokens': 0, 'completion_tokens': 0}
+            )
+            totals['calls'] += 1
+            if usage is None:
+                totals['cached'] += 1
+                return
+            cached_prompt_tokens = _cached_prompt_tokens(usage)
+            totals['prompt_tokens'] += usage.prompt_tokens
+            totals['cached_prompt_tokens'] += cached_prompt_tokens
+            totals['completion_tokens'] += usage.completion_tokens
+        print(
+            f"[TOKENS] {method}: {usage.prompt_tokens} prompt ({cached_prompt_tokens} cached) "
+            f"+ {usage.completion_tokens} completion"
+        )
+    
+    def usage_report(self):
+        """Copy of the per-method token totals since the service was created"""
+        with self._usage_lock:
+            return {method: dict(totals) for method, totals in self.token_usage.items()}
+    
+    def _map_chunks(self, fn, chunks):
+        """Run fn(index, chunk) for every chunk concurrently. Returns: results in chunk order"""
+        with ThreadPoolExecutor(max_workers=max(1, min(settings.AI_CHUNK_CONCURRENCY, len(chunks)))) as executor:
+            return list(executor.map(fn, range(len(chunks)), chunks))
+    
+    def _chat_json(self, method, messages, temperature, max_tokens, use_cache=True):
+        """
+        Run a JSON-mode chat completion through the response cache
+        use_cache=False skips the lookup (forces a fresh call) but still stores the new response
+        Returns: parsed JSON dict
+        """
+        request = self._json_request(messages, temperature, max_tokens)
+        
+        cache = self.cache if method in settings.AI_CACHE_METHODS else None
+        key = cache_key(**request) if cache else None
+        
+        with span(method) as timing:
+            if cache and use_cache:
+                content = cache.get(key)
+                if content is not None:
+                    print(f"[CACHE] {method} served from cache ({key[:12]})")
+                    self._record_usage(method)
+                    timing.outcome = 'cached'
+                    return json.loads(content)
+            
+            response = self._create(request)
+            content = response.choices[0].message.content
+            if response.usage is not None:
+                self._record_usage(method, response.usage)
+                timing.set(**_usage_attributes(response.usage))
+        
+        if cache:
+            cache.set(key, content)
+        return json.loads(content)
+    
+    def _estimated_tokens(self, request):
+        # Prompt plus the whole output allowance, as the provider counts it against the limit
+        return request['max_tokens'] + sum(
+            _message_tokens(message, self.model) for message in request['messages']
+        )
+    
+    def _create(self, request):
+        """Chat completion through the shared rate limiter (with retries on 429/5xx/timeouts)"""
+        def used(response):
+            if response.usage is None:
+                return None
+            return response.usage.prompt_tokens + response.usage.completion_tokens
+        
+        return call_openai(lambda: self.client.chat.completions.create(**request), self._estimated_tokens(request), used)
+    
+    def _create_stream(self, request, consume):
+        """
+        Streamed chat completion through the shared rate limiter, read by consume(stream)
+        The slot is held until the stream is read; a failure mid-stream restarts it
+        Returns: (result of consume, usage or None)
+        """
+        def read(stream):
+            result, usage = consume(stream)
+            return (result, usage), (usage.prompt_tokens + usage.completion_tokens if usage else None)
+        
+        return call_openai_stream(
+            lambda: self.client.chat.completions.create(**request, stream=True, stream_options={"include_usage": True}),
+            self._estimated_tokens(request),
+            read,
+        )
+    
+    def _json_request(self, messages, temperature, max_tokens):
+        return {
+            'model': self.model,
+            'messages': messages,
+            'temperature': temperature,
+            'max_tokens': max_tokens,
+            'response_format': {"type": "json_object"},
+        }
+    
+    def _chat_json_stream(self, method, messages, temperature, max_tokens, array_key, on_item, use_cache=True):
+        """
+        Like _chat_json, but streams the response and calls on_item(item) for each element
+        of the array_key array as soon as it is complete. A cached response replays its items,
+        and a stream that fails midway is retried from the start, so on_item must be idempotent.
+        Returns: parsed JSON dict
+        """
+        request = self._json_request(messages, temperature, max_tokens)
+        
+        cache = self.cache if method in settings.AI_CACHE_METHODS else None
+        key = cache_key(**request) if cache else None
+        
+        if cache and use_cache:
+            content = cache.get(key)
+            if content is not None:
+                print(f"[CACHE] {method} served from cache ({key[:12]})")
+                self._record_usage(method)
+                result = json.loads(content)
+                for item in result.get(array_key, []):
+                    on_item(item)
+                return result
+        
+        with span(method, streamed=True) as timing:
+            started = time.perf_counter()
+            
+            def consume(stream):
+                # A retried stream starts over: items seen before are delivered again (on_item must be idempotent)
+                parser = ArrayItemParser(array_key)
+                usage = None
+                for chunk in stream:
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    for item in parser.feed(chunk.choices[0].delta.content):
+                        if 'first_item_ms' not in timing.attributes:
+                            # What the student waits for before the first question appears
+                            waited = time.perf_counter() - started
+                            timing.set(first_item_ms=round(waited * 1000))
+                            observe(f"{method}.first_item", waited)
+                        on_item(item)
+                return parser, usage
+            
+            parser, usage = self._create_stream(request, consume)
+            if usage is not None:
+                self._record_usage(method, usage)
+                timing.set(**_usage_attributes(usage))
+        content = parser.text
+        
+        if cache:
+            cache.set(key, content)
+        return json.loads(content)
+    
+    def analyze_written_work(self, homework_data, answer_text, answer_file_path=None, use_cache=True):
         """
         Analyze student's written homework submission
+        Answers longer than AI_ANSWER_TOKEN_BUDGET are split into token-bounded parts that are
+        graded concurrently and merged into one result (same schema)
         Returns: dict with overall_score, strengths, improvements, question_feedback
         RAISES: Exception if AI call fails
         """
-        prompt = f"""You are an expert teacher analyzing a student's homework submission.
+        chunks = split_by_tokens(answer_text, settings.AI_ANSWER_TOKEN_BUDGET, self.model)
+        if len(chunks) == 1:
+            result = self._grade_written(homework_data, answer_text, use_cache=use_cache)
+        else:
+            print(f"[OK] Answer is {count_tokens(answer_text, self.model)} tokens, grading in {len(chunks)} parts")
+            parts = self._map_chunks(
+                lambda index, chunk: self._grade_written(
+                    homework_data, chunk, part=(index + 1, len(chunks)), use_cache=use_cache
+                ),
+                chunks,
+            )
+            result = self._reduce_written(homework_data, parts)
+        print(f"[OK] AI analyzed written work: {result['overall_score']}% score")
+        return result
+    
+    def analyze_written_work_stream(self, homework_data, answer_text, on_question, use_cache=True):
+        """
+        analyze_written_work with the response streamed: on_question(question) is called as soon as
+        each question's feedback is complete, before the rest of the response has been generated
+        Answers over AI_ANSWER_TOKEN_BUDGET are graded in parts (not streamed); their questions
+        are reported once the parts are merged
+        Returns: same dict as analyze_written_work
+        RAISES: Exception if AI call fails
+        """
+        if len(split_by_tokens(answer_text, settings.AI_ANSWER_TOKEN_BUDGET, self.model)) > 1:
+            result = self.analyze_written_work(homework_data, answer_text, use_cache=use_cache)
+            for question in result.get('questions', []):
+                on_question(question)
+            return result
+        
+        result = self._grade_written(homework_data, answer_text, on_question=on_question, use_cache=use_cache)
+        print(f"[OK] AI analyzed written work (streamed): {result['overall_score']}% score")
+        return result
+    
+    def _grade_written(self, homework_data, answer_text, part=None, on_question=None, use_cache=True):
+        """
+        One grading request for the whole answer, or for part=(n, total) of it
+        With on_question the response is streamed (questions first) and on_question(question)
+        is called as soon as each question's feedback is complete
+        """
+        if part:
+            prompt = f"""STUDENT'S ANSWER (part {part[0]} of {part[1]} - the rest is graded separately):
+{answer_text}
+
+Only include entries for the questions answered in this part; omit the others."""
+        else:
+            prompt = f"""STUDENT'S ANSWER:
+{answer_text}
+
+Generate exactly {homework_data['num_questions']} question entries."""
+        
+        messages = [
+            {"role": "system", "content": compile_prefix('analyze_written_work', homework_data, self._written_prefix)},
+            {"role": "user", "content": prompt}
+        ]
+        if on_question:
+            return self._chat_json_stream(
+                'analyze_written_work', messages, temperature=0.7, max_tokens=self.max_tokens,
+                array_key='questions', on_item=on_question, use_cache=use_cache
+            )
+        return self._chat_json(
+            'analyze_written_work',
+            messages=messages,
+            temperature=0.7,
+            max_tokens=self.max_tokens,
+            use_cache=use_cache
+        )
+    
+    def _written_prefix(self, homework_data):
+        """
+        Part of the grading prompt shared by every student of the homework
+        The questions come before the summary in the schema so they can be streamed
+        """
+        return f"""You are an expert educational assessor who provides detailed, constructive feedback.
+You are analyzing students' submissions for this homework.
 
 HOMEWORK DETAILS:
 - Subject: {homework_data['subject']}
@@ -42,25 +358,162 @@ HOMEWORK DETAILS:
 - Title: {homework_data['title']}
 - Total Marks: {homework_data['total_marks']}
 - Number of Questions: {homework_data['num_questions']}
+{self._marking_guide_section(homework_data)}
+TASK:
+For the student's answer you receive, provide detailed feedback in JSON format with:
+{{
+{WRITTEN_QUESTIONS_SCHEMA},
+{WRITTEN_SUMMARY_SCHEMA}
+}}
+
+IMPORTANT:
+- Identify SPECIFIC MISCONCEPTIONS if present (e.g., "Student thinks force equals velocity, not acceleration")
+- Be CONSTRUCTIVE but HONEST about errors and misunderstandings
+- Provide ACTIONABLE feedback, not generic praise"""
+    
+    def _marking_guide_section(self, homework_data):
+        """
+        The teacher's question paper / mark scheme, sized by AI_MARK_SCHEME_TOKEN_BUDGET and
+        AI_MARK_SCHEME_ENTRY_TOKENS (see mark_scheme.guide_excerpt)
+        Returns: prompt section ('' when the teacher uploaded neither)
+        """
+        excerpt = guide_excerpt(
+            homework_data.get('marking_guide'), settings.AI_MARK_SCHEME_TOKEN_BUDGET,
+            settings.AI_MARK_SCHEME_ENTRY_TOKENS, self.model,
+        )
+        if not excerpt:
+            return ''
+        return f"""
+MARKING GUIDE (from the teacher - award marks according to it):
+{excerpt}
+"""
+    
+    def _reduce_written(self, homework_data, parts):
+        """
+        Merge per-part grading results into one analyze_written_work result
+        A question answered across parts keeps its best marks and the feedback of every part.
+        """
+        questions = {}
+        for part in parts:
+            for question in part.get('questions', []):
+                number = question.get('number')
+                if number not in questions:
+                    questions[number] = dict(question)
+                    continue
+                merged = questions[number]
+                if question.get('marks_awarded', 0) > merged.get('marks_awarded', 0):
+                    merged.update(marks_awarded=question['marks_awarded'], percentage=question.get('percentage', 0))
+                merged['strengths'] = _merge_points([merged.get('strengths'), question.get('strengths')], limit=4)
+                merged['improvements'] = _merge_points([merged.get('improvements'), question.get('improvements')], limit=4)
+        
+        ordered = [questions[number] for number in sorted(questions, key=lambda n: (n is None, n or 0))]
+        marks_total = sum(q.get('marks_total', 0) for q in ordered)
+        if len(ordered) < homework_data['num_questions']:
+            # Questions not answered in any part score zero
+            marks_total = max(marks_total, homework_data['total_marks'])
+        if marks_total:
+            overall_score = round(100 * sum(q.get('marks_awarded', 0) for q in ordered) / marks_total)
+        else:
+            overall_score = round(sum(part.get('overall_score', 0) for part in parts) / len(parts))
+        
+        return {
+            'overall_score': overall_score,
+            'overall_strengths': _merge_points(part.get('overall_strengths') for part in parts),
+            'overall_improvements': _merge_points(part.get('overall_improvements') for part in parts),
+            'questions': ordered[:homework_data['num_questions']],
+        }
+    
+    def _pack_batches(self, homework_data, submissions):
+        """
+        Group submissions so each request stays within the input and output token budgets
+        Answers over AI_ANSWER_TOKEN_BUDGET go alone (analyze_written_work grades them in parts)
+        """
+        output_per_submission = 150 + 120 * homework_data['num_questions']
+        max_per_request = max(1, min(
+            settings.AI_BATCH_MAX_SUBMISSIONS,
+            settings.AI_BATCH_OUTPUT_TOKENS // output_per_submission,
+        ))
+        
+        batches = []
+        current, current_tokens = [], 0
+        for sub in submissions:
+            tokens = count_tokens(sub['answer_text'], self.model) + 20
+            if tokens > settings.AI_ANSWER_TOKEN_BUDGET:
+                batches.append([sub])
+                continue
+            if current and (len(current) >= max_per_request or current_tokens + tokens > settings.AI_BATCH_INPUT_TOKENS):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(sub)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches, output_per_submission
+    
+    def _analyze_packed(self, homework_data, batch, output_per_submission, use_cache=True):
+        """One request grading several answers to the same homework"""
+        answers = "\n\n".join(
+            f"=== SUBMISSION {sub['id']} ===\n{sub['answer_text']}" for sub in batch
+        )
+        
+        prompt = f"""STUDENT ANSWERS:
+{answers}
+
+Return exactly {len(batch)} results."""
 
-STUDENT'S ANSWER:
-{answer_text[:2000]}
+        result = self._chat_json(
+            'analyze_written_work_batch',
+            messages=[
+                {"role": "system", "content": compile_prefix('analyze_written_work_batch', homework_data, self._packed_prefix)},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=output_per_submission * len(batch),
+            use_cache=use_cache
+        )
+        
+        feedbacks = {}
+        for item in result.get('results', []):
+            try:
+                feedbacks[int(item['submission_id'])] = item
+            except (KeyError, TypeError, ValueError):
+                continue
+        return feedbacks
+    
+    def _packed_prefix(self, homework_data):
+        """Part of the packed grading prompt shared by every batch of the homework"""
+        return f"""You are an expert educational assessor who provides detailed, constructive feedback.
+You are analyzing several students' submissions for the same homework.
+Grade each submission independently.
 
+HOMEWORK DETAILS:
+- Subject: {homework_data['subject']}
+- Level: {homework_data['level']}
+- Title: {homework_data['title']}
+- Total Marks: {homework_data['total_marks']}
+- Number of Questions: {homework_data['num_questions']}
+{self._marking_guide_section(homework_data)}
 TASK:
-Provide detailed feedback in JSON format with:
+Provide detailed feedback in JSON format with one result per submission:
 {{
-    "overall_score": <percentage 0-100>,
-    "overall_strengths": ["strength1", "strength2", ...],
-    "overall_improvements": ["improvement1", "improvement2", ...],
-    "questions": [
+    "results": [
         {{
-            "number": 1,
-            "title": "Question Topic",
-            "marks_awarded": <int>,
-            "marks_total": <int>,
-            "percentage": <int>,
-            "strengths": ["strength1", "strength2"],
-            "improvements": ["improvement1", "improvement2"]
+            "submission_id": <id from the SUBMISSION header>,
+            "overall_score": <percentage 0-100>,
+            "overall_strengths": ["strength1", "strength2", ...],
+            "overall_improvements": ["improvement1", "improvement2", ...],
+            "questions": [
+                {{
+                    "number": 1,
+                    "title": "Question Topic",
+                    "marks_awarded": <int>,
+                    "marks_total": <int>,
+                    "percentage": <int>,
+                    "strengths": ["strength1", "strength2"],
+                    "improvements": ["improvement1", "improvement2"]
+                }},
+                ...
+            ]
         }},
         ...
     ]
@@ -70,24 +523,80 @@ IMPORTANT:
 - Identify SPECIFIC MISCONCEPTIONS if present (e.g., "Student thinks force equals velocity, not acceleration")
 - Be CONSTRUCTIVE but HONEST about errors and misunderstandings
 - Provide ACTIONABLE feedback, not generic praise
-- Generate exactly {homework_data['num_questions']} question entries."""
-
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": "You are an expert educational assessor who provides detailed, constructive feedback."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.7,
-            max_tokens=self.max_tokens
-        )
+- Generate exactly {homework_data['num_questions']} question entries per submission."""
+    
+    def analyze_written_work_batch(self, homework_data, submissions, concurrency=4, use_cache=True):
+        """
+        Analyze many submissions for the same homework
+        Several answers are packed per request where token budgets allow; requests run concurrently.
+        Answers missing from a packed response are re-graded one by one with analyze_written_work.
         
-        result = json.loads(response.choices[0].message.content)
-        print(f"[OK] AI analyzed written work: {result['overall_score']}% score")
-        return result
+        Args:
+            homework_data: Homework context (same dict as analyze_written_work)
+            submissions: list of {'id': <submission id>, 'answer_text': <str>}
+            concurrency: number of requests in flight
+        
+        Returns: (feedbacks, errors) - dicts keyed by submission id
+        """
+        batches, output_per_submission = self._pack_batches(homework_data, submissions)
+        print(f"[OK] Grading {len(submissions)} submissions in {len(batches)} request(s), concurrency {concurrency}")
+        
+        feedbacks, errors = {}, {}
+        
+        def grade(batch):
+            if len(batch) == 1:
+                return {batch[0]['id']: self.analyze_written_work(homework_data, batch[0]['answer_text'], use_cache=use_cache)}
+            graded = self._analyze_packed(homework_data, batch, output_per_submission, use_cache=use_cache)
+            for sub in batch:
+                if sub['id'] not in graded:
+                    print(f"[WARNING] Submission {sub['id']} missing from batch response, grading on its own")
+                    graded[sub['id']] = self.analyze_written_work(homework_data, sub['answer_text'], use_cache=use_cache)
+            return graded
+        
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            futures = {executor.submit(grade, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                try:
+                    feedbacks.update(future.result())
+                except Exception as e:
+                    print(f"[ERROR] Batch grading request failed: {e}")
+                    for sub in futures[future]:
+                        errors[sub['id']] = str(e)
+        
+        return feedbacks, errors
+    
+    def transcribe_answer_image(self, image_bytes, mime_type='image/jpeg'):
+        """
+        Read a photographed or scanned page of a student's answers
+        Returns: the page's text as written ('' for a blank page)
+        RAISES: Exception if AI call fails
+        """
+        image_url = f"data:{mime_type};base64,{base64.b64encode(image_bytes).decode('ascii')}"
+        request = {
+            'model': self.model,
+            'messages': [
+                {"role": "system", "content": "You transcribe students' handwritten or printed homework answers."},
+                {"role": "user", "content": [
+                    {
+                        "type": "text",
+                        "text": "Transcribe all of the student's work on this page exactly as written: question "
+                                "numbers, working and final answers. Write equations in plain text. "
+                                "Do not correct mistakes. Output only the transcription.",
+                    },
+                    {"type": "image_url", "image_url": {"url": image_url, "detail": "high"}},
+                ]},
+            ],
+            'temperature': 0,
+            'max_tokens': self.max_tokens,
+        }
+        with span('transcribe_answer_image', bytes=len(image_bytes)) as timing:
+            response = self._create(request)
+            if response.usage is not None:
+                self._record_usage('transcribe_answer_image', response.usage)
+                timing.set(**_usage_attributes(response.usage))
+        return (response.choices[0].message.content or '').strip()
     
-    def generate_interview_questions(self, homework_data, written_feedback):
+    def generate_interview_questions(self, homework_data, written_feedback, use_cache=True):
         """
         Generate personalized interview questions based on written work analysis
         Returns: list of question dicts
@@ -95,12 +604,30 @@ IMPORTANT:
         """
         weak_areas = written_feedback.get('overall_improvements', [])[:3]
         
-        prompt = f"""Generate 5 interview questions to assess a student's understanding.
+        prompt = f"""Areas needing improvement: {', '.join(weak_areas) if weak_areas else 'General understanding'}"""
+
+        result = self._chat_json(
+            'generate_interview_questions',
+            messages=[
+                {"role": "system", "content": compile_prefix('generate_interview_questions', homework_data, self._interview_questions_prefix)},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.8,
+            max_tokens=min(1000, self.max_tokens),
+            use_cache=use_cache
+        )
+        questions = result.get('questions', [])
+        print(f"[OK] AI generated {len(questions)} interview questions")
+        return questions
+    
+    def _interview_questions_prefix(self, homework_data):
+        """Part of the interview question prompt shared by every student of the homework"""
+        return f"""You are an expert teacher creating assessment questions.
+Generate 5 interview questions to assess a student's understanding.
 
 CONTEXT:
 - Subject: {homework_data['subject']}
 - Level: {homework_data['level']}
-- Areas needing improvement: {', '.join(weak_areas) if weak_areas else 'General understanding'}
 
 GENERATE 5 QUESTIONS:
 1. Process question (explain their approach)
@@ -123,27 +650,13 @@ Return JSON:
     ]
 }}
 
-Make questions specific to the weak areas identified."""
-
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": "You are an expert teacher creating assessment questions."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.8,
-            max_tokens=min(1000, self.max_tokens)
-        )
-        
-        result = json.loads(response.choices[0].message.content)
-        questions = result.get('questions', [])
-        print(f"[OK] AI generated {len(questions)} interview questions")
-        return questions
+Make questions specific to the areas needing improvement the student's message lists."""
     
-    def analyze_interview_performance(self, homework_data, written_score, interview_duration, transcription=None):
+    def analyze_interview_performance(self, homework_data, written_score, interview_duration, transcription=None, use_cache=True):
         """
         Analyze interview performance using ACTUAL TRANSCRIPTION
+        Transcripts longer than AI_TRANSCRIPT_TOKEN_BUDGET are analyzed in parts concurrently
+        and merged (scores weighted by the length of each part)
         
         Args:
             homework_data: Homework context
@@ -157,17 +670,65 @@ Make questions specific to the weak areas identified."""
         if not transcription:
             raise ValueError("Interview transcription is required for analysis")
         
-        prompt = f"""You are an expert educational assessor analyzing a student's VERBAL INTERVIEW responses.
+        chunks = split_by_tokens(transcription, settings.AI_TRANSCRIPT_TOKEN_BUDGET, self.model)
+        if len(chunks) == 1:
+            result = self._analyze_interview_part(
+                homework_data, written_score, interview_duration, transcription, use_cache=use_cache
+            )
+        else:
+            print(f"[OK] Transcript is {count_tokens(transcription, self.model)} tokens, analyzing in {len(chunks)} parts")
+            parts = self._map_chunks(
+                lambda index, chunk: self._analyze_interview_part(
+                    homework_data, written_score, interview_duration, chunk,
+                    part=(index + 1, len(chunks)), use_cache=use_cache
+                ),
+                chunks,
+            )
+            result = self._reduce_interview(parts, [count_tokens(chunk, self.model) for chunk in chunks])
+        print(f"[OK] AI analyzed interview: {result.get('interview_score')}% score")
+        
+        # Log any misconceptions detected
+        if result.get('misconceptions'):
+            print(f"[WARNING] Misconceptions detected: {len(result['misconceptions'])}")
+            for misc in result['misconceptions'][:3]:
+                print(f"   - {misc}")
+        
+        return result
+    
+    def _analyze_interview_part(self, homework_data, written_score, interview_duration, transcription, part=None, use_cache=True):
+        """One analysis request for the whole transcript, or for part=(n, total) of it"""
+        if part:
+            heading = f"STUDENT'S VERBAL RESPONSES (part {part[0]} of {part[1]} of the interview - the rest is analyzed separately):"
+        else:
+            heading = "STUDENT'S VERBAL RESPONSES (from interview):"
+        
+        prompt = f"""WRITTEN SCORE: {written_score}%
+
+INTERVIEW DURATION: {interview_duration} seconds
+
+{heading}
+{transcription}"""
+
+        return self._chat_json(
+            'analyze_interview_performance',
+            messages=[
+                {"role": "system", "content": compile_prefix('analyze_interview_performance', homework_data, self._interview_prefix)},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7,
+            max_tokens=min(500, self.max_tokens),
+            use_cache=use_cache
+        )
+    
+    def _interview_prefix(self, homework_data):
+        """Part of the interview analysis prompt shared by every student of the homework"""
+        return f"""You are an expert educational assessor analyzing a student's VERBAL INTERVIEW responses.
 
 HOMEWORK CONTEXT:
 - Subject: {homework_data['subject']}
 - Level: {homework_data['level']}
-- Written Score: {written_score}%
 
-STUDENT'S VERBAL RESPONSES (from interview):
-{transcription[:3000]}
-
-INTERVIEW DURATION: {interview_duration} seconds
+The student's message gives their written score, the interview duration and their verbal responses.
 
 TASK:
 Analyze the student's verbal understanding and identify:
@@ -189,74 +750,61 @@ Provide JSON:
 }}
 
 Be SPECIFIC - reference actual things the student said. Identify REAL misconceptions, not generic feedback."""
-
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": "You are analyzing a student's interview performance."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.7,
-            max_tokens=min(500, self.max_tokens)
-        )
+    
+    def _reduce_interview(self, parts, weights):
+        """Merge per-part interview analyses: length-weighted scores, merged point lists"""
+        total_weight = sum(weights) or 1
         
-        result = json.loads(response.choices[0].message.content)
-        print(f"[OK] AI analyzed interview: {result.get('interview_score')}% score")
+        def weighted(field):
+            return round(sum(part.get(field, 0) * weight for part, weight in zip(parts, weights)) / total_weight)
         
-        # Log any misconceptions detected
-        if result.get('misconceptions'):
-            print(f"[WARNING] Misconceptions detected: {len(result['misconceptions'])}")
-            for misc in result['misconceptions'][:3]:
-                print(f"   - {misc}")
-        
-        return result
+        return {
+            'interview_score': weighted('interview_score'),
+            'problem_solving_score': weighted('problem_solving_score'),
+            'conceptual_understanding_score': weighted('conceptual_understanding_score'),
+            'creative_application_score': weighted('creative_application_score'),
+            'misconceptions': _merge_points(part.get('misconceptions') for part in parts),
+            'strong_moments': _merge_points(part.get('strong_moments') for part in parts),
+            'development_areas': _merge_points(part.get('development_areas') for part in parts),
+            'overall_analysis': ' '.join(part['overall_analysis'] for part in parts if part.get('overall_analysis')),
+        }
     
-    def generate_study_plan(self, submission_data, question_feedbacks, interview_analysis):
+    def generate_study_plan_insights(self, submission_data, study_plan_topics, interview_analysis, use_cache=True):
         """
-        Generate personalized study plan
-        Returns: dict with priority topics, strengths, insights
+        Narrative part of the study plan (the topics are computed locally, see core/study_plans.py)
+        Returns: dict with written_vs_verbal_analysis, learning_style_insights
         RAISES: Exception if AI call fails
         """
-        weak_questions = [q for q in question_feedbacks if q['percentage'] < 70]
-        strong_questions = [q for q in question_feedbacks if q['percentage'] >= 80]
+        weak_areas = [topic['topic'] for topic in study_plan_topics['priority_topics']]
+        strong_areas = study_plan_topics['strength_topics']
         
-        prompt = f"""Generate a personalized study plan for a student.
-
-PERFORMANCE DATA:
+        # Interview score is None when the plan is built before the interview is analyzed
+        if submission_data.get('interview_score') is None:
+            interview_score = "Not yet available (base the insights on the written work)"
+        else:
+            interview_score = f"{submission_data['interview_score']}%"
+        
+        prompt = f"""PERFORMANCE DATA:
 - Written Score: {submission_data['written_score']}%
-- Interview Score: {submission_data['interview_score']}%
-- Weak Areas: {', '.join([q['title'] for q in weak_questions])}
-- Strong Areas: {', '.join([q['title'] for q in strong_questions])}
+- Interview Score: {interview_score}
+- Weak Areas: {', '.join(weak_areas)}
+- Strong Areas: {', '.join(strong_areas)}"""
 
-Generate JSON:
-{{
-    "priority_topics": [
-        {{
-            "topic": "Topic Name",
-            "priority": "high|medium",
-            "current_score": <percentage>,
-            "actions": ["action1", "action2", "action3"]
-        }}
-    ],
-    "strength_topics": ["topic1", "topic2"],
-    "written_vs_verbal_analysis": "Analysis comparing written vs interview performance",
-    "learning_style_insights": "Insights about how the student learns best"
-}}
-
-Provide actionable, specific recommendations."""
+        # Empty until the interview is analyzed
+        if interview_analysis:
+            prompt += f"""
+- Interview Problem Solving: {interview_analysis['problem_solving_score']}%
+- Interview Conceptual Understanding: {interview_analysis['conceptual_understanding_score']}%"""
 
-        response = self.client.chat.completions.create(
-            model=self.model,
+        result = self._chat_json(
+            'generate_study_plan_insights',
             messages=[
-                {"role": "system", "content": "You are creating a personalized study plan."},
+                {"role": "system", "content": STUDY_PLAN_INSIGHTS_PREFIX},
                 {"role": "user", "content": prompt}
             ],
-            response_format={"type": "json_object"},
             temperature=0.7,
-            max_tokens=min(1000, self.max_tokens)
+            max_tokens=min(400, self.max_tokens),
+            use_cache=use_cache
         )
-        
-        result = json.loads(response.choices[0].message.content)
-        print(f"[OK] AI generated study plan with {len(result.get('priority_topics', []))} priority topics")
+        print("[OK] AI generated study plan insights")
         return result
@@ -0,0 +1,154 @@
+"""
+Speech-to-text backends used by TranscriptionService
+Selected with the ASR_BACKEND setting:
+  - huggingface: Hugging Face Inference API (remote, needs HUGGINGFACE_API_KEY)
+  - local: CPU Whisper model kept warm in a pool of worker processes (needs transformers + torch)
+  - stub: deterministic fake transcription for tests and load testing
+"""
+import hashlib
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+
+
+class ASRBackend:
+    name = 'base'
+
+    def transcribe(self, audio_file_path, return_timestamps=False):
+        """
+        Returns: str, or {"text": ..., "chunks": [...]} when return_timestamps=True
+        RAISES: Exception if transcription fails
+        """
+        raise NotImplementedError
+
+
+class HuggingFaceBackend(ASRBackend):
+    name = 'huggingface'
+
+    def __init__(self):
+        from huggingface_hub import InferenceClient
+
+        api_key = settings.HUGGINGFACE_API_KEY
+        if not api_key:
+            raise ValueError(
+                "❌ HUGGINGFACE_API_KEY not configured!\n\n"
+                "Set your API key in .env file:\n"
+                "  1. Copy .env.example to .env\n"
+                "  2. Edit .env and set: HUGGINGFACE_API_KEY=hf_your-key\n"
+                "  3. Restart the server\n\n"
+                "Get key from: https://huggingface.co/settings/tokens\n"
+                "Or set ASR_BACKEND=local to transcribe on this machine."
+            )
+
+        # A URL (dedicated endpoint) is posted to directly instead of the hosted model
+        self.model = settings.HUGGINGFACE_ASR_URL or settings.HUGGINGFACE_ASR_MODEL
+        # Use official Hugging Face InferenceClient (recommended way)
+        self.client = InferenceClient(token=api_key)
+
+    def transcribe(self, audio_file_path, return_timestamps=False):
+        if return_timestamps:
+            return self.client.automatic_speech_recognition(
+                audio_file_path,
+                model=self.model,
+                parameters={"return_timestamps": True}
+            )
+        return self.client.automatic_speech_recognition(audio_file_path, model=self.model)
+
+
+# Model loaded once per pool process by _init_local_worker
+_local_pipeline = None
+
+
+def _init_local_worker(model_name, threads):
+    """Pool initializer: load the Whisper model once and keep it warm for every request"""
+    global _local_pipeline
+    import torch
+    from transformers import pipeline
+
+    torch.set_num_threads(threads)
+    _local_pipeline = pipeline(
+        'automatic-speech-recognition',
+        model=model_name,
+        device=-1,  # CPU
+        chunk_length_s=30,
+    )
+
+
+def _local_transcribe(audio_file_path, return_timestamps):
+    result = _local_pipeline(audio_file_path, return_timestamps=return_timestamps)
+    if return_timestamps:
+        return result
+    return result.get('text', '')
+
+
+def _local_warmup():
+    return _local_pipeline is not None
+
+
+class LocalWhisperBackend(ASRBackend):
+    """
+    Whisper on CPU in a process pool
+    Each pool process loads the model once and keeps it; throughput scales with
+    LOCAL_ASR_WORKERS. The default splits the cores between the AI worker processes
+    (each runs its own pool). The pool is shared by every TranscriptionService in the process.
+    """
+    name = 'local'
+
+    _pool = None
+    _pool_lock = threading.Lock()
+
+    def __init__(self):
+        self.model = settings.LOCAL_ASR_MODEL
+        self.workers = settings.LOCAL_ASR_WORKERS or max(1, (os.cpu_count() or 1) // max(1, settings.AI_WORKER_COUNT))
+        self.pool = self._get_pool(self.model, self.workers)
+
+    @classmethod
+    def _get_pool(cls, model, workers):
+        with cls._pool_lock:
+            if cls._pool is None:
+                # Split the cores between pool processes so they don't oversubscribe
+                threads = max(1, (os.cpu_count() or 1) // workers)
+                cls._pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_init_local_worker,
+                    initargs=(model, threads),
+                )
+                # Start every process now so the first student doesn't pay for the model load
+                for future in [cls._pool.submit(_local_warmup) for _ in range(workers)]:
+                    future.result()
+                print(f"[OK] Local ASR pool ready: {workers} worker(s) with model {model}")
+        return cls._pool
+
+    def transcribe(self, audio_file_path, return_timestamps=False):
+        return self.pool.submit(_local_transcribe, audio_file_path, return_timestamps).result()
+
+
+class StubBackend(ASRBackend):
+    """Deterministic transcription derived from the file contents - no model, no network"""
+    name = 'stub'
+
+    def transcribe(self, audio_file_path, return_timestamps=False):
+        with open(audio_file_path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        text = settings.ASR_STUB_TEXT or f"Stub transcription of {os.path.basename(audio_file_path)} ({digest[:12]})"
+        if return_timestamps:
+            return {"text": text, "chunks": [{"text": text, "timestamp": [0.0, None]}]}
+        return text
+
+
+ASR_BACKENDS = {
+    HuggingFaceBackend.name: HuggingFaceBackend,
+    LocalWhisperBackend.name: LocalWhisperBackend,
+    StubBackend.name: StubBackend,
+}
+
+
+def get_asr_backend(name=None):
+    """Instantiate the backend named by ASR_BACKEND (or `name`)"""
+    name = name or settings.ASR_BACKEND
+    try:
+        backend_class = ASR_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown ASR_BACKEND '{name}'. Choose from: {', '.join(ASR_BACKENDS)}")
+    return backend_class()
@@ -0,0 +1,225 @@
+"""
+Audio helpers for transcription (uses the ffmpeg command line tool)
+Recordings are 720p VP9 .webm files; the ASR model only needs the audio track,
+so it is extracted as 16 kHz mono WAV and long silences are trimmed first.
+"""
+import array
+import math
+import operator
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import warnings
+import wave
+from django.conf import settings
+from .metrics import timed
+
+try:
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        import audioop  # C implementation of the frame RMS (removed in Python 3.13)
+except ImportError:
+    audioop = None
+
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+
+
+def ffmpeg_available():
+    return shutil.which('ffmpeg') is not None
+
+
+def _run_ffmpeg(args):
+    result = subprocess.run(['ffmpeg', '-nostdin', '-loglevel', 'error', '-y'] + args, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"Audio extraction failed: {result.stderr.strip()[:300]}")
+
+
+def extract_audio(src_path, dst_path):
+    """Extract the audio track of a recording as 16 kHz mono 16-bit WAV"""
+    _run_ffmpeg(['-i', src_path, '-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-sample_fmt', 's16', '-f', 'wav', dst_path])
+    return dst_path
+
+
+@timed('extract_audio_window')
+def extract_audio_window(src_path, start_seconds, duration_seconds=None):
+    """
+    Extract [start, start + duration) of the audio track as 16 kHz mono WAV
+    Works on a recording that is still being appended to.
+    duration_seconds=None reads to the end of the file.
+    Returns: path of a temporary .wav file (caller deletes it)
+    RAISES: Exception if ffmpeg fails
+    """
+    out = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
+    out.close()
+
+    args = ['-ss', str(start_seconds), '-i', src_path]
+    if duration_seconds is not None:
+        args += ['-t', str(duration_seconds)]
+    args += ['-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-sample_fmt', 's16', '-f', 'wav', out.name]
+    _run_ffmpeg(args)
+    return out.name
+
+
+def wav_duration(path):
+    """Duration in seconds of a WAV file"""
+    with wave.open(path, 'rb') as wav:
+        return wav.getnframes() / float(wav.getframerate())
+
+
+def _frame_rms(data):
+    """RMS energy of one frame of 16-bit little-endian samples"""
+    if audioop:
+        return audioop.rms(audioop.byteswap(data, 2) if sys.byteorder == 'big' else data, 2)
+    samples = array.array('h', data)
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return math.sqrt(sum(map(operator.mul, samples, samples)) / len(samples)) if samples else 0
+
+
+def _frames(wav, frame_len, block_frames=1000):
+    """Yield the raw bytes of each frame, reading the file block by block"""
+    frame_bytes = frame_len * wav.getsampwidth()
+    while True:
+        block = wav.readframes(frame_len * block_frames)
+        if not block:
+            return
+        for offset in range(0, len(block), frame_bytes):
+            yield block[offset:offset + frame_bytes]
+
+
+def _kept_frames(energies, threshold, min_silence_frames, keep_frames):
+    """
+    Which frames survive: speech, short pauses, and keep_frames of every long
+    silence (half on each side). Returns: list of bools, one per frame
+    """
+    keep = [energy >= threshold for energy in energies]
+    head = keep_frames // 2
+    index = 0
+    while index < len(keep):
+        if keep[index]:
+            index += 1
+            continue
+        run_end = index
+        while run_end < len(keep) and not keep[run_end]:
+            run_end += 1
+        run = run_end - index
+        if run <= min_silence_frames:
+            kept = range(index, run_end)
+        else:
+            kept = list(range(index, index + head)) + list(range(run_end - (keep_frames - head), run_end))
+        for frame in kept:
+            keep[frame] = True
+        index = run_end
+    return keep
+
+
+def trim_silence(src_path, dst_path, min_silence_seconds=None, keep_seconds=None):
+    """
+    Energy-based VAD: shorten every silence longer than min_silence_seconds to keep_seconds
+    The speech threshold adapts to the recording's noise floor (quietest 10% of frames).
+    Two passes over the file (energies, then the kept frames), so only one block of
+    audio is in memory at a time.
+    Expects 16-bit mono WAV. Returns: (original_seconds, trimmed_seconds)
+    """
+    min_silence_seconds = settings.ASR_MIN_SILENCE_SECONDS if min_silence_seconds is None else min_silence_seconds
+    keep_seconds = settings.ASR_KEEP_SILENCE_SECONDS if keep_seconds is None else keep_seconds
+
+    with wave.open(src_path, 'rb') as wav:
+        rate = wav.getframerate()
+        total_samples = wav.getnframes()
+        frame_len = int(rate * FRAME_MS / 1000)
+        energies = [_frame_rms(frame) for frame in _frames(wav, frame_len)]
+
+    if energies:
+        noise_floor = sorted(energies)[len(energies) // 10]
+        threshold = max(noise_floor * 3, 300)
+    else:
+        threshold = 0
+
+    min_silence_frames = int(min_silence_seconds * 1000 / FRAME_MS)
+    keep_frames = int(keep_seconds * 1000 / FRAME_MS)
+    keep = _kept_frames(energies, threshold, min_silence_frames, keep_frames)
+
+    kept_bytes = 0
+    with wave.open(src_path, 'rb') as wav, wave.open(dst_path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        buffer = bytearray()
+        for frame, kept in zip(_frames(wav, frame_len), keep):
+            if kept:
+                buffer += frame
+            if len(buffer) >= 1 << 16:
+                out.writeframesraw(buffer)
+                kept_bytes += len(buffer)
+                buffer = bytearray()
+        out.writeframes(buffer)
+        kept_bytes += len(buffer)
+
+    return total_samples / rate, kept_bytes / 2 / rate
+
+
+def _asr_cache_paths(recording_path):
+    """ASR input cached next to the recording, and the file recording the source it was made from"""
+    return f"{recording_path}.asr.wav", f"{recording_path}.asr.key"
+
+
+def _recording_key(recording_path):
+    """Size and mtime of the recording - a new upload of the same path changes at least one"""
+    stat = os.stat(recording_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def discard_asr_cache(recording_path):
+    """Delete the cached ASR input of a recording (recording deleted or replaced)"""
+    for path in _asr_cache_paths(recording_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@timed('prepare_for_asr')
+def prepare_for_asr(recording_path):
+    """
+    Derive the ASR input for a recording: 16 kHz mono WAV with long silences trimmed
+    The result is cached next to the recording (<recording>.asr.wav) and reused
+    while the recording has the size and mtime it was made from.
+    Returns: dict with path, original/processed bytes and durations
+    """
+    asr_path, key_path = _asr_cache_paths(recording_path)
+    original_bytes = os.path.getsize(recording_path)
+    key = _recording_key(recording_path)
+
+    cached_key = None
+    if os.path.exists(asr_path) and os.path.exists(key_path):
+        with open(key_path) as f:
+            cached_key = f.read().strip()
+
+    if cached_key != key:
+        raw = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
+        raw.close()
+        try:
+            extract_audio(recording_path, raw.name)
+            original_seconds, _ = trim_silence(raw.name, asr_path)
+        finally:
+            os.remove(raw.name)
+        with open(key_path, 'w') as f:
+            f.write(key)
+    else:
+        original_seconds = None
+
+    stats = {
+        'path': asr_path,
+        'original_bytes': original_bytes,
+        'processed_bytes': os.path.getsize(asr_path),
+        'original_seconds': original_seconds,
+        'processed_seconds': wav_duration(asr_path),
+    }
+    print(
+        f"[AUDIO] ASR input: {stats['original_bytes']} -> {stats['processed_bytes']} bytes, "
+        f"{stats['processed_seconds']:.1f}s of audio"
+    )
+    return stats
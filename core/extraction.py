@@ -0,0 +1,238 @@
+"""
+Text extraction from uploaded answer files (Submission.answer_file)
+Each format has an extractor that yields the text one page (or paragraph block) at a
+time. PDF pages are split into ranges read in parallel by a process pool; pages without
+a text layer (scans) and photos are read by the vision model. The result is stored by
+the file's SHA-256, so the same file is never extracted twice.
+
+Optional dependencies:
+  - pypdf: PDF text (pip install pypdf)
+  - Pillow: photos are shrunk before they are sent to the vision model
+  - antiword: legacy .doc files (system package)
+"""
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
+from django.conf import settings
+from .models import ExtractedText
+from .services import get_ai_service
+from .metrics import span
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+IMAGE_TYPES = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png'}
+
+# Longest side of a photo sent to the vision model (larger adds cost, not accuracy)
+MAX_IMAGE_SIDE = 2048
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+class ExtractionError(Exception):
+    """The file can't be read (unsupported, damaged or a missing optional dependency)"""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# --- Per-format extractors: generators of page texts ---
+
+def _iter_txt(path):
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        block = []
+        for line in f:
+            block.append(line)
+            if len(block) >= 200:
+                yield ''.join(block)
+                block = []
+        if block:
+            yield ''.join(block)
+
+
+def _iter_docx(path):
+    """Paragraph text of word/document.xml, parsed incrementally (no python-docx needed)"""
+    try:
+        archive = zipfile.ZipFile(path)
+        document = archive.open('word/document.xml')
+    except (zipfile.BadZipFile, KeyError):
+        raise ExtractionError("The Word document could not be opened. Please save it again as .docx or PDF.")
+
+    with archive, document:
+        paragraphs = []
+        for _, element in ElementTree.iterparse(document):
+            if element.tag == f'{WORD_NAMESPACE}p':
+                paragraphs.append(''.join(node.text or '' for node in element.iter(f'{WORD_NAMESPACE}t')))
+                element.clear()
+                if len(paragraphs) >= 50:
+                    yield '\n'.join(paragraphs)
+                    paragraphs = []
+        if paragraphs:
+            yield '\n'.join(paragraphs)
+
+
+def _iter_doc(path):
+    antiword = shutil.which('antiword')
+    if antiword is None:
+        raise ExtractionError("Old .doc files are not supported. Please save your work as .docx or PDF.")
+    result = subprocess.run([antiword, path], capture_output=True, timeout=60)
+    if result.returncode != 0:
+        raise ExtractionError("The Word document could not be read. Please save it again as .docx or PDF.")
+    yield result.stdout.decode('utf-8', errors='replace')
+
+
+def _shrink_image(data):
+    """JPEG no larger than MAX_IMAGE_SIDE (unchanged without Pillow). Returns: (bytes, mime type) or None"""
+    if Image is None:
+        return None
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+        output = io.BytesIO()
+        image.convert('RGB').save(output, format='JPEG', quality=85)
+        return output.getvalue(), 'image/jpeg'
+    except Exception:
+        return None
+
+
+def _read_image(data, mime_type):
+    shrunk = _shrink_image(data)
+    if shrunk is not None:
+        data, mime_type = shrunk
+    return get_ai_service().transcribe_answer_image(data, mime_type)
+
+
+def _iter_image(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    yield _read_image(data, IMAGE_TYPES[os.path.splitext(path)[1].lower()])
+
+
+def _pdf_page_range(path, start, end):
+    """
+    Runs in a pool process: text of pages [start, end)
+    Returns: list of (text, images) - images (bytes, mime type) only for pages without text
+    """
+    reader = pypdf.PdfReader(path)
+    pages = []
+    for number in range(start, end):
+        page = reader.pages[number]
+        text = (page.extract_text() or '').strip()
+        images = []
+        if not text:
+            # Scanned page: hand its images to the vision model
+            try:
+                for image in page.images:
+                    extension = os.path.splitext(image.name)[1].lower()
+                    images.append((image.data, IMAGE_TYPES.get(extension, 'image/png')))
+            except Exception as e:
+                # pypdf needs Pillow to decode most embedded image formats
+                print(f"[WARNING] Could not read the images of PDF page {number + 1}: {e}")
+        pages.append((text, images))
+    return pages
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max(1, settings.EXTRACTION_WORKERS))
+    return _pool
+
+
+def _iter_pdf(path):
+    if pypdf is None:
+        raise ExtractionError("PDF support is not installed on the server (pip install pypdf).")
+    try:
+        page_count = len(pypdf.PdfReader(path).pages)
+    except Exception:
+        raise ExtractionError("The PDF could not be opened. Please upload it again or as photos.")
+    if page_count > settings.EXTRACTION_MAX_PAGES:
+        raise ExtractionError(f"The PDF has {page_count} pages; at most {settings.EXTRACTION_MAX_PAGES} are accepted.")
+
+    step = max(1, settings.EXTRACTION_PAGES_PER_TASK)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    # map() yields the ranges in page order as soon as each one is done
+    results = _get_pool().map(
+        _pdf_page_range, [path] * len(ranges), [start for start, _ in ranges], [end for _, end in ranges]
+    )
+    for pages in results:
+        for text, images in pages:
+            if not text and images:
+                text = '\n'.join(_read_image(data, mime_type) for data, mime_type in images)
+            yield text
+
+
+EXTRACTORS = {
+    '.txt': ('txt', _iter_txt),
+    '.docx': ('docx', _iter_docx),
+    '.doc': ('doc', _iter_doc),
+    '.pdf': ('pdf', _iter_pdf),
+    '.jpg': ('image', _iter_image),
+    '.jpeg': ('image', _iter_image),
+    '.png': ('image', _iter_image),
+}
+
+
+def iter_text(path):
+    """
+    Yield the text of a file page by page
+    RAISES: ExtractionError for unsupported or unreadable files
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXTRACTORS:
+        raise ExtractionError(f"Unsupported file type: {extension or 'no extension'}")
+    _, extractor = EXTRACTORS[extension]
+    yield from extractor(path)
+
+
+def extract_text(path):
+    """
+    Text of an answer file, extracted once per distinct file content
+    Returns: str
+    RAISES: ExtractionError if the file can't be read or contains no text
+    """
+    with span('extract_text', bytes=os.path.getsize(path)) as timing:
+        digest = file_sha256(path)
+        cached = ExtractedText.objects.filter(sha256=digest).first()
+        if cached is not None:
+            print(f"[CACHE] Answer file text served from cache ({digest[:12]})")
+            timing.outcome = 'cached'
+            return cached.text
+
+        pages = [page.strip() for page in iter_text(path)]
+        text = '\n\n'.join(page for page in pages if page)
+        if not text:
+            raise ExtractionError("No answers could be read from the file. Please upload a clearer copy or type your answers.")
+        timing.set(pages=len(pages))
+
+    extractor, _ = EXTRACTORS[os.path.splitext(path)[1].lower()]
+    # get_or_create: another worker may have extracted the same file meanwhile
+    ExtractedText.objects.get_or_create(
+        sha256=digest, defaults={'extractor': extractor, 'pages': len(pages), 'text': text}
+    )
+    print(f"[OK] Extracted {len(text)} characters from {len(pages)} page(s) of {os.path.basename(path)}")
+    return text
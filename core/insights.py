@@ -0,0 +1,168 @@
+"""
+Normalized feedback points and study topics for class-wide insights
+The feedback lists stay on their rows (JSONFields) for the student pages; a copy of
+every point goes into FeedbackPoint / StudyTopic whenever the feedback is stored,
+so questions like "which improvement points recur in this homework" are one
+GROUP BY instead of loading and parsing every submission.
+"""
+import re
+from django.db import models, transaction
+from .models import FeedbackPoint, QuestionFeedback, StudyTopic, Submission
+
+
+WRITTEN_KINDS = ['strength', 'improvement']
+INTERVIEW_KINDS = ['strong_moment', 'development_area']
+
+
+def text_key(text):
+    """Grouping key for a point: lowercase, single spaces, no trailing punctuation"""
+    return re.sub(r'\s+', ' ', str(text)).strip().rstrip('.!').lower()[:255]
+
+
+def _points(submission, kind, texts, question_number=None):
+    return [
+        FeedbackPoint(
+            homework_id=submission.homework_id,
+            submission=submission,
+            kind=kind,
+            question_number=question_number,
+            text=str(text),
+            text_key=text_key(text),
+        )
+        for text in texts or []
+        if str(text).strip()
+    ]
+
+
+def index_written_feedback(submissions, question_rows):
+    """
+    Replace the written-feedback points of these submissions
+    question_rows: the QuestionFeedback rows stored for them
+    """
+    rows = []
+    for submission in submissions:
+        rows += _points(submission, 'strength', submission.overall_strengths)
+        rows += _points(submission, 'improvement', submission.overall_improvements)
+    for qf in question_rows:
+        rows += _points(qf.submission, 'strength', qf.strengths, qf.question_number)
+        rows += _points(qf.submission, 'improvement', qf.improvements, qf.question_number)
+
+    with transaction.atomic():
+        FeedbackPoint.objects.filter(submission__in=submissions, kind__in=WRITTEN_KINDS).delete()
+        FeedbackPoint.objects.bulk_create(rows)
+
+
+def index_interview_feedback(submission, interview):
+    """Replace the interview points of a submission"""
+    rows = _points(submission, 'strong_moment', interview.strong_moments)
+    rows += _points(submission, 'development_area', interview.development_areas)
+
+    with transaction.atomic():
+        FeedbackPoint.objects.filter(submission=submission, kind__in=INTERVIEW_KINDS).delete()
+        FeedbackPoint.objects.bulk_create(rows)
+
+
+def index_study_plan(submission, study_plan):
+    """Replace the study topics of a submission"""
+    rows = []
+    for topic in study_plan.priority_topics or []:
+        name = str(topic.get('topic', '')).strip() if isinstance(topic, dict) else str(topic).strip()
+        if not name:
+            continue
+        score = topic.get('current_score') if isinstance(topic, dict) else None
+        rows.append(StudyTopic(
+            homework_id=submission.homework_id,
+            submission=submission,
+            kind='priority',
+            topic=name[:200],
+            topic_key=text_key(name)[:200],
+            priority=str(topic.get('priority', ''))[:20] if isinstance(topic, dict) else '',
+            current_score=int(score) if isinstance(score, (int, float)) else None,
+        ))
+    for name in study_plan.strength_topics or []:
+        name = str(name).strip()
+        if name:
+            rows.append(StudyTopic(
+                homework_id=submission.homework_id,
+                submission=submission,
+                kind='strength',
+                topic=name[:200],
+                topic_key=text_key(name)[:200],
+            ))
+
+    with transaction.atomic():
+        StudyTopic.objects.filter(submission=submission).delete()
+        StudyTopic.objects.bulk_create(rows)
+
+
+def recurring_points(homework, kind, limit=5):
+    """
+    Most common feedback points of a kind across a homework
+    Returns: list of {'text', 'students'} ordered by number of students
+    """
+    return list(
+        FeedbackPoint.objects.filter(homework=homework, kind=kind)
+        .values('text_key')
+        .annotate(text=models.Min('text'), students=models.Count('submission', distinct=True))
+        .order_by('-students', 'text_key')
+        .values('text', 'students')[:limit]
+    )
+
+
+def priority_topics(homework, limit=5):
+    """
+    Study plan topics most often flagged as a priority in a homework
+    Returns: list of {'topic', 'students', 'avg_score'}
+    """
+    return list(
+        StudyTopic.objects.filter(homework=homework, kind='priority')
+        .values('topic_key')
+        .annotate(
+            topic=models.Min('topic'),
+            students=models.Count('submission', distinct=True),
+            avg_score=models.Avg('current_score'),
+        )
+        .order_by('-students', 'topic_key')
+        .values('topic', 'students', 'avg_score')[:limit]
+    )
+
+
+def question_performance(homework, struggling_below=60):
+    """
+    Per-question averages across a homework's submissions
+    Returns: list of {'question_number', 'question_title', 'average', 'struggling'}
+    """
+    return list(
+        QuestionFeedback.objects.filter(submission__homework=homework)
+        .values('question_number')
+        .annotate(
+            question_title=models.Min('question_title'),
+            average=models.Avg('percentage'),
+            struggling=models.Count('id', filter=models.Q(percentage__lt=struggling_below)),
+        )
+        .order_by('question_number')
+    )
+
+
+def rebuild_feedback_index(homework_id):
+    """Recreate the points and topics of a homework from the JSON fields (backfill / repair)"""
+    submissions = list(
+        Submission.objects.filter(homework_id=homework_id)
+        .select_related('interview', 'study_plan')
+    )
+    question_rows = list(
+        QuestionFeedback.objects.filter(submission__homework_id=homework_id).select_related('submission')
+    )
+
+    with transaction.atomic():
+        FeedbackPoint.objects.filter(homework_id=homework_id).delete()
+        StudyTopic.objects.filter(homework_id=homework_id).delete()
+        index_written_feedback(submissions, question_rows)
+        for submission in submissions:
+            interview = getattr(submission, 'interview', None)
+            if interview is not None and interview.overall_analysis:
+                index_interview_feedback(submission, interview)
+            study_plan = getattr(submission, 'study_plan', None)
+            if study_plan is not None:
+                index_study_plan(submission, study_plan)
+    return len(submissions)
@@ -0,0 +1,247 @@
+"""
+Database-backed job queue for AI work
+Views enqueue jobs and return immediately; `manage.py run_ai_workers` claims and runs them.
+"""
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+from .models import AnalysisJob, HomeworkFile, Submission
+from . import tasks
+from .audio import ffmpeg_available
+from .mark_scheme import INDEXED_FILE_TYPES
+from .metrics import observe, span
+
+
+# kind -> (handler, called once the job has run out of attempts)
+JOB_HANDLERS = {
+    'text_extraction': (tasks.extract_answer_text, tasks.fail_text_extraction),
+    'written_analysis': (tasks.analyze_written_submission, tasks.fail_written_analysis),
+    'interview_questions': (tasks.prepare_interview_questions, tasks.fail_interview_questions),
+    'interview_transcribe': (tasks.transcribe_interview, tasks.fail_interview_stage),
+    'transcribe_stream': (tasks.transcribe_stream, tasks.fail_transcribe_stream),
+    'interview_analyze': (tasks.analyze_interview, tasks.fail_interview_stage),
+    'study_plan': (tasks.build_study_plan, tasks.fail_study_plan),
+    'mark_scheme_index': (tasks.index_mark_scheme, tasks.fail_mark_scheme_index),
+}
+
+# Jobs on a teacher's homework file instead of a submission
+FILE_JOB_KINDS = ['mark_scheme_index']
+
+# Stages queued once a job succeeds
+NEXT_STAGES = {
+    'text_extraction': ['written_analysis'],
+    # Speculative: questions are ready by the time the student starts the interview
+    'written_analysis': ['interview_questions'],
+    'interview_transcribe': ['interview_analyze'],
+    'interview_analyze': ['study_plan'],
+}
+
+INTERVIEW_STAGES = ['interview_transcribe', 'interview_analyze', 'study_plan']
+
+ACTIVE_STATUSES = ['queued', 'running']
+
+
+def enqueue_job(submission, kind, force_fresh=False):
+    """
+    Queue a job for a submission unless one is already queued or running
+    force_fresh=True makes the job bypass the AI response cache
+    """
+    existing = submission.jobs.filter(kind=kind, status__in=ACTIVE_STATUSES).first()
+    if existing and not (force_fresh and existing.status == 'running'):
+        if force_fresh and not existing.force_fresh:
+            existing.force_fresh = True
+            existing.save(update_fields=['force_fresh'])
+        return existing
+    return AnalysisJob.objects.create(submission=submission, kind=kind, force_fresh=force_fresh)
+
+
+def enqueue_file_job(homework_file, kind):
+    """Queue a job for a homework file unless one is already queued or running"""
+    existing = homework_file.jobs.filter(kind=kind, status__in=ACTIVE_STATUSES).first()
+    return existing or AnalysisJob.objects.create(homework_file=homework_file, kind=kind)
+
+
+def enqueue_mark_scheme_indexing(homework):
+    """Queue indexing of each question paper / mark scheme of a homework that is not indexed yet"""
+    for homework_file in homework.files.filter(file_type__in=INDEXED_FILE_TYPES, indexed_at__isnull=True):
+        enqueue_file_job(homework_file, 'mark_scheme_index')
+
+
+def latest_job(submission, kind):
+    return submission.jobs.filter(kind=kind).order_by('-created_at').first()
+
+
+def start_interview_pipeline(submission):
+    """
+    Queue the end-of-interview stages
+    Transcription and the (written-only) study plan start in parallel;
+    analysis follows transcription and triggers a study plan rebuild.
+    """
+    enqueue_job(submission, 'interview_transcribe')
+    enqueue_job(submission, 'study_plan')
+
+
+def maybe_transcribe_window(interview):
+    """Queue incremental transcription once a full window of new audio is on disk"""
+    if not settings.TRANSCRIPTION_STREAMING or not ffmpeg_available():
+        return None
+    if interview.recorded_seconds - interview.transcribed_seconds < settings.TRANSCRIPTION_WINDOW_SECONDS + 2:
+        return None
+    return enqueue_job(interview.submission, 'transcribe_stream')
+
+
+def pipeline_status(submission):
+    """Returns: dict of interview stage -> latest job status (None if not queued)"""
+    statuses = {kind: None for kind in INTERVIEW_STAGES}
+    for kind, status in submission.jobs.filter(kind__in=INTERVIEW_STAGES).order_by('created_at').values_list('kind', 'status'):
+        statuses[kind] = status
+    return statuses
+
+
+def first_stage(submission):
+    """File-only submissions have their text extracted before the written analysis"""
+    return 'written_analysis' if submission.answer_text else 'text_extraction'
+
+
+def enqueue_pending_submissions():
+    """Queue written analysis (or text extraction) for submissions left in 'analyzing' without an active job"""
+    active_jobs = AnalysisJob.objects.filter(
+        submission=OuterRef('pk'),
+        kind__in=['text_extraction', 'written_analysis'],
+        status__in=ACTIVE_STATUSES,
+    )
+    pending = Submission.objects.filter(
+        status='analyzing',
+        analysis_completed_at__isnull=True,
+    ).exclude(answer_text='', answer_file='').exclude(Exists(active_jobs))
+
+    count = 0
+    for submission in pending:
+        enqueue_job(submission, first_stage(submission))
+        count += 1
+    if count:
+        print(f"[OK] Queued {count} pending submission(s) for analysis")
+    return count
+
+
+def enqueue_unindexed_files():
+    """Queue indexing for question papers / mark schemes never indexed (e.g. uploaded before indexing existed)"""
+    active_jobs = AnalysisJob.objects.filter(
+        homework_file=OuterRef('pk'), kind='mark_scheme_index', status__in=ACTIVE_STATUSES,
+    )
+    # Files whose indexing ran out of retries have an index_error and are left alone
+    pending = HomeworkFile.objects.filter(
+        file_type__in=INDEXED_FILE_TYPES, indexed_at__isnull=True, index_error='',
+    ).exclude(Exists(active_jobs))
+
+    count = 0
+    for homework_file in pending:
+        enqueue_file_job(homework_file, 'mark_scheme_index')
+        count += 1
+    if count:
+        print(f"[OK] Queued {count} homework file(s) for mark scheme indexing")
+    return count
+
+
+def requeue_stale_jobs():
+    """Give jobs claimed by a worker that died mid-run back to the queue"""
+    cutoff = timezone.now() - timedelta(seconds=settings.AI_JOB_STALE_SECONDS)
+    stale = AnalysisJob.objects.filter(status='running', started_at__lt=cutoff).select_related('submission', 'homework_file')
+    for job in stale:
+        job.last_error = f"Worker {job.worker} did not finish the job"
+        if job.attempts < settings.AI_JOB_MAX_ATTEMPTS:
+            job.status = 'queued'
+            job.save()
+        else:
+            _fail_job(job, Exception(job.last_error))
+        print(f"[WARNING] Job {job.id} was stale, now {job.status}")
+
+
+def claim_job(job_id, worker_id):
+    """
+    Atomically claim one queued job
+    Returns: True if this worker got it, False if it is no longer queued
+    """
+    # Conditional UPDATE - only one worker can move the row out of 'queued'
+    return AnalysisJob.objects.filter(id=job_id, status='queued').update(
+        status='running',
+        worker=worker_id,
+        started_at=timezone.now(),
+        attempts=F('attempts') + 1,
+    ) == 1
+
+
+def claim_next_job(worker_id):
+    """
+    Atomically claim the oldest queued job
+    Returns: AnalysisJob or None if the queue is empty
+    """
+    candidates = list(
+        AnalysisJob.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        if claim_job(job_id, worker_id):
+            return AnalysisJob.objects.select_related('submission__homework', 'homework_file__homework').get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job, retrying later on failure until AI_JOB_MAX_ATTEMPTS is reached"""
+    handler, _ = JOB_HANDLERS[job.kind]
+    print(f"[JOB] {job.worker} running job {job.id} ({job.kind}) attempt {job.attempts}")
+    if job.attempts == 1:
+        # Time from enqueue to a worker picking the job up (retries wait on purpose)
+        observe(f"queue_wait.{job.kind}", (job.started_at - job.created_at).total_seconds())
+    try:
+        with span(f"job.{job.kind}", submission=job.submission_id, homework_file=job.homework_file_id, attempt=job.attempts):
+            handler(_job_target(job), use_cache=not job.force_fresh)
+    except Exception as e:
+        print(f"[ERROR] Job {job.id} ({job.kind}) failed: {e}")
+        retry_or_fail_job(job, e)
+        return False
+
+    job.status = 'done'
+    job.last_error = ''
+    job.finished_at = timezone.now()
+    job.save()
+
+    for kind in NEXT_STAGES.get(job.kind, []):
+        enqueue_job(job.submission, kind)
+    return True
+
+
+def _job_target(job):
+    return job.homework_file if job.kind in FILE_JOB_KINDS else job.submission
+
+
+def retry_or_fail_job(job, error):
+    """Put a failed job back in the queue, or fail it once it has used AI_JOB_MAX_ATTEMPTS"""
+    job.last_error = str(error)
+    if job.attempts < settings.AI_JOB_MAX_ATTEMPTS:
+        job.status = 'queued'
+        job.save()
+    else:
+        _fail_job(job, error)
+
+
+def _fail_job(job, error):
+    _, on_failure = JOB_HANDLERS[job.kind]
+    job.status = 'failed'
+    job.finished_at = timezone.now()
+    job.save()
+    on_failure(_job_target(job), error)
+
+
+def work_forever(worker_id, poll_interval):
+    """Worker loop: claim and run jobs, sleeping while the queue is empty"""
+    print(f"[OK] AI worker {worker_id} started")
+    while True:
+        close_old_connections()
+        job = claim_next_job(worker_id)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
@@ -0,0 +1,79 @@
+"""
+Incremental parsing of a streamed JSON response
+The model streams a JSON object token by token; ArrayItemParser picks out each
+element of one array (e.g. "questions") as soon as its closing brace arrives,
+without waiting for the rest of the document.
+"""
+import json
+
+
+class ArrayItemParser:
+    """
+    Feed streamed text; get back the objects of `key`'s array that completed in that text
+    Only objects directly inside the array are returned, each parsed with json.loads.
+    """
+
+    def __init__(self, key):
+        self.marker = f'"{key}"'
+        self.buffer = ''
+        self.pos = 0            # Next character to scan
+        self.in_array = False
+        self.done = False
+        self.depth = 0          # Brace/bracket depth inside the array
+        self.in_string = False
+        self.escaped = False
+        self.item_start = None
+
+    def feed(self, text):
+        """Returns: list of dicts completed by this text"""
+        self.buffer += text
+        items = []
+
+        if not self.in_array and not self.done:
+            found = self.buffer.find(self.marker)
+            if found == -1:
+                return items
+            bracket = self.buffer.find('[', found + len(self.marker))
+            if bracket == -1:
+                return items
+            self.in_array = True
+            self.pos = bracket + 1
+
+        while self.in_array and self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if self.depth == 0 and char == '{':
+                    self.item_start = self.pos
+                self.depth += 1
+            elif char in '}]':
+                if self.depth == 0 and char == ']':
+                    # End of the array
+                    self.in_array = False
+                    self.done = True
+                else:
+                    self.depth -= 1
+                    if self.depth == 0 and self.item_start is not None:
+                        try:
+                            items.append(json.loads(self.buffer[self.item_start:self.pos + 1]))
+                        except json.JSONDecodeError:
+                            pass
+                        self.item_start = None
+
+            self.pos += 1
+
+        return items
+
+    @property
+    def text(self):
+        """Everything fed so far"""
+        return self.buffer
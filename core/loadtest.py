@@ -0,0 +1,412 @@
+"""
+Load testing of the student flow (used by python manage.py load_test)
+Local stand-ins answer like the OpenAI chat-completions and Hugging Face ASR endpoints,
+with a configurable latency distribution and error rate, so the app and its workers can
+be driven hard without cost or provider limits. A virtual student goes through every
+page of the student flow with its own session, like a browser would.
+"""
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+
+
+# --- Latency distributions ---
+
+class Latency:
+    """
+    Response delay of a stand-in, from a spec string:
+      fixed:SECONDS
+      uniform:LOW:HIGH
+      lognormal:MEDIAN:P95   (long tail, like real model latency)
+    """
+
+    def __init__(self, spec):
+        kind, _, args = spec.partition(':')
+        try:
+            values = [float(value) for value in args.split(':')] if args else []
+        except ValueError:
+            raise ValueError(f"Invalid latency spec: {spec}")
+        if kind == 'fixed' and len(values) == 1:
+            self.sample = lambda: values[0]
+        elif kind == 'uniform' and len(values) == 2:
+            self.sample = lambda: random.uniform(values[0], values[1])
+        elif kind == 'lognormal' and len(values) == 2 and 0 < values[0] <= values[1]:
+            # 1.645 = z-score of the 95th percentile
+            mu, sigma = math.log(values[0]), math.log(values[1] / values[0]) / 1.645
+            self.sample = lambda: random.lognormvariate(mu, sigma)
+        else:
+            raise ValueError(f"Invalid latency spec: {spec}")
+        self.spec = spec
+
+
+# --- Stand-in servers ---
+
+class StandIn:
+    """
+    HTTP server in a background thread answering like a provider endpoint
+    error_rate of the requests get a 500, rate_limit_rate a 429 with Retry-After.
+    """
+    name = 'stand-in'
+
+    def __init__(self, latency, error_rate=0.0, rate_limit_rate=0.0, port=0):
+        self.latency = Latency(latency) if isinstance(latency, str) else latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stats = {'requests': 0, 'errors': 0, 'rate_limited': 0}
+        self._stats_lock = threading.Lock()
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                status, headers, payload = stand_in.respond(self.path, self.headers, body)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if isinstance(payload, bytes):
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                # Streamed response: a generator of (delay, bytes)
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for delay, data in payload:
+                    time.sleep(delay)
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def respond(self, path, headers, body):
+        """Returns: (status, headers, bytes or generator of (delay, bytes))"""
+        self._count('requests')
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            self._count('rate_limited')
+            return 429, {'Content-Type': 'application/json', 'Retry-After': '1'}, _error_body('Rate limit reached (stand-in)')
+        if roll < self.rate_limit_rate + self.error_rate:
+            time.sleep(self.latency.sample() / 4)
+            self._count('errors')
+            return 500, {'Content-Type': 'application/json'}, _error_body('Internal error (stand-in)')
+        return self.answer(path, headers, body)
+
+    def answer(self, path, headers, body):
+        raise NotImplementedError
+
+
+def _error_body(message):
+    return json.dumps({'error': {'message': message, 'type': 'server_error'}}).encode()
+
+
+class OpenAIStandIn(StandIn):
+    """
+    POST /v1/chat/completions: a well-formed response for whichever prompt it gets
+    (written grading, packed batch, interview questions/analysis, study plan insights,
+    page transcription), streamed when asked. A system message seen before counts as a
+    cached prompt prefix, as with the provider's prompt caching.
+    """
+    name = 'openai'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._prefixes = set()
+
+    def answer(self, path, headers, body):
+        if not path.rstrip('/').endswith('/chat/completions'):
+            return 404, {'Content-Type': 'application/json'}, _error_body(f"Unknown path {path}")
+        request = json.loads(body)
+        messages = request['messages']
+        system = messages[0]['content'] if messages and messages[0]['role'] == 'system' else ''
+        user = ' '.join(
+            part.get('text', '') if isinstance(part, dict) else str(part)
+            for message in messages[1:]
+            for part in (message['content'] if isinstance(message['content'], list) else [message['content']])
+        )
+
+        if request.get('response_format', {}).get('type') == 'json_object':
+            content = json.dumps(_json_answer(system, user))
+        else:
+            content = "Q1: F = ma, so a = F / m = 20 / 4 = 5 m/s^2\nQ2: v = u + at = 0 + 5 * 3 = 15 m/s"
+
+        prompt_tokens = (len(system) + len(user)) // 4
+        digest = hashlib.sha256(system.encode()).hexdigest()
+        cached_tokens = 0
+        system_tokens = len(system) // 4
+        if digest in self._prefixes and system_tokens >= 1024:
+            cached_tokens = system_tokens // 128 * 128
+        self._prefixes.add(digest)
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': len(content) // 4,
+            'total_tokens': prompt_tokens + len(content) // 4,
+            'prompt_tokens_details': {'cached_tokens': cached_tokens},
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        delay = self.latency.sample()
+
+        if request.get('stream'):
+            return 200, {'Content-Type': 'text/event-stream'}, self._stream(completion_id, request['model'], content, usage, delay)
+
+        time.sleep(delay)
+        return 200, {'Content-Type': 'application/json'}, json.dumps({
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request['model'],
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': usage,
+        }).encode()
+
+    def _stream(self, completion_id, model, content, usage, delay):
+        """SSE chunks: the first after a fifth of the delay, the rest spread over the remainder"""
+        pieces = [content[i:i + 40] for i in range(0, len(content), 40)] or ['']
+
+        def event(choices, chunk_usage=None):
+            chunk = {
+                'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                'model': model, 'choices': choices, 'usage': chunk_usage,
+            }
+            return f"data: {json.dumps(chunk)}\n\n".encode()
+
+        yield delay / 5, event([{'index': 0, 'delta': {'role': 'assistant', 'content': ''}, 'finish_reason': None}])
+        step = delay * 4 / 5 / len(pieces)
+        for piece in pieces:
+            yield step, event([{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}])
+        yield 0, event([{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])
+        yield 0, event([], usage)
+        yield 0, b"data: [DONE]\n\n"
+
+
+def _question_feedback(number):
+    marks_total = 10
+    marks = random.randint(3, 10)
+    return {
+        'number': number,
+        'title': f"Question {number} topic",
+        'marks_awarded': marks,
+        'marks_total': marks_total,
+        'percentage': marks * 100 // marks_total,
+        'strengths': ['Correct formula chosen', 'Units included'],
+        'improvements': [random.choice(['Show each step of the working', 'Check the sign of the acceleration',
+                                        'State the assumption about friction', 'Give the answer to 3 s.f.'])],
+    }
+
+
+def _json_answer(system, user):
+    """Response object matching the schema the prompt asks for"""
+    if '"results"' in system:
+        return {'results': [
+            {
+                'submission_id': int(submission_id),
+                'overall_score': random.randint(40, 95),
+                'overall_strengths': ['Clear working'],
+                'overall_improvements': ['Show intermediate steps'],
+                'questions': [_question_feedback(n) for n in range(1, _num_questions(system) + 1)],
+            }
+            for submission_id in re.findall(r'=== SUBMISSION (\d+) ===', user)
+        ]}
+    if '"marks_awarded"' in system:
+        questions = [_question_feedback(n) for n in range(1, _num_questions(system) + 1)]
+        return {
+            'questions': questions,
+            'overall_score': sum(q['percentage'] for q in questions) // len(questions),
+            'overall_strengths': ['Clear working', 'Good use of units'],
+            'overall_improvements': sorted({q['improvements'][0] for q in questions}),
+        }
+    if '"hints"' in system:
+        kinds = ['process', 'concept', 'application', 'reflection', 'extension']
+        return {'questions': [
+            {'number': n, 'type': kind, 'title': kind.upper(), 'question': f"Explain your {kind} for question {n}.",
+             'hints': ['Take your time']}
+            for n, kind in enumerate(kinds, start=1)
+        ]}
+    if '"interview_score"' in system:
+        return {
+            'interview_score': random.randint(50, 95),
+            'problem_solving_score': random.randint(50, 95),
+            'conceptual_understanding_score': random.randint(50, 95),
+            'creative_application_score': random.randint(50, 95),
+            'misconceptions': [],
+            'strong_moments': ['Explained Newton\'s second law clearly'],
+            'development_areas': ['Link the formula to the physical situation'],
+            'overall_analysis': 'Verbal understanding matches the written work.',
+        }
+    if '"written_vs_verbal_analysis"' in system:
+        return {
+            'written_vs_verbal_analysis': 'The student explains their method as well as they write it.',
+            'learning_style_insights': 'Worked examples followed by practice suit this student.',
+        }
+    return {}
+
+
+def _num_questions(system):
+    match = re.search(r'Number of Questions: (\d+)', system)
+    return int(match.group(1)) if match else 3
+
+
+class ASRStandIn(StandIn):
+    """POST <any path> with audio bytes: {"text": ...} like a Hugging Face ASR endpoint"""
+    name = 'asr'
+
+    def answer(self, path, headers, body):
+        time.sleep(self.latency.sample())
+        words = max(20, len(body) // 4000)
+        vocabulary = ['force', 'equals', 'mass', 'times', 'acceleration', 'so', 'I', 'used', 'the', 'formula']
+        text = ' '.join(random.choice(vocabulary) for _ in range(words))
+        return 200, {'Content-Type': 'application/json'}, json.dumps({'text': text}).encode()
+
+
+# --- Virtual student ---
+
+class StepError(Exception):
+    """A step of the flow got an unexpected answer"""
+
+
+class VirtualStudent:
+    """
+    One student's walk through the flow, with its own session cookie
+    Returns from run(): list of (step, seconds, error or None)
+    Page steps time one request; the *_wait steps time how long the student waits
+    for background work (written feedback, interview results) while polling like the page does.
+    """
+
+    def __init__(self, base_url, homework_code, name, answer_text, recording, submission_id_for,
+                 poll_interval=1.0, wait_timeout=300, chunk_size=None):
+        self.client = httpx.Client(base_url=base_url, timeout=60, follow_redirects=False)
+        self.homework_code = homework_code
+        self.name = name
+        self.answer_text = answer_text
+        self.recording = recording
+        self.submission_id_for = submission_id_for
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self.chunk_size = chunk_size
+        self.results = []
+
+    def _csrf(self):
+        return {'X-CSRFToken': self.client.cookies.get('csrftoken', '')}
+
+    def _expect(self, response, *statuses):
+        if response.status_code not in statuses:
+            raise StepError(f"{response.request.method} {response.request.url.path}: HTTP {response.status_code}")
+        return response
+
+    def _step(self, name, fn):
+        started = time.perf_counter()
+        try:
+            fn()
+        except (StepError, httpx.HTTPError, ValueError) as e:
+            self.results.append((name, time.perf_counter() - started, str(e) or type(e).__name__))
+            raise
+        self.results.append((name, time.perf_counter() - started, None))
+
+    def _wait(self, url, done):
+        deadline = time.monotonic() + self.wait_timeout
+        while time.monotonic() < deadline:
+            data = self._expect(self.client.get(url), 200).json()
+            if data.get('status') == 'error':
+                raise StepError(f"{url}: {data.get('error') or 'pipeline error'}")
+            if done(data):
+                return
+            time.sleep(self.poll_interval)
+        raise StepError(f"{url}: not done after {self.wait_timeout}s")
+
+    def run(self):
+        try:
+            self._step('student_code_entry', self.code_entry)
+            self._step('student_upload', self.upload)
+            self._step('student_review_progress', lambda: self._expect(self.client.get('/student/review/'), 200))
+            self._step('written_feedback_wait', lambda: self._wait('/student/review/status/', lambda data: data['ready']))
+            self._step('student_interview_prep', self.interview_prep)
+            self._step('student_interview', lambda: self._expect(self.client.get('/student/interview/'), 200))
+            self._step('save_interview_recording', self.save_recording)
+            self._step('student_interview_submit', lambda: self._expect(
+                self.client.post('/student/interview/', headers=self._csrf()), 302
+            ))
+            self._step('student_final_results', lambda: self._expect(self.client.get('/student/results/'), 200))
+            self._step('results_wait', lambda: self._wait('/student/results/status/', self._results_done))
+        except (StepError, httpx.HTTPError, ValueError):
+            pass
+        finally:
+            self.client.close()
+        return self.results
+
+    def code_entry(self):
+        self._expect(self.client.get('/student/code/'), 200)
+        self._expect(self.client.post('/student/code/', data={'code': self.homework_code}, headers=self._csrf()), 302)
+
+    def upload(self):
+        self._expect(self.client.get('/student/upload/'), 200)
+        self._expect(self.client.post(
+            '/student/upload/', data={'student_name': self.name, 'answer_text': self.answer_text}, headers=self._csrf()
+        ), 302)
+
+    def interview_prep(self):
+        self._expect(self.client.get('/student/interview/prep/'), 200)
+        self._expect(self.client.post('/student/interview/prep/', headers=self._csrf()), 302)
+
+    def save_recording(self):
+        if self.chunk_size:
+            # What the browser does: 1-second MediaRecorder slices, then finalize
+            for seq, offset in enumerate(range(0, len(self.recording), self.chunk_size)):
+                chunk = self.recording[offset:offset + self.chunk_size]
+                self._expect(self.client.post(
+                    '/student/recording/chunk/', data={'seq': seq, 'offset': offset, 'duration': seq + 1},
+                    files={'chunk': (f'chunk_{seq}.webm', chunk, 'video/webm')}, headers=self._csrf(),
+                ), 200)
+            self._expect(self.client.post(
+                '/student/recording/finalize/', data={'total_bytes': len(self.recording)}, headers=self._csrf()
+            ), 200)
+            return
+        self._expect(self.client.post(
+            '/student/save-recording/', data={'submission_id': self.submission_id_for(self.name)},
+            files={'video': ('interview.webm', self.recording, 'video/webm')}, headers=self._csrf(),
+        ), 200)
+
+    @staticmethod
+    def _results_done(data):
+        stages = data.get('stages') or {}
+        if any(status == 'failed' for status in stages.values()):
+            raise StepError(f"Interview pipeline failed: {stages}")
+        return data.get('study_plan') == 'complete' and all(status == 'done' for status in stages.values())
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
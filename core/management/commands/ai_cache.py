@@ -0,0 +1,32 @@
+"""
+Inspect or clear the OpenAI response cache
+
+Usage:
+    python manage.py ai_cache           # show disk tier stats
+    python manage.py ai_cache --clear   # drop every cached response
+"""
+from django.core.management.base import BaseCommand, CommandError
+from core.ai_cache import get_response_cache
+
+
+class Command(BaseCommand):
+    help = 'Show statistics for, or clear, the AI response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Delete all cached responses')
+
+    def handle(self, *args, **options):
+        cache = get_response_cache()
+        if cache is None:
+            raise CommandError('AI response cache is disabled (AI_CACHE_ENABLED=False)')
+
+        if options['clear']:
+            cache.clear()
+            self.stdout.write('[OK] AI response cache cleared')
+            return
+
+        stats = cache.disk_stats()
+        self.stdout.write(f"Cache file: {cache.path}")
+        self.stdout.write(f"Entries:    {stats['entries']}")
+        self.stdout.write(f"Size:       {stats['bytes'] / 1024:.1f} KB")
+        self.stdout.write(f"Disk hits:  {stats['hits']}")
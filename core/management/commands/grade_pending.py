@@ -0,0 +1,95 @@
+"""
+Grade every pending submission of a homework in one batch run
+
+Usage:
+    python manage.py grade_pending --homework PHY-AB12-CD34 --concurrency 4
+"""
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.jobs import NEXT_STAGES, claim_job, enqueue_job, retry_or_fail_job
+from core.models import AnalysisJob, Homework
+from core.repository import save_written_feedback
+from core.services import get_ai_service
+from core.tasks import homework_context
+
+
+class Command(BaseCommand):
+    help = 'Batch-grade all submissions of a homework that are waiting for written analysis'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--homework', required=True, help='Homework code')
+        parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight (default: 4)')
+        parser.add_argument('--fresh', action='store_true', help='Bypass the AI response cache')
+
+    def handle(self, *args, **options):
+        try:
+            homework = Homework.objects.get(code=options['homework'].strip().upper())
+        except Homework.DoesNotExist:
+            raise CommandError(f"Homework {options['homework']} not found")
+
+        pending = homework.submissions.filter(
+            status='analyzing', analysis_completed_at__isnull=True
+        ).exclude(answer_text='')
+
+        # Claim each submission's written analysis job the way a worker does; submissions whose
+        # job another worker claimed first are left to it
+        worker_id = f"grade_pending:{os.getpid()}"
+        submissions, claimed_ids = {}, []
+        for sub in pending:
+            job = enqueue_job(sub, 'written_analysis')
+            if claim_job(job.id, worker_id):
+                submissions[sub.id] = sub
+                claimed_ids.append(job.id)
+        if not submissions:
+            self.stdout.write(f"No pending submissions for {homework.code}")
+            return
+
+        self.stdout.write(f"Grading {len(submissions)} submission(s) for {homework.code}...")
+        started = time.monotonic()
+
+        try:
+            feedbacks, errors = get_ai_service().analyze_written_work_batch(
+                homework_context(homework),
+                [{'id': sub.id, 'answer_text': sub.answer_text} for sub in submissions.values()],
+                concurrency=options['concurrency'],
+                use_cache=not options['fresh'],
+            )
+        except Exception as e:
+            # The whole batch failed - every claimed job is retried (or failed) like a worker's
+            print(f"[ERROR] Batch grading failed: {e}")
+            feedbacks, errors = {}, {sub_id: str(e) for sub_id in submissions}
+
+        results = {sub_id: (submissions[sub_id], feedback) for sub_id, feedback in feedbacks.items()}
+        if results:
+            save_written_feedback(results)
+
+        # Graded jobs are done; failed ones go back to the queue for the workers, or fail after
+        # AI_JOB_MAX_ATTEMPTS (only while still ours: a job taken back as stale belongs to a worker now)
+        jobs = AnalysisJob.objects.filter(id__in=claimed_ids, status='running', worker=worker_id)
+        jobs.filter(submission_id__in=results.keys()).update(status='done', finished_at=timezone.now())
+        for job in jobs.exclude(submission_id__in=results.keys()).select_related('submission'):
+            retry_or_fail_job(job, errors.get(job.submission_id, 'Not graded'))
+        for submission, _ in results.values():
+            for kind in NEXT_STAGES['written_analysis']:
+                enqueue_job(submission, kind)
+
+        elapsed = time.monotonic() - started
+        per_minute = len(results) / elapsed * 60 if elapsed > 0 else 0
+        self.stdout.write(
+            f"[OK] Graded {len(results)}/{len(submissions)} submission(s) in {elapsed:.1f}s "
+            f"({per_minute:.1f} submissions/min)"
+        )
+        for sub_id, error in errors.items():
+            self.stdout.write(f"[ERROR] {submissions[sub_id].student_name} ({sub_id}): {error}")
+
+        # Token usage, to tune AI_BATCH_* / AI_*_TOKEN_BUDGET against cost
+        # (prompt tokens from the provider's prompt cache are billed at a discount)
+        for method, usage in get_ai_service().usage_report().items():
+            prefix_hits = usage['cached_prompt_tokens'] / usage['prompt_tokens'] if usage['prompt_tokens'] else 0
+            self.stdout.write(
+                f"[TOKENS] {method}: {usage['calls']} call(s), {usage['cached']} cached, "
+                f"{usage['prompt_tokens']} prompt ({prefix_hits:.0%} from prompt cache) "
+                f"+ {usage['completion_tokens']} completion tokens"
+            )
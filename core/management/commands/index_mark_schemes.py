@@ -0,0 +1,40 @@
+"""
+Split teacher question papers / mark schemes per question (MarkSchemeEntry)
+New uploads are indexed by a background job queued when the homework is created; this
+indexes files right away, e.g. to retry files that could not be read.
+
+Usage:
+    python manage.py index_mark_schemes                      # files not indexed yet
+    python manage.py index_mark_schemes --homework PHY-AB12-CD34 --all
+"""
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Homework, HomeworkFile
+from core.mark_scheme import INDEXED_FILE_TYPES, index_homework_file, record_index_error
+
+
+class Command(BaseCommand):
+    help = 'Index the question papers and mark schemes of homeworks per question'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--homework', help='Homework code (default: every homework)')
+        parser.add_argument('--all', action='store_true', help='Re-index files that are already indexed')
+
+    def handle(self, *args, **options):
+        files = HomeworkFile.objects.filter(file_type__in=INDEXED_FILE_TYPES).select_related('homework')
+        if options['homework']:
+            try:
+                files = files.filter(homework=Homework.objects.get(code=options['homework'].upper()))
+            except Homework.DoesNotExist:
+                raise CommandError(f"No homework with code {options['homework']}")
+        if not options['all']:
+            files = files.filter(indexed_at__isnull=True)
+
+        indexed = failed = 0
+        for homework_file in files:
+            try:
+                index_homework_file(homework_file)
+                indexed += 1
+            except Exception as e:
+                record_index_error(homework_file, e)
+                failed += 1
+        self.stdout.write(f"[OK] Indexed {indexed} file(s), {failed} could not be read")
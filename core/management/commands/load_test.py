@@ -0,0 +1,285 @@
+"""
+End-to-end load test of the student flow
+Local stand-ins answer for the OpenAI and Hugging Face endpoints (core/loadtest.py). For
+each worker configuration the web server and the AI workers are started against them,
+then virtual students go through code entry, upload, review, interview prep, interview
+recording, interview submission and final results, waiting for their feedback like the
+pages do. Throughput, latency percentiles and error rates per step are reported, with
+the server-side stage timings (core/metrics.py). The load test homework and its
+submissions are deleted afterwards.
+
+Latency specs: fixed:SECONDS, uniform:LOW:HIGH or lognormal:MEDIAN:P95
+
+Usage:
+    python manage.py load_test --workers 1,2,4 --students 40 --concurrency 20
+    python manage.py load_test --chat-latency lognormal:2:8 --error-rate 0.02 --rate-limit-rate 0.05
+"""
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import httpx
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from core.audio import discard_asr_cache
+from core.loadtest import ASRStandIn, Latency, OpenAIStandIn, VirtualStudent, percentile
+from core.metrics import latency_report
+from core.models import Homework, InterviewSession, Submission
+
+
+STEPS = [
+    'student_code_entry', 'student_upload', 'student_review_progress', 'written_feedback_wait',
+    'student_interview_prep', 'student_interview', 'save_interview_recording',
+    'student_interview_submit', 'student_final_results', 'results_wait',
+]
+
+# Server-side stages worth showing next to the client steps
+SERVER_STAGE_PREFIXES = ('job.', 'queue_wait.', 'analyze_', 'generate_', 'create_', 'transcribe_', 'save_', 'store_')
+
+ANSWER_TEXT = """Q1: F = ma, so a = F / m = 20 N / 4 kg = 5 m/s^2
+Q2: v = u + at = 0 + 5 x 3 = 15 m/s
+Q3: The net force is zero, so the velocity stays constant (Newton's first law)"""
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.0f}ms" if seconds is not None else '-'
+
+
+class Command(BaseCommand):
+    help = 'Drive virtual students through the whole student flow against local AI stand-ins'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,2,4', help='AI worker counts to test, comma-separated (default: 1,2,4)')
+        parser.add_argument('--students', type=int, default=20, help='Virtual students per configuration (default: 20)')
+        parser.add_argument('--concurrency', type=int, default=10, help='Students in the flow at the same time (default: 10)')
+        parser.add_argument('--questions', type=int, default=3, help='Questions in the load test homework')
+        parser.add_argument('--chat-latency', default='lognormal:1.5:5', help='Chat completion latency (default: lognormal:1.5:5)')
+        parser.add_argument('--asr-latency', default='lognormal:2:6', help='Transcription latency (default: lognormal:2:6)')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of stand-in requests answered with a 500')
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of stand-in requests answered with a 429')
+        parser.add_argument('--recording-kb', type=int, default=256, help='Size of each interview recording (min 100)')
+        parser.add_argument('--chunk-kb', type=int, default=0,
+                            help='Upload recordings in chunks of this size like the browser (default: 0 = one save-recording request)')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between status polls')
+        parser.add_argument('--timeout', type=int, default=600, help='Longest wait for background work per student')
+        parser.add_argument('--keep', action='store_true', help='Keep the load test homework, submissions and server logs')
+
+    def handle(self, *args, **options):
+        try:
+            worker_counts = [int(count) for count in options['workers'].split(',')]
+            chat_latency, asr_latency = Latency(options['chat_latency']), Latency(options['asr_latency'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['recording_kb'] < 100:
+            raise CommandError('--recording-kb must be at least 100 (smaller recordings are rejected)')
+
+        stand_in_args = {'error_rate': options['error_rate'], 'rate_limit_rate': options['rate_limit_rate']}
+        openai_stand_in = OpenAIStandIn(chat_latency, **stand_in_args).start()
+        asr_stand_in = ASRStandIn(asr_latency, **stand_in_args).start()
+        self.stdout.write(
+            f"Stand-ins: OpenAI at {openai_stand_in.url} ({chat_latency.spec}), ASR at {asr_stand_in.url} ({asr_latency.spec}), "
+            f"{options['error_rate']:.0%} errors, {options['rate_limit_rate']:.0%} rate limited"
+        )
+
+        teacher, _ = User.objects.get_or_create(username='load_test', defaults={'is_staff': False})
+        homework = Homework.objects.create(
+            teacher=teacher,
+            code=f"LOAD-{uuid.uuid4().hex[:8].upper()}",
+            title='Load test: Forces and motion',
+            subject='Physics',
+            level='GCSE',
+            class_name='Load test',
+            due_date=date.today(),
+            total_marks=options['questions'] * 10,
+            num_questions=options['questions'],
+        )
+
+        summaries = []
+        try:
+            for workers in worker_counts:
+                summaries.append(self._run_configuration(workers, homework, openai_stand_in, asr_stand_in, options))
+        finally:
+            openai_stand_in.stop()
+            asr_stand_in.stop()
+            if not options['keep']:
+                for interview in InterviewSession.objects.filter(submission__homework=homework).exclude(recording=''):
+                    discard_asr_cache(interview.recording.path)
+                    interview.recording.delete(save=False)
+                homework.delete()
+
+        self.stdout.write("\n=== Summary ===")
+        self.stdout.write(
+            f"{'workers':>7}  {'students':>8}  {'completed':>9}  {'elapsed':>8}  {'students/s':>10}  "
+            f"{'feedback p95':>12}  {'results p95':>11}  {'step errors':>11}"
+        )
+        for row in summaries:
+            self.stdout.write(
+                f"{row['workers']:>7}  {row['students']:>8}  {row['completed']:>9}  {row['elapsed']:>7.1f}s  "
+                f"{row['throughput']:>10.2f}  {_ms(row['feedback_p95']):>12}  {_ms(row['results_p95']):>11}  "
+                f"{row['error_rate']:>10.1%}"
+            )
+
+    def _run_configuration(self, workers, homework, openai_stand_in, asr_stand_in, options):
+        """Start the server and `workers` AI workers, run the students, stop everything. Returns: summary row"""
+        self.stdout.write(f"\n=== {workers} AI worker(s) ===")
+        metrics_dir = tempfile.mkdtemp(prefix='load_test_')
+        port = _free_port()
+        env = dict(
+            os.environ,
+            OPENAI_API_KEY='load-test',
+            OPENAI_BASE_URL=f"{openai_stand_in.url}/v1",
+            ASR_BACKEND='huggingface',
+            HUGGINGFACE_API_KEY='load-test',
+            HUGGINGFACE_ASR_URL=asr_stand_in.url,
+            # Every student must reach the stand-ins, and the recordings are not real video
+            AI_CACHE_ENABLED='False',
+            ASR_PREPROCESS='False',
+            TRANSCRIPTION_STREAMING='False',
+            METRICS_DIR=metrics_dir,
+            METRICS_LOG_SPANS='False',
+        )
+        log_path = os.path.join(metrics_dir, 'server.log')
+        log = open(log_path, 'w')
+        manage = os.path.join(settings.BASE_DIR, 'manage.py')
+        processes = [
+            subprocess.Popen(
+                [sys.executable, manage, *command], cwd=settings.BASE_DIR, env=env,
+                stdout=log, stderr=subprocess.STDOUT, start_new_session=True,
+            )
+            for command in (
+                ['runserver', f'127.0.0.1:{port}', '--noreload'],
+                ['run_ai_workers', '--workers', str(workers), '--poll-interval', '0.2'],
+            )
+        ]
+        base_url = f"http://127.0.0.1:{port}"
+        stats_before = {stand_in.name: dict(stand_in.stats) for stand_in in (openai_stand_in, asr_stand_in)}
+
+        try:
+            self._wait_until_ready(base_url, processes, log_path)
+            recording = os.urandom(options['recording_kb'] * 1024)
+
+            def submission_id_for(name):
+                return Submission.objects.filter(homework=homework, student_name=name).values_list('id', flat=True).first()
+
+            def run_student(number):
+                student = VirtualStudent(
+                    base_url, homework.code, f"Load Student {workers}w-{number}", ANSWER_TEXT, recording,
+                    submission_id_for, poll_interval=options['poll_interval'], wait_timeout=options['timeout'],
+                    chunk_size=options['chunk_kb'] * 1024 or None,
+                )
+                try:
+                    return student.run()
+                finally:
+                    # submission_id_for queried from this thread
+                    connection.close()
+
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=max(1, options['concurrency'])) as pool:
+                runs = list(pool.map(run_student, range(options['students'])))
+            elapsed = time.monotonic() - started
+        finally:
+            for process in processes:
+                # SIGINT to the whole group: the server and every worker process flush their metrics on the way out
+                try:
+                    os.killpg(process.pid, signal.SIGINT)
+                except ProcessLookupError:
+                    pass
+            for process in processes:
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    os.killpg(process.pid, signal.SIGKILL)
+                    process.wait()
+            log.close()
+
+        completed = sum(1 for results in runs if results and results[-1][0] == STEPS[-1] and results[-1][2] is None)
+        self.stdout.write(
+            f"[OK] {options['students']} students in {elapsed:.1f}s: {completed} completed the flow "
+            f"({completed / elapsed:.2f} students/s)"
+        )
+
+        by_step = {step: {'times': [], 'errors': []} for step in STEPS}
+        for results in runs:
+            for step, seconds, error in results:
+                by_step[step]['errors' if error else 'times'].append(error or seconds)
+
+        width = max(len(step) for step in STEPS)
+        self.stdout.write(f"{'step'.ljust(width)}  {'count':>6}  {'p50':>8}  {'p95':>8}  {'p99':>8}  {'errors':>6}")
+        for step in STEPS:
+            times, errors = by_step[step]['times'], by_step[step]['errors']
+            if not times and not errors:
+                continue
+            self.stdout.write(
+                f"{step.ljust(width)}  {len(times) + len(errors):>6}  {_ms(percentile(times, 0.5)):>8}  "
+                f"{_ms(percentile(times, 0.95)):>8}  {_ms(percentile(times, 0.99)):>8}  {len(errors):>6}"
+            )
+        for step in STEPS:
+            if by_step[step]['errors']:
+                self.stdout.write(f"[ERROR] {step}: {by_step[step]['errors'][0]}")
+
+        for stand_in in (openai_stand_in, asr_stand_in):
+            before = stats_before[stand_in.name]
+            counts = {key: value - before[key] for key, value in stand_in.stats.items()}
+            self.stdout.write(
+                f"Stand-in {stand_in.name}: {counts['requests']} requests, "
+                f"{counts['errors']} errors, {counts['rate_limited']} rate limited"
+            )
+
+        # The processes wrote their spans to metrics_dir; the window covers the whole run
+        with override_settings(METRICS_DIR=metrics_dir, METRICS_QUANTILE_WINDOW=int(elapsed) + 3600):
+            report = {stage: row for stage, row in latency_report().items() if stage.startswith(SERVER_STAGE_PREFIXES)}
+        if report:
+            self.stdout.write("Server stages:")
+            stage_width = max(len(stage) for stage in report)
+            for stage, row in report.items():
+                self.stdout.write(
+                    f"  {stage.ljust(stage_width)}  {row['count']:>6}  {_ms(row['p50']):>8}  "
+                    f"{_ms(row['p95']):>8}  {_ms(row['p99']):>8}"
+                )
+
+        if options['keep']:
+            self.stdout.write(f"Server log and metrics kept in {metrics_dir}")
+        else:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+        steps_run = sum(len(results) for results in runs)
+        step_errors = sum(len(by_step[step]['errors']) for step in STEPS)
+        return {
+            'workers': workers,
+            'students': options['students'],
+            'completed': completed,
+            'elapsed': elapsed,
+            'throughput': completed / elapsed,
+            'feedback_p95': percentile(by_step['written_feedback_wait']['times'], 0.95),
+            'results_p95': percentile(by_step['results_wait']['times'], 0.95),
+            'error_rate': step_errors / steps_run if steps_run else 0.0,
+        }
+
+    def _wait_until_ready(self, base_url, processes, log_path):
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if any(process.poll() is not None for process in processes):
+                raise CommandError(f"The server or the AI workers exited on startup, see {log_path}")
+            try:
+                if httpx.get(f"{base_url}/health/ready/", timeout=5).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.5)
+        raise CommandError(f"The server was not ready after 60s, see {log_path}")
@@ -0,0 +1,40 @@
+"""
+Report how often interview question sets are reused instead of generated
+
+Usage:
+    python manage.py question_sets                      # all homeworks
+    python manage.py question_sets --homework PHY-AB12-CD34
+    python manage.py question_sets --homework PHY-AB12-CD34 --clear
+"""
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Homework, InterviewQuestionSet
+from core.question_sets import reuse_report
+
+
+class Command(BaseCommand):
+    help = 'Show the interview question set reuse ratio, or clear the stored sets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--homework', help='Homework code (default: every homework)')
+        parser.add_argument('--clear', action='store_true', help='Delete the stored sets (new questions are generated)')
+
+    def handle(self, *args, **options):
+        homework = None
+        if options['homework']:
+            try:
+                homework = Homework.objects.get(code=options['homework'].upper())
+            except Homework.DoesNotExist:
+                raise CommandError(f"No homework with code {options['homework']}")
+
+        if options['clear']:
+            sets = InterviewQuestionSet.objects.all()
+            if homework is not None:
+                sets = sets.filter(homework=homework)
+            deleted, _ = sets.delete()
+            self.stdout.write(f"[OK] Deleted {deleted} question set(s)")
+            return
+
+        report = reuse_report(homework)
+        self.stdout.write(f"Question sets generated:  {report['sets']}")
+        self.stdout.write(f"Interviews served:        {report['served']}")
+        self.stdout.write(f"Served from a stored set: {report['reused']} ({report['reuse_ratio']:.0%})")
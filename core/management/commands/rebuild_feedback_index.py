@@ -0,0 +1,30 @@
+"""
+Recreate the normalized feedback points and study topics from the feedback JSON fields
+
+Usage:
+    python manage.py rebuild_feedback_index                     # every homework
+    python manage.py rebuild_feedback_index --homework PHY-AB12-CD34
+"""
+from django.core.management.base import BaseCommand, CommandError
+from core.insights import rebuild_feedback_index
+from core.models import Homework
+
+
+class Command(BaseCommand):
+    help = 'Rebuild FeedbackPoint / StudyTopic rows (backfill after upgrading, or repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--homework', help='Only rebuild this homework code')
+
+    def handle(self, *args, **options):
+        homeworks = Homework.objects.all()
+        if options['homework']:
+            homeworks = homeworks.filter(code=options['homework'].strip().upper())
+            if not homeworks.exists():
+                raise CommandError(f"Homework {options['homework']} not found")
+
+        count = submissions = 0
+        for homework_id in homeworks.values_list('id', flat=True).iterator():
+            submissions += rebuild_feedback_index(homework_id)
+            count += 1
+        self.stdout.write(f"[OK] Rebuilt feedback index for {count} homework(s), {submissions} submission(s)")
@@ -0,0 +1,30 @@
+"""
+Recompute the materialized class results (HomeworkStats) from the submissions
+
+Usage:
+    python manage.py rebuild_homework_stats                     # every homework
+    python manage.py rebuild_homework_stats --homework PHY-AB12-CD34
+"""
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Homework
+from core.stats import rebuild_homework_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-homework statistics (backfill after upgrading, or repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--homework', help='Only rebuild this homework code')
+
+    def handle(self, *args, **options):
+        homeworks = Homework.objects.all()
+        if options['homework']:
+            homeworks = homeworks.filter(code=options['homework'].strip().upper())
+            if not homeworks.exists():
+                raise CommandError(f"Homework {options['homework']} not found")
+
+        count = 0
+        for homework_id in homeworks.values_list('id', flat=True).iterator():
+            rebuild_homework_stats(homework_id)
+            count += 1
+        self.stdout.write(f"[OK] Rebuilt stats for {count} homework(s)")
@@ -0,0 +1,86 @@
+"""
+Run a pool of background AI worker processes
+
+Usage:
+    python manage.py run_ai_workers --workers 4
+"""
+import multiprocessing
+import os
+import socket
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+
+def _worker_main(worker_number, poll_interval):
+    """Entry point of a worker process (also works with the 'spawn' start method)"""
+    import django
+    django.setup()
+    from core.jobs import work_forever
+    from core.metrics import flush
+
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:w{worker_number}"
+    try:
+        work_forever(worker_id, poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # multiprocessing ends the process with os._exit, which skips the atexit flush
+        flush()
+
+
+class Command(BaseCommand):
+    help = 'Run background workers that process queued AI analysis jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.AI_WORKER_COUNT,
+                            help='Number of worker processes (default: AI_WORKER_COUNT)')
+        parser.add_argument('--poll-interval', type=float, default=settings.AI_WORKER_POLL_INTERVAL,
+                            help='Seconds a worker sleeps when the queue is empty')
+        parser.add_argument('--sweep-interval', type=float, default=10.0,
+                            help='Seconds between sweeps for pending submissions and stale jobs')
+
+    def handle(self, *args, **options):
+        from core.jobs import enqueue_pending_submissions, enqueue_unindexed_files, requeue_stale_jobs
+
+        num_workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+
+        # Never share the parent's DB connections with forked workers
+        connections.close_all()
+
+        processes = {}
+
+        def start_worker(number):
+            # Not daemonic: workers may start their own process pools (local ASR backend)
+            process = multiprocessing.Process(target=_worker_main, args=(number, poll_interval))
+            process.start()
+            processes[number] = process
+
+        for number in range(num_workers):
+            start_worker(number)
+        self.stdout.write(f"[OK] Started {num_workers} AI worker(s)")
+
+        try:
+            while True:
+                close_old_connections()
+                enqueue_pending_submissions()
+                enqueue_unindexed_files()
+                requeue_stale_jobs()
+                connections.close_all()
+
+                # Replace workers that died (e.g. crashed on a bad job)
+                for number, process in list(processes.items()):
+                    if not process.is_alive():
+                        self.stdout.write(f"[WARNING] Worker {number} exited ({process.exitcode}), restarting")
+                        start_worker(number)
+
+                time.sleep(options['sweep_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping AI workers...")
+        finally:
+            for process in processes.values():
+                process.terminate()
+            for process in processes.values():
+                process.join(timeout=5)
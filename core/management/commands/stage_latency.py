@@ -0,0 +1,33 @@
+"""
+Show p50/p95/p99 latency per pipeline stage (same numbers as /metrics/)
+
+Usage:
+    python manage.py stage_latency
+    python manage.py stage_latency --stage analyze_written_work
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.metrics import latency_report
+
+
+class Command(BaseCommand):
+    help = 'Show recent latency percentiles per stage, from the metrics of every process'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stage', help='Only stages starting with this name')
+
+    def handle(self, *args, **options):
+        report = latency_report()
+        if options['stage']:
+            report = {stage: row for stage, row in report.items() if stage.startswith(options['stage'])}
+        if not report:
+            self.stdout.write(f"No spans recorded in the last {settings.METRICS_QUANTILE_WINDOW}s")
+            return
+
+        width = max(len(stage) for stage in report)
+        self.stdout.write(f"{'stage'.ljust(width)}  {'count':>6}  {'p50':>8}  {'p95':>8}  {'p99':>8}")
+        for stage, row in report.items():
+            self.stdout.write(
+                f"{stage.ljust(width)}  {row['count']:>6}  "
+                f"{row['p50']:>7.3f}s  {row['p95']:>7.3f}s  {row['p99']:>7.3f}s"
+            )
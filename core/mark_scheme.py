@@ -0,0 +1,155 @@
+"""
+Per-question index of the teacher's question paper and mark scheme
+The uploaded files are extracted (core/extraction.py) and split at the question
+headings once, by a background job queued when the homework is created. Grading then puts the per-question
+entries into the prompt: every question keeps its own mark scheme (up to a per-entry cap),
+and the question paper and general text are cut to fit the rest of the budget.
+"""
+import re
+from django.db import transaction
+from django.utils import timezone
+from .extraction import extract_text
+from .models import MarkSchemeEntry
+from .tokens import count_tokens, truncate_tokens
+
+
+INDEXED_FILE_TYPES = ['questions', 'mark_scheme']
+
+# Tokens every included entry gets, however small the budget
+MIN_ENTRY_TOKENS = 50
+
+# "Q3", "Q 3", "Question 3", "QUESTION 3:" at the start of a line
+STRONG_HEADING = re.compile(r'^\s*(?:q|question)\s*\.?\s*(\d{1,2})\b', re.IGNORECASE)
+# "3.", "3)", "(3)", "3 (a)" at the start of a line - only used when no strong headings exist
+NUMBER_HEADING = re.compile(r'^\s*\(?(\d{1,2})(?:[.):]|\s*\([a-z]\)|\s*$)', re.IGNORECASE)
+
+
+def _heading_pattern(lines):
+    return STRONG_HEADING if any(STRONG_HEADING.match(line) for line in lines) else NUMBER_HEADING
+
+
+def split_by_question(text, num_questions):
+    """
+    Split a document at its question headings
+    Headings must come in order (1, 2, 3...), so numbered sub-points and
+    "2 marks" lines inside a question don't start a new one.
+    Returns: dict of question number -> text (0 = anything before question 1)
+    """
+    lines = text.splitlines()
+    pattern = _heading_pattern(lines)
+
+    sections = {0: []}
+    current, expected = 0, 1
+    for line in lines:
+        match = pattern.match(line)
+        if match and int(match.group(1)) == expected and expected <= num_questions:
+            current, expected = expected, expected + 1
+            sections[current] = []
+        sections[current].append(line)
+
+    return {number: '\n'.join(body).strip() for number, body in sections.items() if '\n'.join(body).strip()}
+
+
+def index_homework_file(homework_file):
+    """
+    Extract a question paper / mark scheme and replace its per-question entries
+    Returns: number of entries stored
+    RAISES: ExtractionError for unreadable files, or the AI error of a failed page transcription
+    """
+    homework = homework_file.homework
+    text = extract_text(homework_file.file.path)
+
+    sections = split_by_question(text, homework.num_questions)
+    with transaction.atomic():
+        MarkSchemeEntry.objects.filter(homework=homework, source=homework_file.file_type).delete()
+        MarkSchemeEntry.objects.bulk_create([
+            MarkSchemeEntry(homework=homework, source=homework_file.file_type, question_number=number, text=body)
+            for number, body in sections.items()
+        ])
+        homework_file.indexed_at = timezone.now()
+        homework_file.index_error = ''
+        homework_file.save(update_fields=['indexed_at', 'index_error'])
+    questions = len([number for number in sections if number])
+    print(f"[OK] Indexed {homework_file.file_name}: {questions} of {homework.num_questions} question(s) found")
+    return len(sections)
+
+
+def record_index_error(homework_file, error):
+    """The file could not be indexed (after every retry): grading goes on without it"""
+    homework_file.index_error = str(error)
+    homework_file.save(update_fields=['index_error'])
+    print(f"[WARNING] Could not index {homework_file.file_name}: {error}")
+
+
+def marking_guide(homework):
+    """
+    Indexed question text and mark scheme of a homework
+    Returns: dict of question number -> {'question': str, 'mark_scheme': str} (0 = general)
+    """
+    guide = {}
+    for entry in MarkSchemeEntry.objects.filter(homework=homework):
+        guide.setdefault(entry.question_number, {'question': '', 'mark_scheme': ''})
+        guide[entry.question_number]['question' if entry.source == 'questions' else 'mark_scheme'] = entry.text
+    return guide
+
+
+def _share(keys, sizes, remaining, cap, minimum):
+    """
+    Split `remaining` tokens between entries, each getting at most `cap`
+    Short entries are kept whole; what they leave is shared by the longer ones.
+    Returns: (dict of key -> token limit, tokens left over)
+    """
+    limits = {}
+    ordered = sorted(keys, key=lambda key: sizes[key])
+    for index, key in enumerate(ordered):
+        share = min(cap, max(minimum, remaining // (len(ordered) - index)))
+        limits[key] = share
+        remaining = max(0, remaining - min(share, sizes[key]))
+    return limits, remaining
+
+
+def guide_excerpt(guide, budget, entry_cap, model=None):
+    """
+    Prompt section with the guide entries, sized per question
+    The whole guide is sent (not the questions of one answer) because it is part of the
+    prompt prefix shared by the homework's students (see core/prompts.py). Each question's
+    mark scheme is included whole up to `entry_cap` tokens, however long the guide. What it
+    leaves of `budget` goes to the question paper text, and then to the general section,
+    which is truncated (or left out) first.
+    Returns: str ('' when there is no guide)
+    """
+    if not guide:
+        return ''
+    selected = sorted(guide)
+
+    sizes = {
+        (number, field): count_tokens(guide[number][field], model)
+        for number in selected for field in ('question', 'mark_scheme') if guide[number][field]
+    }
+    mark_schemes = [key for key in sizes if key[0] and key[1] == 'mark_scheme']
+    questions = [key for key in sizes if key[0] and key[1] == 'question']
+    general = [key for key in sizes if not key[0]]
+
+    limits = {key: entry_cap for key in mark_schemes}
+    remaining = max(0, budget - sum(min(sizes[key], entry_cap) for key in mark_schemes))
+    question_limits, remaining = _share(questions, sizes, remaining, entry_cap, MIN_ENTRY_TOKENS)
+    general_limits, _ = _share(general, sizes, remaining, entry_cap, 0)
+    limits.update(question_limits)
+    limits.update(general_limits)
+
+    def capped(key):
+        text = guide[key[0]][key[1]]
+        truncated = truncate_tokens(text, limits[key], model)
+        return truncated if truncated == text else truncated.rstrip() + ' [...]'
+
+    blocks = []
+    for number in selected:
+        label = 'GENERAL' if number == 0 else f'QUESTION {number}'
+        lines = [f"{label}:"]
+        if limits.get((number, 'question')):
+            lines.append(f"Question paper: {capped((number, 'question'))}")
+        if limits.get((number, 'mark_scheme')):
+            lines.append(f"Mark scheme: {capped((number, 'mark_scheme'))}")
+        if len(lines) > 1:
+            blocks.append('\n'.join(lines))
+    return '\n\n'.join(blocks)
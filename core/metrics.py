@@ -0,0 +1,307 @@
+"""
+Timing spans and Prometheus metrics
+Every pipeline stage and external call runs inside span(stage): its duration goes into a
+histogram per stage and outcome, token counts and payload sizes attached to the span are
+added to counters, and a [SPAN] line is logged. The web server and the AI workers are
+separate processes, so each process writes its numbers to METRICS_DIR every
+METRICS_FLUSH_SECONDS and the /metrics view adds them all up.
+
+Exposed at /metrics/ (Prometheus text format):
+  buddybud_stage_duration_seconds{stage, outcome}   histogram
+  buddybud_stage_latency_seconds{stage, quantile}   p50/p95/p99 over the last METRICS_QUANTILE_WINDOW seconds
+  buddybud_stage_tokens_total{stage, type}           prompt / completion / cached_prompt tokens
+  buddybud_stage_bytes_total{stage}                  payload bytes (uploads, audio, answer files)
+"""
+import atexit
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+# Histogram bucket upper bounds in seconds: DB writes and uploads at the low end, LLM and ASR calls at the top
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Recent durations kept per stage for the quantiles
+MAX_RECENT = 1000
+
+# Files of processes that stopped writing this long ago are deleted (Prometheus treats the drop as a counter reset)
+STALE_FILE_SECONDS = 24 * 3600
+
+# Span attributes added to the counters (the others are only logged)
+TOKEN_ATTRIBUTES = {'prompt_tokens': 'prompt', 'completion_tokens': 'completion', 'cached_prompt_tokens': 'cached_prompt'}
+BYTES_ATTRIBUTE = 'bytes'
+
+_lock = threading.Lock()
+_durations = {}  # (stage, outcome) -> [bucket counts..., +Inf count, sum]
+_recent = {}     # stage -> deque of (finished at, seconds)
+_tokens = {}     # (stage, type) -> count
+_bytes = {}      # stage -> count
+_last_flush = 0.0
+
+
+class Span:
+    """Attributes and outcome of one timed operation (see span())"""
+
+    def __init__(self, stage, attributes):
+        self.stage = stage
+        self.attributes = dict(attributes)
+        self.outcome = 'ok'
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+@contextmanager
+def span(stage, **attributes):
+    """
+    Time the block as `stage`
+    Attributes passed here or added with span.set(...) are logged; prompt_tokens,
+    completion_tokens, cached_prompt_tokens and bytes are also counted.
+    The outcome is 'error' if the block raises; it can be set (e.g. 'cached') with span.outcome.
+    """
+    current = Span(stage, attributes)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException:
+        current.outcome = 'error'
+        raise
+    finally:
+        _record(current, time.perf_counter() - started)
+
+
+def timed(stage):
+    """Decorator: run the function inside span(stage)"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe(stage, seconds, outcome='ok'):
+    """Record a duration measured elsewhere (e.g. time a job waited in the queue)"""
+    _record(Span(stage, {}), seconds, outcome=outcome, log=False)
+
+
+def _record(current, seconds, outcome=None, log=True):
+    outcome = outcome or current.outcome
+    with _lock:
+        row = _durations.get((current.stage, outcome))
+        if row is None:
+            row = _durations[(current.stage, outcome)] = [0] * (len(BUCKETS) + 2)
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                row[index] += 1
+        row[-2] += 1
+        row[-1] += seconds
+        _recent.setdefault(current.stage, deque(maxlen=MAX_RECENT)).append((time.time(), seconds))
+
+        for name, value in current.attributes.items():
+            if name in TOKEN_ATTRIBUTES and value:
+                key = (current.stage, TOKEN_ATTRIBUTES[name])
+                _tokens[key] = _tokens.get(key, 0) + value
+            elif name == BYTES_ATTRIBUTE and value:
+                _bytes[current.stage] = _bytes.get(current.stage, 0) + value
+
+    if log and settings.METRICS_LOG_SPANS:
+        details = ''.join(f" {name}={value}" for name, value in current.attributes.items() if value is not None)
+        print(f"[SPAN] {current.stage} {seconds * 1000:.0f}ms {outcome}{details}")
+    _maybe_flush()
+
+
+# --- Sharing between processes ---
+
+def _snapshot():
+    with _lock:
+        return {
+            'durations': [[stage, outcome, list(row)] for (stage, outcome), row in _durations.items()],
+            'recent': {stage: list(values) for stage, values in _recent.items()},
+            'tokens': [[stage, kind, value] for (stage, kind), value in _tokens.items()],
+            'bytes': dict(_bytes),
+        }
+
+
+def flush():
+    """Write this process's metrics to METRICS_DIR (replacing its previous file)"""
+    global _last_flush
+    _last_flush = time.monotonic()
+    directory = settings.METRICS_DIR
+    if not directory or not _durations:
+        # Nothing timed (e.g. a management command): don't leave an empty file behind
+        return
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{os.getpid()}.json")
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(_snapshot(), f)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"[WARNING] Could not write metrics to {directory}: {e}")
+
+
+def _maybe_flush():
+    if time.monotonic() - _last_flush >= settings.METRICS_FLUSH_SECONDS:
+        flush()
+
+
+atexit.register(flush)
+
+
+def _collect():
+    """This process's metrics plus the last flushed metrics of every other process"""
+    snapshots = [_snapshot()]
+    directory = settings.METRICS_DIR
+    if directory and os.path.isdir(directory):
+        own = f"{os.getpid()}.json"
+        for name in os.listdir(directory):
+            if not name.endswith('.json') or name == own:
+                continue
+            path = os.path.join(directory, name)
+            try:
+                if time.time() - os.path.getmtime(path) > STALE_FILE_SECONDS:
+                    os.remove(path)
+                    continue
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+    durations, recent, tokens, payload = {}, {}, {}, {}
+    since = time.time() - settings.METRICS_QUANTILE_WINDOW
+    for snapshot in snapshots:
+        for stage, outcome, row in snapshot['durations']:
+            total = durations.setdefault((stage, outcome), [0] * len(row))
+            for index, value in enumerate(row):
+                total[index] += value
+        for stage, values in snapshot['recent'].items():
+            recent.setdefault(stage, []).extend(seconds for finished, seconds in values if finished >= since)
+        for stage, kind, value in snapshot['tokens']:
+            tokens[(stage, kind)] = tokens.get((stage, kind), 0) + value
+        for stage, value in snapshot['bytes'].items():
+            payload[stage] = payload.get(stage, 0) + value
+    return durations, recent, tokens, payload
+
+
+def _quantile(ordered, q):
+    """Nearest-rank quantile of a sorted list"""
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return f"{value:.6f}".rstrip('0').rstrip('.') if isinstance(value, float) else str(value)
+
+
+def latency_report():
+    """
+    Percentiles per stage over the last METRICS_QUANTILE_WINDOW seconds, all processes
+    Returns: dict stage -> {'count', 'p50', 'p95', 'p99'} (seconds)
+    """
+    _, recent, _, _ = _collect()
+    report = {}
+    for stage, values in sorted(recent.items()):
+        if values:
+            ordered = sorted(values)
+            report[stage] = dict(
+                count=len(ordered), **{f"p{round(q * 100)}": _quantile(ordered, q) for q in QUANTILES}
+            )
+    return report
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    durations, recent, tokens, payload = _collect()
+    lines = [
+        '# HELP buddybud_stage_duration_seconds Duration of pipeline stages and external calls',
+        '# TYPE buddybud_stage_duration_seconds histogram',
+    ]
+    for (stage, outcome), row in sorted(durations.items()):
+        labels = f'stage="{_label(stage)}",outcome="{_label(outcome)}"'
+        for bound, count in zip(BUCKETS, row):
+            lines.append(f'buddybud_stage_duration_seconds_bucket{{{labels},le="{_number(float(bound))}"}} {count}')
+        lines.append(f'buddybud_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {row[-2]}')
+        lines.append(f'buddybud_stage_duration_seconds_count{{{labels}}} {row[-2]}')
+        lines.append(f'buddybud_stage_duration_seconds_sum{{{labels}}} {_number(float(row[-1]))}')
+
+    lines += [
+        f'# HELP buddybud_stage_latency_seconds Stage latency percentiles over the last {settings.METRICS_QUANTILE_WINDOW}s',
+        '# TYPE buddybud_stage_latency_seconds summary',
+    ]
+    for stage, values in sorted(recent.items()):
+        if not values:
+            continue
+        ordered = sorted(values)
+        for q in QUANTILES:
+            lines.append(f'buddybud_stage_latency_seconds{{stage="{_label(stage)}",quantile="{q}"}} {_number(float(_quantile(ordered, q)))}')
+        lines.append(f'buddybud_stage_latency_seconds_count{{stage="{_label(stage)}"}} {len(ordered)}')
+        lines.append(f'buddybud_stage_latency_seconds_sum{{stage="{_label(stage)}"}} {_number(float(sum(ordered)))}')
+
+    lines += [
+        '# HELP buddybud_stage_tokens_total Tokens used by AI calls',
+        '# TYPE buddybud_stage_tokens_total counter',
+    ]
+    for (stage, kind), value in sorted(tokens.items()):
+        lines.append(f'buddybud_stage_tokens_total{{stage="{_label(stage)}",type="{_label(kind)}"}} {value}')
+
+    lines += [
+        '# HELP buddybud_stage_bytes_total Payload bytes handled (uploads, audio, answer files)',
+        '# TYPE buddybud_stage_bytes_total counter',
+    ]
+    for stage, value in sorted(payload.items()):
+        lines.append(f'buddybud_stage_bytes_total{{stage="{_label(stage)}"}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class RequestMetricsMiddleware:
+    """Times every request as span 'http.<url name>' (uploads count their body size)"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            # Under ASGI: no hop to the sync thread for every request
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, started)
+        return response
+
+    def _record(self, request, response, started):
+        match = request.resolver_match
+        stage = f"http.{match.url_name if match and match.url_name else 'unmatched'}"
+        current = Span(stage, {'status': response.status_code})
+        try:
+            current.attributes[BYTES_ATTRIBUTE] = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            pass
+        if response.status_code >= 500:
+            current.outcome = 'error'
+        # Not logged: status polling alone would flood the log
+        _record(current, time.perf_counter() - started, log=False)
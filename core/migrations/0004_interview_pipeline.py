@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_analysisjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studyplan',
+            name='includes_interview',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='analysisjob',
+            name='kind',
+            field=models.CharField(choices=[('written_analysis', 'Written Analysis'), ('interview_transcribe', 'Interview Transcription'), ('interview_analyze', 'Interview Analysis'), ('study_plan', 'Study Plan')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_interview_pipeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='force_fresh',
+            field=models.BooleanField(default=False),
+        ),
+    ]
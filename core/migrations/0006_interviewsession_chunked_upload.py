@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_analysisjob_force_fresh'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewsession',
+            name='recording_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='interviewsession',
+            name='recording_chunks',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='interviewsession',
+            name='recording_finalized',
+            field=models.BooleanField(default=False),
+        ),
+    ]
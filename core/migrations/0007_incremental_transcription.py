@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_interviewsession_chunked_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewsession',
+            name='transcribed_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='interviewsession',
+            name='transcription_complete',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='analysisjob',
+            name='kind',
+            field=models.CharField(choices=[('written_analysis', 'Written Analysis'), ('interview_transcribe', 'Interview Transcription'), ('transcribe_stream', 'Incremental Transcription'), ('interview_analyze', 'Interview Analysis'), ('study_plan', 'Study Plan')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_incremental_transcription'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewsession',
+            name='asr_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='interviewsession',
+            name='asr_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='interviewsession',
+            name='audio_original_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='interviewsession',
+            name='audio_original_seconds',
+            field=models.FloatField(default=0),
+        ),
+    ]
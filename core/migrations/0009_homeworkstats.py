@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_asr_payload_report'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HomeworkStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_submissions', models.IntegerField(default=0)),
+                ('completed_submissions', models.IntegerField(default=0)),
+                ('overall_score_sum', models.BigIntegerField(default=0)),
+                ('score_90_100', models.IntegerField(default=0)),
+                ('score_80_89', models.IntegerField(default=0)),
+                ('score_70_79', models.IntegerField(default=0)),
+                ('score_60_69', models.IntegerField(default=0)),
+                ('score_below_60', models.IntegerField(default=0)),
+                ('higher_verbal', models.IntegerField(default=0)),
+                ('higher_written', models.IntegerField(default=0)),
+                ('consistent', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('homework', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='core.homework')),
+            ],
+            options={
+                'verbose_name_plural': 'homework stats',
+            },
+        ),
+    ]
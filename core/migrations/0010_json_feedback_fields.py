@@ -0,0 +1,104 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Text columns that held json.dumps() lists and become JSONFields
+JSON_TEXT_FIELDS = {
+    'Submission': ['overall_strengths', 'overall_improvements'],
+    'QuestionFeedback': ['strengths', 'improvements'],
+    'InterviewSession': ['strong_moments', 'development_areas'],
+    'StudyPlan': ['priority_topics', 'strength_topics'],
+}
+
+
+def empty_text_to_json_list(apps, schema_editor):
+    """Blank/NULL text is not valid JSON - store an empty list before the column type changes"""
+    for model_name, fields in JSON_TEXT_FIELDS.items():
+        model = apps.get_model('core', model_name)
+        for field in fields:
+            model.objects.filter(**{field: ''}).update(**{field: '[]'})
+            model.objects.filter(**{f'{field}__isnull': True}).update(**{field: '[]'})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_homeworkstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(empty_text_to_json_list, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='interviewsession',
+            name='development_areas',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AlterField(
+            model_name='interviewsession',
+            name='strong_moments',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AlterField(
+            model_name='questionfeedback',
+            name='improvements',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='questionfeedback',
+            name='strengths',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='studyplan',
+            name='priority_topics',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='studyplan',
+            name='strength_topics',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='overall_improvements',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AlterField(
+            model_name='submission',
+            name='overall_strengths',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='StudyTopic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('priority', 'Priority Topic'), ('strength', 'Strength Topic')], max_length=20)),
+                ('topic', models.CharField(max_length=200)),
+                ('topic_key', models.CharField(max_length=200)),
+                ('priority', models.CharField(blank=True, max_length=20)),
+                ('current_score', models.IntegerField(blank=True, null=True)),
+                ('homework', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='study_topics', to='core.homework')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='study_topics', to='core.submission')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['homework', 'kind', 'topic_key'], name='core_studyt_homewor_c04e8f_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FeedbackPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('strength', 'Strength'), ('improvement', 'Improvement'), ('strong_moment', 'Interview Strong Moment'), ('development_area', 'Interview Development Area')], max_length=20)),
+                ('question_number', models.IntegerField(blank=True, null=True)),
+                ('text', models.TextField()),
+                ('text_key', models.CharField(max_length=255)),
+                ('homework', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feedback_points', to='core.homework')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feedback_points', to='core.submission')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['homework', 'kind', 'text_key'], name='core_feedba_homewor_a7a082_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_json_feedback_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analysisjob',
+            name='kind',
+            field=models.CharField(choices=[('written_analysis', 'Written Analysis'), ('interview_questions', 'Interview Questions'), ('interview_transcribe', 'Interview Transcription'), ('transcribe_stream', 'Incremental Transcription'), ('interview_analyze', 'Interview Analysis'), ('study_plan', 'Study Plan')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_interview_questions_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterviewQuestionSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('weak_areas', models.JSONField(default=list)),
+                ('questions', models.JSONField(default=list)),
+                ('uses', models.IntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now=True)),
+                ('homework', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_sets', to='core.homework')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['homework', 'fingerprint'], name='core_interv_homewor_dadb15_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_interview_question_sets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('extractor', models.CharField(max_length=20)),
+                ('pages', models.IntegerField(default=1)),
+                ('text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='analysisjob',
+            name='kind',
+            field=models.CharField(choices=[('text_extraction', 'Answer File Text Extraction'), ('written_analysis', 'Written Analysis'), ('interview_questions', 'Interview Questions'), ('interview_transcribe', 'Interview Transcription'), ('transcribe_stream', 'Incremental Transcription'), ('interview_analyze', 'Interview Analysis'), ('study_plan', 'Study Plan')], max_length=30),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_answer_file_extraction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='homeworkfile',
+            name='index_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='homeworkfile',
+            name='indexed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='MarkSchemeEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('questions', 'Question Paper'), ('mark_scheme', 'Mark Scheme')], max_length=20)),
+                ('question_number', models.IntegerField()),
+                ('text', models.TextField()),
+                ('homework', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mark_scheme_entries', to='core.homework')),
+            ],
+            options={
+                'ordering': ['question_number'],
+                'unique_together': {('homework', 'source', 'question_number')},
+            },
+        ),
+    ]
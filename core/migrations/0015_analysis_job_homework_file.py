@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_mark_scheme_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='homework_file',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='core.homeworkfile'),
+        ),
+        migrations.AlterField(
+            model_name='analysisjob',
+            name='kind',
+            field=models.CharField(choices=[('text_extraction', 'Answer File Text Extraction'), ('written_analysis', 'Written Analysis'), ('interview_questions', 'Interview Questions'), ('interview_transcribe', 'Interview Transcription'), ('transcribe_stream', 'Incremental Transcription'), ('interview_analyze', 'Interview Analysis'), ('study_plan', 'Study Plan'), ('mark_scheme_index', 'Mark Scheme Indexing')], max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='analysisjob',
+            name='submission',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='core.submission'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_analysis_job_homework_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewsession',
+            name='recorded_seconds',
+            field=models.FloatField(default=0),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:57
+
+from django.db import migrations
+
+
+def merge_duplicate_sets(apps, schema_editor):
+    """Keep the most used set of each (homework, fingerprint), adding the others' uses to it"""
+    InterviewQuestionSet = apps.get_model('core', 'InterviewQuestionSet')
+    kept = {}
+    for question_set in InterviewQuestionSet.objects.order_by('-uses', 'id'):
+        key = (question_set.homework_id, question_set.fingerprint)
+        if key not in kept:
+            kept[key] = question_set
+            continue
+        kept[key].uses += question_set.uses
+        kept[key].save(update_fields=['uses'])
+        question_set.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_interview_recorded_seconds'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_sets, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='interviewquestionset',
+            name='core_interv_homewor_dadb15_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='interviewquestionset',
+            unique_together={('homework', 'fingerprint')},
+        ),
+    ]
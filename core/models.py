@@ -32,11 +32,33 @@ class HomeworkFile(models.Model):
     file = models.FileField(upload_to='homework_files/')
     file_name = models.CharField(max_length=255)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Questions / mark scheme split per question into MarkSchemeEntry rows (see core/mark_scheme.py)
+    indexed_at = models.DateTimeField(null=True, blank=True)
+    index_error = models.TextField(blank=True)
 
     def __str__(self):
         return f"{self.homework.code} - {self.file_type}"
 
 
+class MarkSchemeEntry(models.Model):
+    """The part of a teacher's question paper or mark scheme that belongs to one question"""
+    SOURCES = [
+        ('questions', 'Question Paper'),
+        ('mark_scheme', 'Mark Scheme'),
+    ]
+    homework = models.ForeignKey(Homework, on_delete=models.CASCADE, related_name='mark_scheme_entries')
+    source = models.CharField(max_length=20, choices=SOURCES)
+    question_number = models.IntegerField()  # 0 = text before the first question (general instructions)
+    text = models.TextField()
+
+    class Meta:
+        ordering = ['question_number']
+        unique_together = ['homework', 'source', 'question_number']
+
+    def __str__(self):
+        return f"{self.homework.code} - {self.source} Q{self.question_number}"
+
+
 class Submission(models.Model):
     homework = models.ForeignKey(Homework, on_delete=models.CASCADE, related_name='submissions')
     student_name = models.CharField(max_length=200)
@@ -49,8 +71,8 @@ class Submission(models.Model):
     overall_score = models.IntegerField(default=0)
     
     # Overall feedback
-    overall_strengths = models.TextField(blank=True)
-    overall_improvements = models.TextField(blank=True)
+    overall_strengths = models.JSONField(default=list, blank=True)  # List of strength points
+    overall_improvements = models.JSONField(default=list, blank=True)  # List of improvement points
     analysis_completed_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
@@ -67,8 +89,8 @@ class QuestionFeedback(models.Model):
     percentage = models.IntegerField()
     
     # Detailed feedback
-    strengths = models.TextField()  # JSON array of strength points
-    improvements = models.TextField()  # JSON array of improvement points
+    strengths = models.JSONField(default=list)  # List of strength points
+    improvements = models.JSONField(default=list)  # List of improvement points
     detailed_analysis = models.TextField(blank=True)  # AI-generated detailed analysis
     
     created_at = models.DateTimeField(auto_now_add=True)
@@ -88,7 +110,21 @@ class InterviewSession(models.Model):
     duration_seconds = models.IntegerField(default=0)
     video_url = models.CharField(max_length=500, blank=True)
     recording = models.FileField(upload_to='interview_recordings/', blank=True, null=True)
+    # Chunked upload progress (acknowledged bytes/chunks, see core/recording.py)
+    recording_bytes = models.BigIntegerField(default=0)
+    recording_chunks = models.IntegerField(default=0)
+    recording_finalized = models.BooleanField(default=False)
+    # Seconds recorded up to the last acknowledged chunk, as timed by the browser
+    recorded_seconds = models.FloatField(default=0)
     transcription = models.TextField(blank=True, null=True)  # NEW: Speech-to-text transcription
+    # Incremental transcription: seconds of the recording already transcribed while recording
+    transcribed_seconds = models.FloatField(default=0)
+    transcription_complete = models.BooleanField(default=False)
+    # ASR payload report: recording vs. preprocessed audio actually sent for transcription
+    audio_original_bytes = models.BigIntegerField(default=0)
+    audio_original_seconds = models.FloatField(default=0)
+    asr_bytes = models.BigIntegerField(default=0)
+    asr_seconds = models.FloatField(default=0)
     status = models.CharField(max_length=20, default='pending')
     
     # Interview analysis
@@ -96,8 +132,8 @@ class InterviewSession(models.Model):
     conceptual_understanding_score = models.IntegerField(default=0)  # Out of 100
     creative_application_score = models.IntegerField(default=0)  # Out of 100
     
-    strong_moments = models.TextField(blank=True)  # JSON array
-    development_areas = models.TextField(blank=True)  # JSON array
+    strong_moments = models.JSONField(default=list, blank=True)  # List of points
+    development_areas = models.JSONField(default=list, blank=True)  # List of points
     overall_analysis = models.TextField(blank=True)
 
     def __str__(self):
@@ -128,17 +164,186 @@ class StudyPlan(models.Model):
     """Personalized study plan generated after complete analysis"""
     submission = models.OneToOneField(Submission, on_delete=models.CASCADE, related_name='study_plan')
     
-    # Priority focus areas (JSON)
-    priority_topics = models.TextField()  # JSON array of {topic, priority, score, actions}
+    # Priority focus areas
+    priority_topics = models.JSONField(default=list)  # List of {topic, priority, current_score, actions}
     
     # Strengths to maintain
-    strength_topics = models.TextField()  # JSON array
+    strength_topics = models.JSONField(default=list)  # List of topic names
     
     # Learning insights
     written_vs_verbal_analysis = models.TextField()
     learning_style_insights = models.TextField()
     
+    # False while the plan is based on written work only (interview still processing)
+    includes_interview = models.BooleanField(default=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Study Plan - {self.submission.student_name}"
+
+
+class AnalysisJob(models.Model):
+    """Queued AI work picked up by the background workers (manage.py run_ai_workers)"""
+    KINDS = [
+        ('text_extraction', 'Answer File Text Extraction'),
+        ('written_analysis', 'Written Analysis'),
+        ('interview_questions', 'Interview Questions'),
+        ('interview_transcribe', 'Interview Transcription'),
+        ('transcribe_stream', 'Incremental Transcription'),
+        ('interview_analyze', 'Interview Analysis'),
+        ('study_plan', 'Study Plan'),
+        ('mark_scheme_index', 'Mark Scheme Indexing'),
+    ]
+    STATUSES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    # A student's submission, or for mark_scheme_index a teacher's homework file
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    homework_file = models.ForeignKey(HomeworkFile, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    kind = models.CharField(max_length=30, choices=KINDS)
+    status = models.CharField(max_length=20, choices=STATUSES, default='queued')
+    attempts = models.IntegerField(default=0)
+    force_fresh = models.BooleanField(default=False)  # Bypass the AI response cache (teacher regrade)
+    worker = models.CharField(max_length=100, blank=True)  # Worker that last claimed the job
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        target = self.submission.student_name if self.submission else self.homework_file.file_name
+        return f"{self.kind} - {target} ({self.status})"
+
+
+class HomeworkStats(models.Model):
+    """
+    Class results of a homework, kept up to date as submissions change (see core/stats.py)
+    Rebuild with: python manage.py rebuild_homework_stats
+    """
+    homework = models.OneToOneField(Homework, on_delete=models.CASCADE, related_name='stats')
+    total_submissions = models.IntegerField(default=0)
+    completed_submissions = models.IntegerField(default=0)
+    overall_score_sum = models.BigIntegerField(default=0)  # Over completed submissions
+    
+    # Score distribution of completed submissions
+    score_90_100 = models.IntegerField(default=0)
+    score_80_89 = models.IntegerField(default=0)
+    score_70_79 = models.IntegerField(default=0)
+    score_60_69 = models.IntegerField(default=0)
+    score_below_60 = models.IntegerField(default=0)
+    
+    # Interview vs written score of completed submissions
+    higher_verbal = models.IntegerField(default=0)
+    higher_written = models.IntegerField(default=0)
+    consistent = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'homework stats'
+
+    @classmethod
+    def counter_fields(cls):
+        return [
+            field for field in cls._meta.concrete_fields
+            if isinstance(field, (models.IntegerField, models.BigIntegerField)) and not field.primary_key
+        ]
+
+    @property
+    def average_score(self):
+        return self.overall_score_sum // self.completed_submissions if self.completed_submissions else 0
+
+    @property
+    def completion_rate(self):
+        return self.completed_submissions * 100 // self.total_submissions if self.total_submissions else 0
+
+    def __str__(self):
+        return f"Stats - {self.homework.code}"
+
+
+class FeedbackPoint(models.Model):
+    """
+    One strength/improvement point copied out of the feedback lists into an indexed table,
+    so class-wide questions ("which improvements recur?") are SQL aggregations (see core/insights.py)
+    """
+    KINDS = [
+        ('strength', 'Strength'),
+        ('improvement', 'Improvement'),
+        ('strong_moment', 'Interview Strong Moment'),
+        ('development_area', 'Interview Development Area'),
+    ]
+    homework = models.ForeignKey(Homework, on_delete=models.CASCADE, related_name='feedback_points')
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='feedback_points')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    question_number = models.IntegerField(null=True, blank=True)  # None = overall or interview feedback
+    text = models.TextField()
+    text_key = models.CharField(max_length=255)  # Lowercased, whitespace-collapsed text for grouping
+
+    class Meta:
+        indexes = [models.Index(fields=['homework', 'kind', 'text_key'])]
+
+    def __str__(self):
+        return f"{self.kind} - {self.text[:50]}"
+
+
+class StudyTopic(models.Model):
+    """One topic of a study plan, normalized for per-homework topic statistics"""
+    KINDS = [
+        ('priority', 'Priority Topic'),
+        ('strength', 'Strength Topic'),
+    ]
+    homework = models.ForeignKey(Homework, on_delete=models.CASCADE, related_name='study_topics')
+    submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name='study_topics')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    topic = models.CharField(max_length=200)
+    topic_key = models.CharField(max_length=200)  # Lowercased, whitespace-collapsed topic for grouping
+    priority = models.CharField(max_length=20, blank=True)  # high / medium (priority topics)
+    current_score = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['homework', 'kind', 'topic_key'])]
+
+    def __str__(self):
+        return f"{self.kind} - {self.topic}"
+
+
+class InterviewQuestionSet(models.Model):
+    """
+    Interview questions generated for one set of weak areas, shared by the students of a
+    homework whose weak areas are the same or similar (see core/question_sets.py)
+    """
+    homework = models.ForeignKey(Homework, on_delete=models.CASCADE, related_name='question_sets')
+    fingerprint = models.CharField(max_length=64)  # Hash of the normalized, sorted weak areas
+    weak_areas = models.JSONField(default=list)
+    questions = models.JSONField(default=list)  # [{number, type, question}, ...] as generated
+    uses = models.IntegerField(default=1)  # Interviews served, including the one it was generated for
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # One set per weak-area fingerprint: concurrent generations for it store a single set
+        unique_together = ['homework', 'fingerprint']
+
+    def __str__(self):
+        return f"Questions - {self.homework.code} ({', '.join(self.weak_areas)[:50]})"
+
+
+class ExtractedText(models.Model):
+    """Text extracted from an uploaded answer file, keyed by the file's content hash (see core/extraction.py)"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    extractor = models.CharField(max_length=20)  # pdf, docx, doc, txt, image
+    pages = models.IntegerField(default=1)
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.extractor} - {self.sha256[:12]}"
@@ -0,0 +1,226 @@
+"""
+Shared, rate-limited OpenAI client
+One client per process with a pooled keep-alive HTTP connection. Every request first
+takes its share of the per-process request and token budgets (token buckets refilled
+continuously), waits for a concurrency slot, and is retried with jittered
+exponential backoff on 429 / 5xx / timeouts, honoring the server's Retry-After.
+
+The account limits (OPENAI_RPM_LIMIT / OPENAI_TPM_LIMIT) are split evenly between
+OPENAI_PROCESSES processes (the AI workers plus the web server by default).
+"""
+import random
+import threading
+import time
+import httpx
+import openai
+from openai import OpenAI
+from django.conf import settings
+
+
+class TokenBucket:
+    """Continuously refilled bucket: `rate_per_minute` units, bursting up to one minute's worth"""
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` is available (0 if it is available now)"""
+        self._refill(now)
+        # A request larger than the bucket only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= amount
+
+    def give_back(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets plus a concurrency cap"""
+
+    def __init__(self, rpm, tpm, max_concurrency):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.lock = threading.Lock()
+        self.paused_until = 0.0
+
+    def acquire(self, estimated_tokens):
+        """Block until a request of about estimated_tokens may be sent, then take a slot"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                wait = max(
+                    self.paused_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(estimated_tokens, now),
+                )
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(estimated_tokens)
+                    break
+            time.sleep(min(wait, 5.0))
+        self.slots.acquire()
+
+    def release(self, estimated_tokens, actual_tokens=None):
+        """Free the slot; return unused tokens when the real usage is known"""
+        self.slots.release()
+        if actual_tokens is not None and actual_tokens < estimated_tokens:
+            with self.lock:
+                self.tokens.give_back(estimated_tokens - actual_tokens)
+
+    def pause(self, seconds):
+        """Stop all requests of this process for a while (after a 429)"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+_lock = threading.Lock()
+_client = None
+_limiter = None
+
+
+def get_openai_client():
+    """The process-wide OpenAI client (created on first use)"""
+    global _client
+    with _lock:
+        if _client is None:
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=settings.OPENAI_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OPENAI_HTTP_MAX_CONNECTIONS,
+                    keepalive_expiry=settings.OPENAI_HTTP_KEEPALIVE_SECONDS,
+                ),
+                timeout=httpx.Timeout(settings.OPENAI_TIMEOUT, connect=10.0),
+            )
+            # Retries are done here so they go through the rate limiter
+            _client = OpenAI(
+                api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None,
+                http_client=http_client, max_retries=0,
+            )
+        return _client
+
+
+def get_rate_limiter():
+    """The process-wide rate limiter"""
+    global _limiter
+    with _lock:
+        if _limiter is None:
+            processes = max(1, settings.OPENAI_PROCESSES)
+            _limiter = RateLimiter(
+                rpm=max(1, settings.OPENAI_RPM_LIMIT // processes),
+                tpm=max(1, settings.OPENAI_TPM_LIMIT // processes),
+                max_concurrency=max(1, settings.OPENAI_MAX_CONCURRENCY),
+            )
+        return _limiter
+
+
+def reset_openai_client():
+    """Drop the shared client and limiter (e.g. after the settings changed or in a forked process)"""
+    global _client, _limiter
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _limiter = None
+
+
+def _retry_after(error):
+    """Seconds the server asked us to wait, if it said"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except ValueError:
+        return None
+    return None
+
+
+def _retryable(error):
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, httpx.TransportError):
+        # Connection dropped or timed out while a stream was being read
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _call_with_retries(attempt, estimated_tokens):
+    """
+    Run attempt() through the rate limiter, retrying transient failures
+    attempt: callable -> (result, total tokens used or None); the slot is held while it runs
+    """
+    limiter = get_rate_limiter()
+    retries = 0
+    while True:
+        limiter.acquire(estimated_tokens)
+        actual = None
+        try:
+            result, actual = attempt()
+            return result
+        except (openai.OpenAIError, httpx.TransportError) as e:
+            if not _retryable(e) or retries >= settings.OPENAI_MAX_RETRIES:
+                raise
+            retry_after = _retry_after(e)
+            backoff = min(settings.OPENAI_BACKOFF_MAX, settings.OPENAI_BACKOFF_BASE * 2 ** retries)
+            delay = retry_after if retry_after is not None else random.uniform(backoff / 2, backoff)
+            if isinstance(e, openai.RateLimitError):
+                # The whole process is over the limit, not just this request
+                limiter.pause(delay)
+            retries += 1
+            print(f"[WARNING] OpenAI {type(e).__name__}, retry {retries}/{settings.OPENAI_MAX_RETRIES} in {delay:.1f}s")
+        finally:
+            limiter.release(estimated_tokens, actual)
+        # Back off without holding a slot; the retry queues for one again
+        time.sleep(delay)
+
+
+def call_openai(send, estimated_tokens, usage_tokens=None):
+    """
+    Send one request through the rate limiter, retrying transient failures
+    send: callable making the API call
+    usage_tokens: callable(result) -> total tokens used, or None if unknown (refunds the estimate)
+    Returns: the result of send()
+    RAISES: the last OpenAI error once OPENAI_MAX_RETRIES retries are used up
+    """
+    def attempt():
+        result = send()
+        return result, usage_tokens(result) if usage_tokens else None
+
+    return _call_with_retries(attempt, estimated_tokens)
+
+
+def call_openai_stream(send, estimated_tokens, consume):
+    """
+    Send one streamed request and read it, all within one concurrency slot
+    send() only opens the stream, so the slot and the token estimate are held until
+    consume(stream) has read it to the end. A failure while reading is retried like a
+    failed request: consume starts over on a new stream.
+    consume: callable(stream) -> (result, total tokens used or None)
+    Returns: the result of consume()
+    RAISES: the last OpenAI (or connection) error once OPENAI_MAX_RETRIES retries are used up
+    """
+    def attempt():
+        stream = send()
+        try:
+            return consume(stream)
+        finally:
+            stream.close()
+
+    return _call_with_retries(attempt, estimated_tokens)
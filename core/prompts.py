@@ -0,0 +1,45 @@
+"""
+Stable prompt prefixes
+The provider caches the longest prefix a request shares with recent requests (from
+1024 tokens on) and bills those tokens at a discount, with a faster first token. So every
+prompt is laid out as a prefix that is identical for all students of a homework -
+instructions, homework details, response schema, marking guide - followed by the
+student's own content. Each prefix is compiled once per homework content and reused.
+"""
+import hashlib
+import json
+import threading
+
+
+# Compiled prefixes kept in memory (a few per active homework)
+MAX_PREFIXES = 256
+
+_lock = threading.Lock()
+_prefixes = {}
+
+
+def _fingerprint(name, context):
+    canonical = json.dumps(context, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(f"{name}\n{canonical}".encode()).hexdigest()
+
+
+def compile_prefix(name, context, build):
+    """
+    The prefix `name` for this context, built by build(context) the first time
+    Any change to the context (e.g. an edited homework) compiles a new prefix.
+    Returns: str
+    """
+    key = _fingerprint(name, context)
+    prefix = _prefixes.get(key)
+    if prefix is None:
+        prefix = build(context)
+        with _lock:
+            if len(_prefixes) >= MAX_PREFIXES:
+                _prefixes.clear()
+            _prefixes[key] = prefix
+    return prefix
+
+
+def clear_prefixes():
+    with _lock:
+        _prefixes.clear()
@@ -0,0 +1,153 @@
+"""
+Reuse of interview question sets within a homework
+Students of a class mostly share the same two or three weak areas, so the questions
+generated for one of them suit the others. New questions are only generated when no
+stored set of the homework has the same weak areas (fingerprint match) or close enough
+ones (character-shingle Jaccard similarity >= INTERVIEW_QUESTION_SIMILARITY).
+
+A reused set is served as stored, not adapted to the student: adapting it would take a
+model call per student, which is what the reuse saves. The questions target weak areas
+that are the same or close, so they still fit.
+"""
+import hashlib
+from django.conf import settings
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from .insights import text_key
+from .models import InterviewQuestionSet
+from .services import get_ai_service
+
+
+# generate_interview_questions only uses the first three improvement points
+MAX_WEAK_AREAS = 3
+
+SHINGLE_SIZE = 3
+
+# Similar sets compared per lookup (most used first)
+MAX_CANDIDATES = 50
+
+
+def interview_question_inputs(submission):
+    """Homework data and written feedback the interview questions are generated from"""
+    homework_data = {
+        'subject': submission.homework.subject,
+        'level': submission.homework.level,
+        'title': submission.homework.title,
+    }
+    written_feedback = {
+        'overall_improvements': submission.overall_improvements
+    }
+    return homework_data, written_feedback
+
+
+def weak_areas(written_feedback):
+    """The improvement points the questions are based on"""
+    areas = written_feedback.get('overall_improvements') or []
+    return [str(area) for area in areas[:MAX_WEAK_AREAS] if str(area).strip()]
+
+
+def fingerprint(areas):
+    """Same weak areas (in any order, any case or spacing) -> same fingerprint"""
+    return hashlib.sha256('\n'.join(sorted(text_key(area) for area in areas)).encode()).hexdigest()
+
+
+def _shingles(text):
+    padded = f" {text_key(text)} "
+    return {padded[i:i + SHINGLE_SIZE] for i in range(max(1, len(padded) - SHINGLE_SIZE + 1))}
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def similarity(areas_a, areas_b):
+    """
+    How close two lists of weak areas are, 0-1
+    Every area is paired with its most similar area of the other list, in both directions,
+    so a list that misses or adds an area scores lower.
+    """
+    if not areas_a or not areas_b:
+        return 1.0 if not areas_a and not areas_b else 0.0
+    shingles_a = [_shingles(area) for area in areas_a]
+    shingles_b = [_shingles(area) for area in areas_b]
+    best_a = [max(_jaccard(a, b) for b in shingles_b) for a in shingles_a]
+    best_b = [max(_jaccard(b, a) for a in shingles_a) for b in shingles_b]
+    return (sum(best_a) + sum(best_b)) / (len(best_a) + len(best_b))
+
+
+def find_question_set(homework_id, areas):
+    """
+    Stored set of the homework whose weak areas match these
+    Returns: (InterviewQuestionSet, similarity) or (None, 0)
+    """
+    exact = InterviewQuestionSet.objects.filter(homework_id=homework_id, fingerprint=fingerprint(areas)).first()
+    if exact is not None:
+        return exact, 1.0
+
+    best, best_score = None, 0
+    candidates = InterviewQuestionSet.objects.filter(homework_id=homework_id).order_by('-uses')[:MAX_CANDIDATES]
+    for question_set in candidates:
+        score = similarity(areas, question_set.weak_areas)
+        if score > best_score:
+            best, best_score = question_set, score
+    if best_score >= settings.INTERVIEW_QUESTION_SIMILARITY:
+        return best, best_score
+    return None, 0
+
+
+def questions_for(submission, fresh=False):
+    """
+    Interview questions for a submission: a stored set of its homework when the weak
+    areas match, otherwise a newly generated set (stored for the next students)
+    fresh=True always generates new questions and does not share them
+    Returns: list of {number, type, question}
+    RAISES: Exception if the AI call fails
+    """
+    homework_data, written_feedback = interview_question_inputs(submission)
+    areas = weak_areas(written_feedback)
+    reuse = settings.INTERVIEW_QUESTION_REUSE and not fresh
+
+    if reuse:
+        question_set, score = find_question_set(submission.homework_id, areas)
+        if question_set is not None:
+            InterviewQuestionSet.objects.filter(id=question_set.id).update(
+                uses=F('uses') + 1, last_used_at=timezone.now()
+            )
+            print(f"[CACHE] Reusing interview question set {question_set.id} for submission {submission.id} (similarity {score:.2f})")
+            return question_set.questions
+
+    questions = get_ai_service().generate_interview_questions(homework_data, written_feedback, use_cache=not fresh)
+    if reuse:
+        # Another job may have generated a set for the same weak areas meanwhile: both
+        # students get the stored one, so the homework keeps a single set per fingerprint
+        question_set, created = InterviewQuestionSet.objects.get_or_create(
+            homework_id=submission.homework_id,
+            fingerprint=fingerprint(areas),
+            defaults={'weak_areas': areas, 'questions': questions},
+        )
+        if not created:
+            InterviewQuestionSet.objects.filter(id=question_set.id).update(
+                uses=F('uses') + 1, last_used_at=timezone.now()
+            )
+            print(f"[CACHE] Interview question set {question_set.id} was stored meanwhile - using it for submission {submission.id}")
+            return question_set.questions
+    return questions
+
+
+def reuse_report(homework=None):
+    """
+    How often stored question sets were reused instead of generated
+    Returns: dict with sets, served, reused, reuse_ratio (0-1)
+    """
+    sets = InterviewQuestionSet.objects.all()
+    if homework is not None:
+        sets = sets.filter(homework=homework)
+    totals = sets.aggregate(sets=Count('id'), served=Sum('uses'))
+    served = totals['served'] or 0
+    reused = served - totals['sets']
+    return {
+        'sets': totals['sets'],
+        'served': served,
+        'reused': reused,
+        'reuse_ratio': reused / served if served else 0.0,
+    }
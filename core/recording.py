@@ -0,0 +1,147 @@
+"""
+Chunked, resumable interview recording upload
+The browser sends MediaRecorder timeslices in order; each chunk is appended to
+InterviewSession.recording as it arrives. The session row stores the acknowledged
+byte offset and chunk count so a dropped connection can resume where it left off.
+A reloaded page can't resume (its recorder starts a new WebM stream), so it starts over.
+"""
+import os
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from .audio import discard_asr_cache
+from .models import InterviewSession
+from .metrics import span, timed
+
+
+MAX_RECORDING_SIZE = 100 * 1024 * 1024  # 100MB
+MIN_RECORDING_SIZE = 100 * 1024  # 100KB
+MAX_CHUNK_SIZE = 10 * 1024 * 1024  # 10MB per request
+
+
+class ChunkOutOfOrder(Exception):
+    """Chunk offset/sequence does not match what the server has acknowledged"""
+    def __init__(self, interview):
+        super().__init__(
+            f"Expected chunk {interview.recording_chunks} at offset {interview.recording_bytes}"
+        )
+        self.interview = interview
+
+
+def upload_state(interview):
+    """Acknowledged upload position returned to the client"""
+    return {
+        'seq': interview.recording_chunks,
+        'offset': interview.recording_bytes,
+        'finalized': interview.recording_finalized,
+    }
+
+
+def reset_recording(interview):
+    """Forget any previous upload (interview restarted). Caller saves the interview."""
+    if interview.recording:
+        discard_asr_cache(interview.recording.path)
+        interview.recording.delete(save=False)
+    interview.recording_bytes = 0
+    interview.recording_chunks = 0
+    interview.recorded_seconds = 0
+    interview.recording_finalized = False
+
+
+def restart_recording(interview_id):
+    """
+    Discard a partial upload so the browser can record again from the start
+    A reloaded interview page starts a new MediaRecorder, whose first chunk carries a new
+    WebM header: appended to the old bytes it would make a file of two streams that
+    ffmpeg and the ASR cut off at the first one.
+    Returns: updated InterviewSession
+    RAISES: ValueError if the recording is already finalized
+    """
+    with transaction.atomic():
+        interview = InterviewSession.objects.select_for_update().get(id=interview_id)
+        if interview.recording_finalized:
+            raise ValueError("Recording already finalized")
+        reset_recording(interview)
+        # Windows already transcribed belong to the discarded recording
+        interview.transcription = None
+        interview.transcribed_seconds = 0
+        interview.transcription_complete = False
+        interview.asr_bytes = 0
+        interview.asr_seconds = 0
+        interview.save()
+    return interview
+
+
+def append_chunk(interview_id, seq, offset, data, recorded_seconds=None):
+    """
+    Append one chunk to the recording file
+    A chunk that was already acknowledged (client retry) is accepted without writing it again.
+    recorded_seconds is the recording length at the end of the chunk as timed by the browser
+    (None from clients that don't send it: no windows are transcribed before the end).
+    Returns: updated InterviewSession
+    RAISES: ChunkOutOfOrder if seq/offset skip ahead of the acknowledged position,
+            ValueError if the recording would exceed MAX_RECORDING_SIZE
+    """
+    with span('append_recording_chunk', bytes=len(data)), transaction.atomic():
+        interview = InterviewSession.objects.select_for_update().get(id=interview_id)
+
+        if interview.recording_finalized:
+            raise ValueError("Recording already finalized")
+
+        # Duplicate of an acknowledged chunk - the ack was lost, not the data
+        if seq < interview.recording_chunks and offset + len(data) <= interview.recording_bytes:
+            return interview
+
+        if seq != interview.recording_chunks or offset != interview.recording_bytes:
+            raise ChunkOutOfOrder(interview)
+
+        if offset + len(data) > MAX_RECORDING_SIZE:
+            raise ValueError("Video file too large. Maximum size is 100MB.")
+
+        if not interview.recording:
+            name = f'interview_recordings/interview_{interview.submission_id}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.webm'
+            interview.recording.name = default_storage.get_available_name(name)
+            os.makedirs(os.path.dirname(interview.recording.path), exist_ok=True)
+
+        path = interview.recording.path
+        with open(path, 'ab') as f:
+            if f.tell() < offset:
+                raise ValueError("Recording file is missing acknowledged data")
+            # Drop bytes from a write that was never acknowledged (e.g. crash mid-request)
+            if f.tell() > offset:
+                f.truncate(offset)
+            f.write(data)
+
+        interview.recording_bytes = offset + len(data)
+        interview.recording_chunks = seq + 1
+        if recorded_seconds is not None:
+            interview.recorded_seconds = max(interview.recorded_seconds, recorded_seconds)
+        interview.save(update_fields=['recording', 'recording_bytes', 'recording_chunks', 'recorded_seconds'])
+
+    return interview
+
+
+@timed('finalize_recording')
+def finalize_recording(interview_id, total_bytes=None):
+    """
+    Mark the upload complete once every chunk has been acknowledged
+    RAISES: ChunkOutOfOrder if the client has sent more bytes than the server holds,
+            ValueError if the recording is too short
+    """
+    with transaction.atomic():
+        interview = InterviewSession.objects.select_for_update().get(id=interview_id)
+
+        if interview.recording_finalized:
+            return interview
+
+        if total_bytes is not None and total_bytes != interview.recording_bytes:
+            raise ChunkOutOfOrder(interview)
+
+        if interview.recording_bytes < MIN_RECORDING_SIZE:
+            raise ValueError("Video too short. Please record a proper interview response.")
+
+        interview.recording_finalized = True
+        interview.save(update_fields=['recording_finalized'])
+
+    print(f"[OK] Recording finalized: {interview.recording_bytes} bytes in {interview.recording_chunks} chunks")
+    return interview
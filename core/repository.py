@@ -0,0 +1,217 @@
+"""
+Persistence of analysis results
+Each writer stores one complete result (written feedback, interview questions,
+interview analysis, study plan) in a single transaction using bulk inserts, so a
+crash never leaves half the rows behind. feedback_graph() reads everything a
+results page needs in a fixed number of queries.
+"""
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from .models import InterviewQuestion, QuestionFeedback, StudyPlan, StudyTopic, Submission
+from .stats import record_bulk_change, snapshots_for
+from .insights import INTERVIEW_KINDS, index_interview_feedback, index_study_plan, index_written_feedback
+from .recording import reset_recording
+from .metrics import timed
+
+
+def _apply_written_feedback(submission, feedback):
+    """Copy overall feedback onto the submission. Returns: unsaved QuestionFeedback rows"""
+    submission.written_score = feedback['overall_score']
+    if submission.status == 'complete':
+        # Regrade after the interview - keep the combined score
+        submission.overall_score = (submission.written_score + submission.interview_score) // 2
+    else:
+        submission.overall_score = feedback['overall_score']
+        submission.status = 'analyzed'
+    submission.overall_strengths = feedback['overall_strengths']
+    submission.overall_improvements = feedback['overall_improvements']
+    submission.analysis_completed_at = timezone.now()
+
+    return [_question_row(submission, q_feedback) for q_feedback in feedback.get('questions', [])]
+
+
+def _question_row(submission, q_feedback):
+    return QuestionFeedback(
+        submission=submission,
+        question_number=q_feedback['number'],
+        question_title=q_feedback['title'],
+        marks_awarded=q_feedback['marks_awarded'],
+        marks_total=q_feedback['marks_total'],
+        percentage=q_feedback['percentage'],
+        strengths=q_feedback['strengths'],
+        improvements=q_feedback['improvements'],
+        detailed_analysis=q_feedback.get('detailed_analysis', '')
+    )
+
+
+def clear_question_feedback(submission):
+    """Remove question rows left by an earlier, unfinished attempt"""
+    QuestionFeedback.objects.filter(submission=submission).delete()
+
+
+@timed('save_question_feedback')
+def save_question_feedback(submission, q_feedback):
+    """
+    Store one question's feedback as soon as it has been streamed from the AI
+    The student's feedback page shows it before the rest of the analysis is done;
+    save_written_feedback() replaces the rows with the final set.
+    """
+    row = _question_row(submission, q_feedback)
+    QuestionFeedback.objects.update_or_create(
+        submission=submission,
+        question_number=row.question_number,
+        defaults={
+            field: getattr(row, field)
+            for field in ['question_title', 'marks_awarded', 'marks_total', 'percentage',
+                          'strengths', 'improvements', 'detailed_analysis']
+        },
+    )
+
+
+@timed('save_written_feedback')
+def save_written_feedback(results):
+    """
+    Store written feedback for one or many submissions in a single transaction
+    results: dict of submission id -> (submission, feedback dict from the AI)
+    """
+    submissions, question_rows = [], []
+    for submission, feedback in results.values():
+        question_rows.extend(_apply_written_feedback(submission, feedback))
+        submissions.append(submission)
+
+    with transaction.atomic():
+        stats_before = snapshots_for([submission.id for submission in submissions])
+        Submission.objects.bulk_update(submissions, [
+            'written_score', 'overall_score', 'status',
+            'overall_strengths', 'overall_improvements', 'analysis_completed_at',
+        ])
+        record_bulk_change(stats_before, submissions)
+        # Replace rows left by an earlier attempt
+        QuestionFeedback.objects.filter(submission__in=submissions).delete()
+        QuestionFeedback.objects.bulk_create(question_rows)
+        index_written_feedback(submissions, question_rows)
+
+
+def _interview_question_rows(interview, questions):
+    return [
+        InterviewQuestion(
+            interview=interview,
+            question_number=q['number'],
+            question_type=q['type'],
+            question_text=q['question'],
+        )
+        for q in questions
+    ]
+
+
+@timed('save_interview_questions')
+def save_interview_questions(interview, questions):
+    """
+    Replace the interview questions with the AI-generated set
+    questions: list of {number, type, question} from generate_interview_questions
+    """
+    rows = _interview_question_rows(interview, questions)
+    with transaction.atomic():
+        interview.questions.all().delete()
+        InterviewQuestion.objects.bulk_create(rows)
+    return rows
+
+
+@timed('store_prepared_questions')
+def store_prepared_questions(interview, questions):
+    """
+    Store speculatively generated questions unless the interview already has a set
+    (the student may have started meanwhile and got questions generated on the spot)
+    Returns: True if the questions were stored
+    """
+    with transaction.atomic():
+        if interview.questions.exists():
+            return False
+        InterviewQuestion.objects.bulk_create(_interview_question_rows(interview, questions))
+    return True
+
+
+def reset_interview(interview, keep_questions=False):
+    """
+    Restart an interview: clear the previous attempt and everything derived from it
+    keep_questions=True reuses the stored questions (prepared ahead or from the last attempt)
+    """
+    submission = interview.submission
+    with transaction.atomic():
+        interview.status = 'in_progress'
+        interview.started_at = timezone.now()
+        interview.completed_at = None
+        interview.transcription = None
+        interview.overall_analysis = ''
+        interview.transcribed_seconds = 0
+        interview.transcription_complete = False
+        interview.asr_bytes = 0
+        interview.asr_seconds = 0
+        reset_recording(interview)
+        interview.save()
+        # Old questions and any study plan built from the previous attempt
+        if not keep_questions:
+            interview.questions.all().delete()
+        StudyPlan.objects.filter(submission=submission).delete()
+        StudyTopic.objects.filter(submission=submission).delete()
+        submission.feedback_points.filter(kind__in=INTERVIEW_KINDS).delete()
+
+
+@timed('save_interview_analysis')
+def save_interview_analysis(submission, interview, analysis):
+    """Store the interview scores and complete the submission"""
+    with transaction.atomic():
+        interview.problem_solving_score = analysis['problem_solving_score']
+        interview.conceptual_understanding_score = analysis['conceptual_understanding_score']
+        interview.creative_application_score = analysis['creative_application_score']
+        interview.strong_moments = analysis['strong_moments']
+        interview.development_areas = analysis['development_areas']
+        interview.overall_analysis = analysis['overall_analysis']
+        interview.save()
+
+        submission.interview_score = analysis['interview_score']
+        submission.overall_score = (submission.written_score + submission.interview_score) // 2
+        submission.status = 'complete'
+        submission.save()
+        index_interview_feedback(submission, interview)
+
+
+@timed('save_study_plan_topics')
+def save_study_plan_topics(submission, topics):
+    """
+    Store the locally computed topics right away (the insights are written later)
+    topics: dict from study_plans.study_plan_topics()
+    Returns: StudyPlan
+    """
+    with transaction.atomic():
+        study_plan, _ = StudyPlan.objects.update_or_create(
+            submission=submission,
+            defaults={
+                'priority_topics': topics['priority_topics'],
+                'strength_topics': topics['strength_topics'],
+            }
+        )
+        index_study_plan(submission, study_plan)
+    return study_plan
+
+
+@timed('save_study_plan_insights')
+def save_study_plan_insights(submission, insights, includes_interview):
+    """Add the AI-written insights to the study plan of a submission"""
+    StudyPlan.objects.filter(submission=submission).update(
+        written_vs_verbal_analysis=insights['written_vs_verbal_analysis'],
+        learning_style_insights=insights['learning_style_insights'],
+        includes_interview=includes_interview,
+    )
+
+
+def feedback_graph():
+    """
+    Submissions with their homework, interview (+ questions), study plan and question feedback
+    Loading one costs three queries however many questions it has.
+    """
+    return Submission.objects.select_related('homework', 'interview', 'study_plan').prefetch_related(
+        Prefetch('question_feedbacks', queryset=QuestionFeedback.objects.order_by('question_number')),
+        Prefetch('interview__questions', queryset=InterviewQuestion.objects.order_by('question_number')),
+    )
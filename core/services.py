@@ -0,0 +1,107 @@
+"""
+Lazily created, process-wide AI and transcription services
+Nothing is imported or initialized until a service is first needed, so management
+commands, migrations and freshly forked workers don't pay for the OpenAI / Hugging Face
+clients. A failed initialization (e.g. the Hugging Face endpoint unreachable) is not
+remembered: the next call tries again.
+
+Settings are read from the environment when a process starts, so changing a backend
+(ASR_BACKEND, OPENAI_MODEL, an API key...) needs a restart of the web server and the
+AI workers. The setting_changed receiver below only fires under override_settings (tests).
+"""
+import threading
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+class ServiceUnavailable(Exception):
+    """A service could not be initialized (the message says why)"""
+
+
+def _create_ai_service():
+    from .ai_service import AIFeedbackService
+    return AIFeedbackService()
+
+
+def _create_transcription_service():
+    from .transcription_service import TranscriptionService
+    return TranscriptionService()
+
+
+# name -> factory
+FACTORIES = {
+    'ai': _create_ai_service,
+    'transcription': _create_transcription_service,
+}
+
+# Settings whose change (override_settings in tests) drops the services so they are rebuilt
+SERVICE_SETTINGS = {
+    'OPENAI_API_KEY', 'OPENAI_MODEL', 'OPENAI_MAX_TOKENS', 'OPENAI_BASE_URL',
+    'HUGGINGFACE_API_KEY', 'HUGGINGFACE_ASR_MODEL', 'HUGGINGFACE_ASR_URL', 'ASR_BACKEND', 'LOCAL_ASR_MODEL',
+}
+
+_lock = threading.Lock()
+_services = {}
+_errors = {}
+
+
+def get_service(name):
+    """
+    The named service, created on first use
+    RAISES: ServiceUnavailable if it can't be initialized
+    """
+    service = _services.get(name)
+    if service is not None:
+        return service
+
+    with _lock:
+        service = _services.get(name)
+        if service is None:
+            try:
+                service = FACTORIES[name]()
+            except Exception as e:
+                _errors[name] = str(e)
+                print(f"[ERROR] {name} service unavailable: {e}")
+                raise ServiceUnavailable(str(e)) from e
+            _errors.pop(name, None)
+            _services[name] = service
+    return service
+
+
+def get_ai_service():
+    return get_service('ai')
+
+
+def get_transcription_service():
+    return get_service('transcription')
+
+
+def reset_services():
+    """Drop every service; the next call builds them again from the current settings"""
+    from .openai_client import reset_openai_client
+    with _lock:
+        _services.clear()
+        _errors.clear()
+    reset_openai_client()
+
+
+def service_status(initialize=True):
+    """
+    Readiness of every service (initialize=False only reports what already exists)
+    Returns: dict name -> {'ready': bool, 'error': str or None}
+    """
+    status = {}
+    for name in FACTORIES:
+        if initialize:
+            try:
+                get_service(name)
+            except ServiceUnavailable:
+                pass
+        status[name] = {'ready': name in _services, 'error': _errors.get(name)}
+    return status
+
+
+@receiver(setting_changed)
+def _settings_changed(setting, **kwargs):
+    if setting in SERVICE_SETTINGS:
+        reset_services()
@@ -0,0 +1,41 @@
+"""
+Keep HomeworkStats and the cached teacher summaries in step with Submission saves and deletes
+(bulk_update() sends no signals - callers use stats.record_bulk_change)
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Homework, Submission
+from .stats import (
+    STATS_FIELDS, invalidate_teacher_summaries, schedule_stats_rebuild, snapshots_for, stats_snapshot,
+    submission_counters,
+)
+
+
+@receiver(pre_save, sender=Submission)
+def remember_submission_stats(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not set(update_fields) & set(STATS_FIELDS):
+        instance._stats_before = False  # Nothing the stats depend on is being saved
+        return
+    # Only tells whether the counters change: a concurrent save may already have changed the
+    # row, so the stats are recomputed rather than adjusted by the difference
+    instance._stats_before = snapshots_for([instance.pk]).get(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Submission)
+def update_stats_on_save(sender, instance, **kwargs):
+    before = getattr(instance, '_stats_before', None)
+    if before is False:
+        return
+    after = stats_snapshot(instance)
+    homework_ids = {instance.homework_id} | ({before['homework_id']} if before else set())
+    if len(homework_ids) > 1 or submission_counters(before) != submission_counters(after):
+        schedule_stats_rebuild(homework_ids)
+    invalidate_teacher_summaries(homework_ids)
+
+
+@receiver(post_delete, sender=Submission)
+def update_stats_on_delete(sender, instance, origin=None, **kwargs):
+    invalidate_teacher_summaries({instance.homework_id})
+    if isinstance(origin, Homework):
+        return  # The stats row is deleted along with the homework
+    schedule_stats_rebuild({instance.homework_id})
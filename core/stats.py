@@ -0,0 +1,193 @@
+"""
+Materialized per-homework statistics (HomeworkStats)
+Every submission contributes a set of counters (submitted, completed, score bucket,
+written-vs-verbal comparison). When a submission's counters change, the homework's row
+is recomputed once the transaction commits, with the row locked: two concurrent saves of
+the same submission can't both apply their change to it. The recompute is a single
+aggregate query, and saves that leave the counters unchanged skip it. The results page
+reads one row instead of aggregating the class on every view.
+
+The teacher dashboard summary is cached per teacher and dropped on every submission write.
+"""
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+from .models import Homework, HomeworkStats, Submission
+
+
+# Fields of a submission that affect its counters
+STATS_FIELDS = ['homework_id', 'status', 'written_score', 'interview_score', 'overall_score']
+
+# Lowest overall score of each bucket (checked top-down)
+SCORE_BUCKETS = [
+    (90, 'score_90_100'),
+    (80, 'score_80_89'),
+    (70, 'score_70_79'),
+    (60, 'score_60_69'),
+    (float('-inf'), 'score_below_60'),
+]
+
+# Interview and written scores within this many points count as consistent
+CONSISTENT_MARGIN = 5
+
+
+def stats_snapshot(submission):
+    """Values of the fields that affect the counters"""
+    return {field: getattr(submission, field) for field in STATS_FIELDS}
+
+
+def submission_counters(snapshot):
+    """
+    Counters one submission contributes to its homework
+    Returns: Counter of HomeworkStats field -> amount
+    """
+    counters = Counter()
+    if snapshot is None:
+        return counters
+
+    counters['total_submissions'] = 1
+    if snapshot['status'] != 'complete':
+        return counters
+
+    overall = snapshot['overall_score']
+    counters['completed_submissions'] = 1
+    counters['overall_score_sum'] = overall
+    bucket = next(field for lowest, field in SCORE_BUCKETS if overall >= lowest)
+    counters[bucket] = 1
+
+    written, interview = snapshot['written_score'], snapshot['interview_score']
+    if abs(written - interview) <= CONSISTENT_MARGIN:
+        counters['consistent'] = 1
+    elif interview > written:
+        counters['higher_verbal'] = 1
+    else:
+        counters['higher_written'] = 1
+    return counters
+
+
+def _counter_aggregates():
+    """
+    The submission_counters() of a whole homework as one aggregate query
+    Returns: dict of HomeworkStats field -> aggregate expression
+    """
+    complete = models.Q(status='complete')
+    aggregates = {
+        'total_submissions': models.Count('id'),
+        'completed_submissions': models.Count('id', filter=complete),
+        'overall_score_sum': models.Sum('overall_score', filter=complete),
+    }
+    above = None  # Lowest score of the bucket above
+    for lowest, field in SCORE_BUCKETS:
+        bucket = complete
+        if lowest != float('-inf'):
+            bucket &= models.Q(overall_score__gte=lowest)
+        if above is not None:
+            bucket &= models.Q(overall_score__lt=above)
+        aggregates[field] = models.Count('id', filter=bucket)
+        above = lowest
+
+    verbal_gap = models.Q(interview_score__gt=models.F('written_score') + CONSISTENT_MARGIN)
+    written_gap = models.Q(written_score__gt=models.F('interview_score') + CONSISTENT_MARGIN)
+    aggregates['higher_verbal'] = models.Count('id', filter=complete & verbal_gap)
+    aggregates['higher_written'] = models.Count('id', filter=complete & written_gap)
+    aggregates['consistent'] = models.Count('id', filter=complete & ~verbal_gap & ~written_gap)
+    return aggregates
+
+
+def schedule_stats_rebuild(homework_ids):
+    """Recompute the stats of these homeworks after the current transaction commits"""
+    homework_ids = {homework_id for homework_id in homework_ids if homework_id is not None}
+    if homework_ids:
+        transaction.on_commit(lambda: [rebuild_homework_stats(homework_id) for homework_id in homework_ids])
+
+
+def record_bulk_change(befores, submissions):
+    """
+    Recompute the stats after a bulk_update() of many submissions (which sends no signals)
+    befores: dict of submission id -> stats_snapshot() taken before the update
+    """
+    homework_ids = set()
+    for submission in submissions:
+        before, after = befores.get(submission.id), stats_snapshot(submission)
+        affected = {after['homework_id']} | ({before['homework_id']} if before else set())
+        if len(affected) > 1 or submission_counters(before) != submission_counters(after):
+            homework_ids |= affected
+    schedule_stats_rebuild(homework_ids)
+    invalidate_teacher_summaries({submission.homework_id for submission in submissions})
+
+
+def snapshots_for(submission_ids):
+    """stats_snapshot() of each submission as currently stored. Returns: dict id -> snapshot"""
+    return {
+        row['id']: {field: row[field] for field in STATS_FIELDS}
+        for row in Submission.objects.filter(id__in=submission_ids).values('id', *STATS_FIELDS)
+    }
+
+
+def rebuild_homework_stats(homework_id):
+    """
+    Recompute a homework's stats from its submissions (backfill / repair)
+    Returns: HomeworkStats, or None if the homework no longer exists
+    """
+    try:
+        with transaction.atomic():
+            # Rebuilds of one homework run one at a time, each counting every committed change
+            HomeworkStats.objects.select_for_update().filter(homework_id=homework_id).exists()
+            # Counted by the database in one query: nothing per submission comes back
+            counters = Submission.objects.filter(homework_id=homework_id).aggregate(**_counter_aggregates())
+            values = {field.name: counters.get(field.name) or 0 for field in HomeworkStats.counter_fields()}
+            stats, _ = HomeworkStats.objects.update_or_create(homework_id=homework_id, defaults=values)
+    except IntegrityError:
+        # Homework deleted meanwhile, or another process created the row first
+        if not Homework.objects.filter(id=homework_id).exists():
+            return None
+        stats = HomeworkStats.objects.get(homework_id=homework_id)
+    return stats
+
+
+def homework_stats(homework):
+    """Stats row of a homework, built on first use"""
+    try:
+        return homework.stats
+    except HomeworkStats.DoesNotExist:
+        return rebuild_homework_stats(homework.id)
+
+
+def _summary_key(teacher_id):
+    return f"teacher_summary:{teacher_id}"
+
+
+def teacher_summary(teacher):
+    """
+    Dashboard numbers over every submission of a teacher's homeworks (cached)
+    Returns: dict with total_students, avg_score, completion_rate
+    """
+    key = _summary_key(teacher.id)
+    summary = cache.get(key)
+    if summary is not None:
+        return summary
+
+    submissions = Submission.objects.filter(homework__teacher=teacher)
+    totals = submissions.aggregate(
+        total_students=models.Count('student_name', distinct=True),
+        total=models.Count('id'),
+        completed=models.Count('id', filter=models.Q(status='complete')),
+        avg_score=models.Avg('overall_score', filter=models.Q(status='complete')),
+    )
+    summary = {
+        'total_students': totals['total_students'],
+        'avg_score': int(totals['avg_score'] or 0),
+        'completion_rate': totals['completed'] * 100 // totals['total'] if totals['total'] else 0,
+    }
+    cache.set(key, summary, settings.DASHBOARD_CACHE_SECONDS)
+    return summary
+
+
+def invalidate_teacher_summaries(homework_ids):
+    """Drop the cached summary of the teachers owning these homeworks"""
+    teacher_ids = set(Homework.objects.filter(id__in=homework_ids).values_list('teacher_id', flat=True))
+    keys = [_summary_key(teacher_id) for teacher_id in teacher_ids]
+    # After commit, so a concurrent dashboard view can't re-cache the old numbers
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,49 @@
+"""
+Rule-based part of the study plan
+Priority topics (with their order, priority, score and actions) and strength topics
+follow directly from the stored question feedback, so they are computed here instantly.
+Only the narrative insights are written by the model (AIFeedbackService.generate_study_plan_insights).
+"""
+
+# Questions below this percentage become priority topics, below HIGH_PRIORITY_BELOW high priority
+WEAK_BELOW = 70
+HIGH_PRIORITY_BELOW = 50
+# Questions at or above this percentage are strengths to maintain
+STRONG_FROM = 80
+
+MAX_ACTIONS = 3
+
+
+def _actions(question):
+    actions = [str(point) for point in question.get('improvements') or [] if str(point).strip()][:MAX_ACTIONS]
+    if not actions:
+        actions = [f"Redo question {question['number']} and compare your working with the feedback"]
+    return actions
+
+
+def study_plan_topics(question_feedbacks):
+    """
+    Priority and strength topics from per-question results
+    question_feedbacks: list of {number, title, percentage, improvements}
+    Returns: dict with priority_topics (weakest first) and strength_topics (strongest first)
+    """
+    weak = sorted(
+        (q for q in question_feedbacks if q['percentage'] < WEAK_BELOW),
+        key=lambda q: (q['percentage'], q['number']),
+    )
+    strong = sorted(
+        (q for q in question_feedbacks if q['percentage'] >= STRONG_FROM),
+        key=lambda q: (-q['percentage'], q['number']),
+    )
+    return {
+        'priority_topics': [
+            {
+                'topic': q['title'],
+                'priority': 'high' if q['percentage'] < HIGH_PRIORITY_BELOW else 'medium',
+                'current_score': q['percentage'],
+                'actions': _actions(q),
+            }
+            for q in weak
+        ],
+        'strength_topics': [q['title'] for q in strong],
+    }
@@ -0,0 +1,322 @@
+"""
+AI tasks executed by the background workers (see core/jobs.py)
+Each task takes a Submission (mark scheme indexing: a HomeworkFile), does the slow
+external calls and stores the results.
+RAISES: Exception if the task fails - the job queue decides whether to retry
+"""
+import os
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Concat
+from .models import InterviewSession, StudyPlan
+from .repository import (
+    clear_question_feedback, save_interview_analysis, save_question_feedback, save_study_plan_insights,
+    save_study_plan_topics, save_written_feedback, store_prepared_questions,
+)
+from .audio import extract_audio_window, ffmpeg_available, prepare_for_asr, trim_silence, wav_duration
+from .services import get_ai_service, get_transcription_service
+from .question_sets import questions_for
+from .study_plans import study_plan_topics
+from .extraction import extract_text
+from .mark_scheme import index_homework_file, marking_guide, record_index_error
+
+
+def homework_context(homework):
+    """Homework data passed to the AI prompts"""
+    return {
+        'subject': homework.subject,
+        'level': homework.level,
+        'title': homework.title,
+        'total_marks': homework.total_marks,
+        'num_questions': homework.num_questions,
+        'instructions': homework.instructions,
+        'marking_guide': marking_guide(homework),
+    }
+
+
+def extract_answer_text(submission, use_cache=True):
+    """
+    Read the typed answers out of an uploaded answer file (PDF, Word, text or photo)
+    The written analysis is queued once the text is stored.
+    """
+    if submission.answer_text:
+        return
+    if not submission.answer_file or not os.path.exists(submission.answer_file.path):
+        raise Exception("No answer file found to read")
+
+    submission.answer_text = extract_text(submission.answer_file.path)
+    submission.save(update_fields=['answer_text'])
+
+
+def fail_text_extraction(submission, error):
+    """The file could not be read: the student is asked to upload again or type the answers"""
+    submission.status = 'error'
+    submission.save()
+
+
+def analyze_written_submission(submission, use_cache=True):
+    """
+    Run the written-work analysis for a submission and store the feedback
+    use_cache=False is a teacher regrade: always re-run with a fresh AI call
+    """
+    if submission.analysis_completed_at and use_cache:
+        # Already analyzed (e.g. job enqueued twice) - nothing to do
+        return
+
+    answer_text = submission.answer_text
+    if not answer_text:
+        raise Exception("No answer text provided")
+
+    if settings.AI_STREAM_FEEDBACK and not submission.analysis_completed_at:
+        # First analysis: store each question as it streams in so the student sees it early
+        clear_question_feedback(submission)
+        feedback = get_ai_service().analyze_written_work_stream(
+            homework_context(submission.homework), answer_text,
+            on_question=lambda q_feedback: save_question_feedback(submission, q_feedback),
+            use_cache=use_cache,
+        )
+    else:
+        # Regrade: the old feedback stays visible until the new set replaces it
+        feedback = get_ai_service().analyze_written_work(
+            homework_context(submission.homework), answer_text, use_cache=use_cache
+        )
+
+    save_written_feedback({submission.id: (submission, feedback)})
+    print(f"[OK] Written analysis stored for submission {submission.id}")
+
+
+def fail_written_analysis(submission, error):
+    """Mark the submission as failed once the job has run out of attempts"""
+    submission.status = 'error'
+    submission.save()
+
+
+def prepare_interview_questions(submission, use_cache=True):
+    """
+    Generate the interview questions right after the written analysis
+    Starting the interview then only reads them from the database.
+    """
+    interview, _ = InterviewSession.objects.get_or_create(submission=submission)
+    if interview.questions.exists():
+        return
+
+    questions = questions_for(submission, fresh=not use_cache)
+    if store_prepared_questions(interview, questions):
+        print(f"[OK] {len(questions)} interview questions prepared for submission {submission.id}")
+
+
+def fail_interview_questions(submission, error):
+    """Nothing to mark: starting the interview generates the questions on the spot"""
+
+
+# End-of-interview pipeline: transcribe -> analyze, with the study plan
+# running alongside from the written feedback. Each stage saves its own output.
+
+def transcribe_interview(submission, use_cache=True):
+    """
+    Stage 1: speech-to-text of the interview recording
+    With incremental transcription only the audio after the last transcribed window is left.
+    """
+    interview = submission.interview
+    if interview.transcription_complete:
+        return
+
+    if not interview.recording or not os.path.exists(interview.recording.path):
+        raise Exception("No interview recording found to transcribe")
+
+    if settings.TRANSCRIPTION_STREAMING and ffmpeg_available():
+        # Finish the remaining windows, the last one reads to the end of the file
+        while transcribe_next_window(interview, final=True):
+            interview.refresh_from_db()
+        interview.refresh_from_db()
+        interview.audio_original_seconds = interview.transcribed_seconds
+    elif settings.ASR_PREPROCESS and ffmpeg_available():
+        # Send 16 kHz mono audio with long silences trimmed instead of the video
+        audio = prepare_for_asr(interview.recording.path)
+        print(f"[AUDIO] Transcribing interview audio: {audio['path']}")
+        interview.transcription = get_transcription_service().transcribe_audio(audio['path'])
+        interview.asr_bytes = audio['processed_bytes']
+        interview.asr_seconds = audio['processed_seconds']
+        if audio['original_seconds'] is not None:
+            interview.audio_original_seconds = audio['original_seconds']
+    else:
+        print(f"[AUDIO] Transcribing interview recording: {interview.recording.path}")
+        interview.transcription = get_transcription_service().transcribe_audio(interview.recording.path)
+        interview.asr_bytes = os.path.getsize(interview.recording.path)
+
+    if not (interview.transcription or '').strip():
+        raise Exception("Transcription failed: Empty transcription returned from API")
+
+    interview.transcription = interview.transcription.strip()
+    interview.transcription_complete = True
+    interview.audio_original_bytes = os.path.getsize(interview.recording.path)
+    interview.save(update_fields=[
+        'transcription', 'transcription_complete',
+        'audio_original_bytes', 'audio_original_seconds', 'asr_bytes', 'asr_seconds',
+    ])
+    print(
+        f"[OK] Transcription saved: {len(interview.transcription)} characters "
+        f"(ASR payload {interview.asr_bytes} of {interview.audio_original_bytes} bytes, "
+        f"{interview.asr_seconds:.0f}s of {interview.audio_original_seconds:.0f}s)"
+    )
+
+
+def transcribe_next_window(interview, final=False):
+    """
+    Transcribe the next window of the recording and append it to the transcription
+    While recording, a window is only taken once it is fully on disk; final=True
+    takes everything that is left.
+    Returns: True if a window was transcribed (more may remain)
+    """
+    window = settings.TRANSCRIPTION_WINDOW_SECONDS
+    start = interview.transcribed_seconds
+    # Recording length reported by the browser with the last acknowledged chunk
+    available = interview.recorded_seconds
+
+    if final:
+        duration = None
+    elif available - start >= window + 2:
+        duration = window
+    else:
+        return False
+
+    wav_path = extract_audio_window(interview.recording.path, start, duration)
+    trimmed_path = f"{wav_path}.trimmed.wav"
+    try:
+        extracted = wav_duration(wav_path)
+        if extracted < 0.5:
+            return False
+        asr_path = wav_path
+        if settings.ASR_PREPROCESS:
+            trim_silence(wav_path, trimmed_path)
+            asr_path = trimmed_path
+        asr_bytes, asr_seconds = os.path.getsize(asr_path), wav_duration(asr_path)
+        text = get_transcription_service().transcribe_audio(asr_path, allow_empty=True).strip() if asr_seconds >= 0.5 else ''
+    finally:
+        for path in (wav_path, trimmed_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    # Compare-and-set on the start offset keeps windows in order if two workers race
+    updated = InterviewSession.objects.filter(id=interview.id, transcribed_seconds=start).update(
+        transcription=Concat(Coalesce('transcription', Value('')), Value(f" {text}" if text else '')),
+        transcribed_seconds=start + extracted,
+        asr_bytes=F('asr_bytes') + asr_bytes,
+        asr_seconds=F('asr_seconds') + asr_seconds,
+    )
+    if not updated:
+        # Another worker transcribed this window first - continue from its offset
+        return True
+
+    print(f"[AUDIO] Transcribed {start:.0f}s-{start + extracted:.0f}s of interview {interview.id}")
+    return not final
+
+
+def transcribe_stream(submission, use_cache=True):
+    """Transcribe every complete window that has landed on disk while the interview is recorded"""
+    interview = submission.interview
+    while not interview.transcription_complete and transcribe_next_window(interview):
+        interview.refresh_from_db()
+
+
+def analyze_interview(submission, use_cache=True):
+    """Stage 2: AI analysis of the transcription"""
+    interview = submission.interview
+    if interview.overall_analysis and use_cache:
+        return
+
+    analysis = get_ai_service().analyze_interview_performance(
+        {
+            'subject': submission.homework.subject,
+            'level': submission.homework.level,
+        },
+        submission.written_score,
+        interview.duration_seconds,
+        transcription=interview.transcription,
+        use_cache=use_cache
+    )
+
+    save_interview_analysis(submission, interview, analysis)
+
+    print(f"[OK] Interview analysis stored for submission {submission.id}")
+
+
+def build_study_plan(submission, use_cache=True):
+    """
+    Stage 3: study plan
+    Starts from the written feedback while the interview is still being processed,
+    and is rebuilt once the interview analysis is available.
+    """
+    interview = submission.interview
+    interview_ready = bool(interview.overall_analysis)
+
+    try:
+        if submission.study_plan.includes_interview and use_cache:
+            return
+    except StudyPlan.DoesNotExist:
+        pass
+
+    question_feedbacks = [
+        {
+            'number': qf.question_number,
+            'title': qf.question_title,
+            'percentage': qf.percentage,
+            'improvements': qf.improvements,
+        }
+        for qf in submission.question_feedbacks.all()
+    ]
+    # Topics follow from the scores - shown at once, before the insights are written
+    topics = study_plan_topics(question_feedbacks)
+    save_study_plan_topics(submission, topics)
+
+    submission_data = {
+        'written_score': submission.written_score,
+        'interview_score': submission.interview_score if interview_ready else None,
+    }
+    interview_analysis = {
+        'problem_solving_score': interview.problem_solving_score,
+        'conceptual_understanding_score': interview.conceptual_understanding_score,
+    } if interview_ready else {}
+
+    insights = get_ai_service().generate_study_plan_insights(
+        submission_data,
+        topics,
+        interview_analysis,
+        use_cache=use_cache
+    )
+
+    save_study_plan_insights(submission, insights, interview_ready)
+    print(f"[OK] Study plan stored for submission {submission.id} (interview included: {interview_ready})")
+
+    # The interview analysis may have landed while this plan was generated
+    if not interview_ready:
+        interview.refresh_from_db()
+        if interview.overall_analysis:
+            submission.refresh_from_db()
+            build_study_plan(submission, use_cache=use_cache)
+
+
+def fail_interview_stage(submission, error):
+    """Transcription and interview analysis are required - mark the submission as failed"""
+    submission.status = 'error'
+    submission.save()
+
+
+def fail_transcribe_stream(submission, error):
+    """Incremental transcription is an optimization - the final stage transcribes what is left"""
+    print(f"[WARNING] Incremental transcription stopped for submission {submission.id}: {error}")
+
+
+def fail_study_plan(submission, error):
+    """Study plan is optional, results render without it"""
+    print(f"[WARNING] Study plan not generated for submission {submission.id}: {error}")
+
+
+def index_mark_scheme(homework_file, use_cache=True):
+    """Split a teacher's question paper / mark scheme per question (see core/mark_scheme.py)"""
+    index_homework_file(homework_file)
+
+
+def fail_mark_scheme_index(homework_file, error):
+    """Out of retries: grading uses the rest of the homework context without this file"""
+    record_index_error(homework_file, error)
@@ -0,0 +1,14 @@
+from datetime import date
+from django.contrib.auth.models import User
+from core.models import Homework, Submission
+
+
+def make_submission(name='Ann'):
+    teacher, _ = User.objects.get_or_create(username='teacher', defaults={'is_staff': True})
+    homework, _ = Homework.objects.get_or_create(
+        code='PHY-TEST', defaults={
+            'teacher': teacher, 'title': 'Forces', 'subject': 'Physics', 'level': 'GCSE',
+            'class_name': '10A', 'due_date': date.today(), 'total_marks': 20, 'num_questions': 2,
+        },
+    )
+    return Submission.objects.create(homework=homework, student_name=name, answer_text='F = ma')
@@ -0,0 +1,51 @@
+import array
+import os
+import tempfile
+import wave
+from unittest import mock
+from django.test import SimpleTestCase
+from core import audio
+from core.audio import trim_silence, wav_duration
+
+
+def write_wav(path, segments, rate=16000):
+    """segments: [(seconds, amplitude)] of a square wave (amplitude 0 = silence)"""
+    samples = array.array('h')
+    for seconds, amplitude in segments:
+        samples.extend(amplitude if i % 20 < 10 else -amplitude for i in range(int(seconds * rate)))
+    with wave.open(path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(samples.tobytes())
+
+
+class TrimSilenceTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.src = os.path.join(directory.name, 'in.wav')
+        self.dst = os.path.join(directory.name, 'out.wav')
+
+    def test_long_silence_is_shortened(self):
+        write_wav(self.src, [(1, 5000), (5, 0), (1, 5000)])
+
+        original, trimmed = trim_silence(self.src, self.dst, min_silence_seconds=1, keep_seconds=0.3)
+
+        self.assertAlmostEqual(original, 7, places=2)
+        self.assertAlmostEqual(trimmed, 2.3, delta=0.05)
+        self.assertAlmostEqual(wav_duration(self.dst), trimmed, places=3)
+
+    def test_short_pause_is_kept(self):
+        write_wav(self.src, [(1, 5000), (0.5, 0), (1, 5000)])
+
+        original, trimmed = trim_silence(self.src, self.dst, min_silence_seconds=1, keep_seconds=0.3)
+
+        self.assertAlmostEqual(trimmed, original, places=2)
+
+    def test_pure_python_energy_matches(self):
+        write_wav(self.src, [(1, 5000), (3, 0), (1, 5000), (2, 0)])
+        with_audioop = trim_silence(self.src, self.dst, min_silence_seconds=1, keep_seconds=0.3)
+
+        with mock.patch.object(audio, 'audioop', None):
+            self.assertEqual(trim_silence(self.src, self.dst, min_silence_seconds=1, keep_seconds=0.3), with_audioop)
@@ -0,0 +1,104 @@
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from core import jobs
+from core.jobs import claim_job, claim_next_job, enqueue_job
+from core.models import AnalysisJob, Submission
+from core.tests import make_submission
+
+
+class ClaimJobTests(TestCase):
+    def test_claim_next_job_takes_the_oldest_queued_job(self):
+        first = enqueue_job(make_submission('Ann'), 'written_analysis')
+        enqueue_job(make_submission('Ben'), 'written_analysis')
+
+        job = claim_next_job('worker-1')
+
+        self.assertEqual(job.id, first.id)
+        self.assertEqual(job.status, 'running')
+        self.assertEqual(job.worker, 'worker-1')
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.started_at)
+
+    def test_claim_next_job_returns_none_when_nothing_is_queued(self):
+        job = enqueue_job(make_submission(), 'written_analysis')
+        AnalysisJob.objects.filter(id=job.id).update(status='done')
+
+        self.assertIsNone(claim_next_job('worker-1'))
+
+    def test_job_is_claimed_only_once(self):
+        job = enqueue_job(make_submission(), 'written_analysis')
+
+        self.assertTrue(claim_job(job.id, 'worker-1'))
+        self.assertFalse(claim_job(job.id, 'worker-2'))
+        job.refresh_from_db()
+        self.assertEqual(job.worker, 'worker-1')
+        self.assertEqual(job.attempts, 1)
+
+    def test_claim_next_job_moves_on_when_another_worker_wins_the_race(self):
+        first = enqueue_job(make_submission('Ann'), 'written_analysis')
+        second = enqueue_job(make_submission('Ben'), 'written_analysis')
+
+        def claimed_elsewhere_first(job_id, worker_id):
+            # Another worker claims the first job between the listing and the UPDATE
+            if job_id == first.id:
+                claim_job(job_id, 'worker-2')
+            return claim_job(job_id, worker_id)
+
+        with mock.patch.object(jobs, 'claim_job', side_effect=claimed_elsewhere_first):
+            job = claim_next_job('worker-1')
+
+        self.assertEqual(job.id, second.id)
+        first.refresh_from_db()
+        self.assertEqual(first.worker, 'worker-2')
+        self.assertEqual(first.attempts, 1)
+
+    def test_retried_job_counts_attempts(self):
+        job = enqueue_job(make_submission(), 'written_analysis')
+        claim_job(job.id, 'worker-1')
+        AnalysisJob.objects.filter(id=job.id).update(status='queued')
+
+        self.assertEqual(claim_next_job('worker-2').attempts, 2)
+
+
+class GradePendingTests(TestCase):
+    def setUp(self):
+        self.submission = make_submission()
+        Submission.objects.filter(id=self.submission.id).update(status='analyzing')
+        self.service = mock.Mock()
+        self.service.usage_report.return_value = {}
+        patcher = mock.patch('core.management.commands.grade_pending.get_ai_service', return_value=self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def grade(self):
+        call_command('grade_pending', homework='PHY-TEST', stdout=StringIO())
+        return AnalysisJob.objects.get(submission=self.submission, kind='written_analysis')
+
+    def test_failed_batch_puts_the_claimed_jobs_back(self):
+        self.service.analyze_written_work_batch.side_effect = RuntimeError('batch JSON malformed')
+
+        job = self.grade()
+
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.last_error, 'batch JSON malformed')
+
+    @override_settings(AI_JOB_MAX_ATTEMPTS=1)
+    def test_failed_batch_fails_jobs_out_of_attempts(self):
+        self.service.analyze_written_work_batch.side_effect = RuntimeError('retries used up')
+
+        job = self.grade()
+
+        self.assertEqual(job.status, 'failed')
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.status, 'error')
+
+    def test_submission_error_is_retried(self):
+        self.service.analyze_written_work_batch.return_value = ({}, {self.submission.id: 'timeout'})
+
+        job = self.grade()
+
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.last_error, 'timeout')
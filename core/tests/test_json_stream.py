@@ -0,0 +1,56 @@
+import json
+from django.test import SimpleTestCase
+from core.json_stream import ArrayItemParser
+
+
+DOCUMENT = {
+    'overall_score': 72,
+    'questions': [
+        {'number': 1, 'analysis': 'Uses F = ma {correctly}', 'steps': [{'ok': True}, {'ok': False}]},
+        {'number': 2, 'analysis': 'Quote "]" and a backslash \\ inside a string'},
+        {'number': 3, 'analysis': ''},
+    ],
+    'strengths': [{'not': 'a question'}],
+}
+
+
+class ArrayItemParserTests(SimpleTestCase):
+    def feed_in_pieces(self, text, size):
+        parser = ArrayItemParser('questions')
+        items = []
+        for start in range(0, len(text), size):
+            items.extend(parser.feed(text[start:start + size]))
+        return parser, items
+
+    def test_items_of_the_array_are_returned_whatever_the_chunking(self):
+        text = json.dumps(DOCUMENT)
+        for size in (1, 2, 7, len(text)):
+            with self.subTest(size=size):
+                parser, items = self.feed_in_pieces(text, size)
+                self.assertEqual(items, DOCUMENT['questions'])
+                self.assertTrue(parser.done)
+                self.assertEqual(parser.text, text)
+
+    def test_item_is_returned_as_soon_as_it_closes(self):
+        parser = ArrayItemParser('questions')
+        self.assertEqual(parser.feed('{"questions": [{"number": 1}'), [{'number': 1}])
+        self.assertEqual(parser.feed(', {"number": '), [])
+        self.assertEqual(parser.feed('2}'), [{'number': 2}])
+        self.assertFalse(parser.done)
+
+    def test_key_split_across_chunks(self):
+        parser = ArrayItemParser('questions')
+        self.assertEqual(parser.feed('{"quest'), [])
+        self.assertEqual(parser.feed('ions"'), [])
+        self.assertEqual(parser.feed(': [{"number": 1}]}'), [{'number': 1}])
+
+    def test_arrays_after_the_end_are_ignored(self):
+        parser = ArrayItemParser('questions')
+        parser.feed('{"questions": [], "other": [{"number": 9}]}')
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.feed(', {"questions": [{"number": 1}]}'), [])
+
+    def test_invalid_item_is_skipped(self):
+        parser = ArrayItemParser('questions')
+        items = parser.feed('{"questions": [{"number": 1,}, {"number": 2}]}')
+        self.assertEqual(items, [{'number': 2}])
@@ -0,0 +1,48 @@
+from django.test import SimpleTestCase
+from core.mark_scheme import guide_excerpt
+
+
+def long_guide(num_questions):
+    guide = {0: {'question': 'Show all working. ' * 300, 'mark_scheme': 'Accept equivalent units. ' * 200}}
+    for number in range(1, num_questions + 1):
+        guide[number] = {
+            'question': f'Question {number} asks about forces. ' * 150,
+            'mark_scheme': f'M{number}: one mark for F = ma. ' * 30,
+        }
+    return guide
+
+
+class GuideExcerptTests(SimpleTestCase):
+    def test_every_mark_scheme_is_kept_whole_on_a_long_guide(self):
+        guide = long_guide(10)
+
+        excerpt = guide_excerpt(guide, budget=1500, entry_cap=400)
+
+        for number in range(1, 11):
+            self.assertIn(f"Mark scheme: {guide[number]['mark_scheme']}\n", excerpt + '\n')
+
+    def test_general_section_is_cut_first(self):
+        excerpt = guide_excerpt(long_guide(10), budget=1500, entry_cap=400)
+
+        self.assertNotIn('GENERAL', excerpt)
+        self.assertIn('Question paper: Question 1 asks', excerpt)
+
+    def test_mark_scheme_is_capped_per_entry(self):
+        guide = {1: {'question': 'Explain inertia.', 'mark_scheme': 'Award a mark. ' * 1000}}
+
+        excerpt = guide_excerpt(guide, budget=1500, entry_cap=100)
+
+        self.assertIn('Question paper: Explain inertia.', excerpt)
+        self.assertTrue(excerpt.endswith('[...]'))
+        self.assertLess(len(excerpt), 1000)
+
+    def test_short_guide_is_sent_whole(self):
+        guide = {0: {'question': 'Use g = 9.8', 'mark_scheme': ''}, 1: {'question': 'State F = ma', 'mark_scheme': '1 mark'}}
+
+        excerpt = guide_excerpt(guide, budget=1500, entry_cap=400)
+
+        self.assertEqual(
+            excerpt,
+            "GENERAL:\nQuestion paper: Use g = 9.8\n\nQUESTION 1:\nQuestion paper: State F = ma\nMark scheme: 1 mark",
+        )
+        self.assertEqual(guide_excerpt({}, budget=1500, entry_cap=400), '')
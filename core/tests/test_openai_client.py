@@ -0,0 +1,129 @@
+from unittest import mock
+import httpx
+import openai
+from django.test import SimpleTestCase, override_settings
+from core.openai_client import call_openai, call_openai_stream, get_rate_limiter, reset_openai_client
+
+
+def status_error(cls, status, headers=None):
+    request = httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return cls(f"HTTP {status}", response=response, body=None)
+
+
+class Sender:
+    """send() that fails with the given errors, then returns 'ok'"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+
+@override_settings(
+    OPENAI_MAX_RETRIES=2, OPENAI_BACKOFF_BASE=1, OPENAI_BACKOFF_MAX=4,
+    OPENAI_RPM_LIMIT=600, OPENAI_TPM_LIMIT=600, OPENAI_PROCESSES=1, OPENAI_MAX_CONCURRENCY=1,
+)
+class CallOpenAITests(SimpleTestCase):
+    def setUp(self):
+        reset_openai_client()
+        self.addCleanup(reset_openai_client)
+        patcher = mock.patch('core.openai_client.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_transient_errors_are_retried_with_backoff(self):
+        send = Sender(status_error(openai.InternalServerError, 500), openai.APITimeoutError(request=None))
+
+        self.assertEqual(call_openai(send, estimated_tokens=10), 'ok')
+        self.assertEqual(send.calls, 3)
+        delays = [call.args[0] for call in self.sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        self.assertTrue(0.5 <= delays[0] <= 1)
+        self.assertTrue(1 <= delays[1] <= 2)
+
+    def test_gives_up_after_max_retries(self):
+        send = Sender(*[status_error(openai.InternalServerError, 503) for _ in range(3)])
+
+        with self.assertRaises(openai.InternalServerError):
+            call_openai(send, estimated_tokens=10)
+        self.assertEqual(send.calls, 3)
+
+    def test_client_errors_are_not_retried(self):
+        send = Sender(status_error(openai.BadRequestError, 400))
+
+        with self.assertRaises(openai.BadRequestError):
+            call_openai(send, estimated_tokens=10)
+        self.assertEqual(send.calls, 1)
+        self.sleep.assert_not_called()
+
+    def test_retry_after_header_sets_the_delay(self):
+        send = Sender(status_error(openai.InternalServerError, 503, {'retry-after': '3'}))
+
+        call_openai(send, estimated_tokens=10)
+        self.sleep.assert_called_once_with(3.0)
+
+    def test_rate_limit_pauses_the_whole_process(self):
+        send = Sender(status_error(openai.RateLimitError, 429, {'retry-after-ms': '0'}))
+
+        with mock.patch.object(get_rate_limiter(), 'pause') as pause:
+            self.assertEqual(call_openai(send, estimated_tokens=10), 'ok')
+        pause.assert_called_once_with(0.0)
+
+    def test_slot_is_free_during_the_backoff(self):
+        limiter = get_rate_limiter()
+        free = []
+
+        def sleep(delay):
+            # OPENAI_MAX_CONCURRENCY=1: another request can use the slot while this one waits
+            free.append(limiter.slots.acquire(blocking=False))
+            limiter.slots.release()
+
+        self.sleep.side_effect = sleep
+        call_openai(Sender(status_error(openai.InternalServerError, 500)), estimated_tokens=10)
+        self.assertEqual(free, [True])
+
+    def test_unused_token_estimate_is_given_back(self):
+        limiter = get_rate_limiter()
+
+        call_openai(lambda: 'ok', estimated_tokens=500, usage_tokens=lambda result: 100)
+
+        # 600 per minute refills 10 per second - allow for the time the call took
+        self.assertAlmostEqual(limiter.tokens.level, 500, delta=5)
+        self.assertAlmostEqual(limiter.requests.level, 599, delta=5)
+
+    def test_slot_is_held_until_the_stream_is_read(self):
+        limiter = get_rate_limiter()
+        stream = mock.Mock()
+
+        def consume(opened):
+            self.assertIs(opened, stream)
+            # OPENAI_MAX_CONCURRENCY=1: no other request may start while reading
+            self.assertFalse(limiter.slots.acquire(blocking=False))
+            return 'read', None
+
+        self.assertEqual(call_openai_stream(lambda: stream, 10, consume), 'read')
+        stream.close.assert_called_once()
+        self.assertTrue(limiter.slots.acquire(blocking=False))
+        limiter.slots.release()
+
+    def test_stream_dropped_while_reading_is_retried_on_a_new_stream(self):
+        streams = [mock.Mock(name='first'), mock.Mock(name='second')]
+        opened = iter(streams)
+        read = []
+
+        def consume(stream):
+            read.append(stream)
+            if len(read) == 1:
+                raise httpx.RemoteProtocolError('peer closed connection')
+            return 'read', 10
+
+        self.assertEqual(call_openai_stream(lambda: next(opened), 10, consume), 'read')
+        self.assertEqual(read, streams)
+        for stream in streams:
+            stream.close.assert_called_once()
@@ -0,0 +1,51 @@
+from unittest import mock
+from django.test import TestCase
+from core.models import InterviewQuestionSet, Submission
+from core.question_sets import fingerprint, questions_for
+from core.tests import make_submission
+
+AREAS = ['Units of force', 'Free-body diagrams']
+
+
+def weak_submission(name):
+    submission = make_submission(name)
+    Submission.objects.filter(id=submission.id).update(overall_improvements=AREAS)
+    submission.refresh_from_db()
+    return submission
+
+
+class QuestionsForTests(TestCase):
+    def setUp(self):
+        self.service = mock.Mock()
+        patcher = mock.patch('core.question_sets.get_ai_service', return_value=self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_matching_student_reuses_the_stored_set(self):
+        self.service.generate_interview_questions.return_value = [{'number': 1, 'question': 'Ann Q'}]
+
+        first = questions_for(weak_submission('Ann'))
+        second = questions_for(weak_submission('Ben'))
+
+        self.assertEqual(second, first)
+        self.assertEqual(self.service.generate_interview_questions.call_count, 1)
+        self.assertEqual(InterviewQuestionSet.objects.get().uses, 2)
+
+    def test_set_stored_during_generation_is_served(self):
+        ann, ben = weak_submission('Ann'), weak_submission('Ben')
+
+        def generated_alongside(homework_data, written_feedback, use_cache=True):
+            # Ann's job stores its set while Ben's generation is still running
+            InterviewQuestionSet.objects.create(
+                homework_id=ann.homework_id, fingerprint=fingerprint(AREAS),
+                weak_areas=AREAS, questions=[{'number': 1, 'question': 'Ann Q'}],
+            )
+            return [{'number': 1, 'question': 'Ben Q'}]
+
+        self.service.generate_interview_questions.side_effect = generated_alongside
+
+        questions = questions_for(ben)
+
+        self.assertEqual(questions, [{'number': 1, 'question': 'Ann Q'}])
+        question_set = InterviewQuestionSet.objects.get()
+        self.assertEqual(question_set.uses, 2)
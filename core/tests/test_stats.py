@@ -0,0 +1,125 @@
+from collections import Counter
+from django.test import TestCase
+from core.models import HomeworkStats, Submission
+from core.stats import rebuild_homework_stats, record_bulk_change, snapshots_for, submission_counters
+from core.tests import make_submission
+
+
+class HomeworkStatsTests(TestCase):
+    def save(self, submission, **fields):
+        for name, value in fields.items():
+            setattr(submission, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            submission.save()
+
+    def stats(self, homework):
+        return HomeworkStats.objects.get(homework=homework)
+
+    def complete(self, submission, written, interview):
+        self.save(
+            submission, status='complete', written_score=written, interview_score=interview,
+            overall_score=(written + interview) // 2,
+        )
+
+    def test_new_submission_is_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            submission = make_submission()
+
+        stats = self.stats(submission.homework)
+        self.assertEqual(stats.total_submissions, 1)
+        self.assertEqual(stats.completed_submissions, 0)
+
+    def test_completed_submission_counts_score_and_comparison(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            submission = make_submission()
+        self.complete(submission, written=70, interview=90)
+
+        stats = self.stats(submission.homework)
+        self.assertEqual(stats.completed_submissions, 1)
+        self.assertEqual(stats.overall_score_sum, 80)
+        self.assertEqual(stats.score_80_89, 1)
+        self.assertEqual(stats.higher_verbal, 1)
+
+    def test_score_change_moves_the_submission_between_buckets(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            submission = make_submission()
+        self.complete(submission, written=70, interview=90)
+        self.complete(submission, written=95, interview=93)
+
+        stats = self.stats(submission.homework)
+        self.assertEqual(stats.completed_submissions, 1)
+        self.assertEqual(stats.score_80_89, 0)
+        self.assertEqual(stats.score_90_100, 1)
+        self.assertEqual(stats.higher_verbal, 0)
+        self.assertEqual(stats.consistent, 1)
+
+    def test_repeated_save_is_not_counted_twice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            submission = make_submission()
+        self.complete(submission, written=70, interview=90)
+        # A second copy of the row saved with the same values (e.g. a retried job)
+        self.complete(Submission.objects.get(id=submission.id), written=70, interview=90)
+
+        stats = self.stats(submission.homework)
+        self.assertEqual(stats.total_submissions, 1)
+        self.assertEqual(stats.completed_submissions, 1)
+        self.assertEqual(stats.overall_score_sum, 80)
+
+    def test_delete_removes_the_submission(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            kept = make_submission('Ann')
+            deleted = make_submission('Ben')
+        self.complete(deleted, written=50, interview=50)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted.delete()
+
+        stats = self.stats(kept.homework)
+        self.assertEqual(stats.total_submissions, 1)
+        self.assertEqual(stats.completed_submissions, 0)
+        self.assertEqual(stats.score_below_60, 0)
+
+    def test_save_of_unrelated_fields_schedules_no_rebuild(self):
+        submission = make_submission()
+
+        submission.overall_strengths = ['Clear units']
+        with self.captureOnCommitCallbacks() as callbacks:
+            submission.save(update_fields=['overall_strengths'])
+
+        self.assertEqual(len(callbacks), 0)
+
+    def test_bulk_update_is_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            submissions = [make_submission('Ann'), make_submission('Ben')]
+        befores = snapshots_for([submission.id for submission in submissions])
+        for submission in submissions:
+            submission.status = 'complete'
+            submission.written_score = submission.interview_score = submission.overall_score = 65
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Submission.objects.bulk_update(
+                submissions, ['status', 'written_score', 'interview_score', 'overall_score']
+            )
+            record_bulk_change(befores, submissions)
+
+        stats = self.stats(submissions[0].homework)
+        self.assertEqual(stats.completed_submissions, 2)
+        self.assertEqual(stats.score_60_69, 2)
+        self.assertEqual(stats.consistent, 2)
+
+    def test_rebuild_matches_the_per_submission_counters(self):
+        scores = [(100, 100), (95, 84), (84, 95), (62, 57), (90, 89), (40, 46), (0, 0), (70, 69)]
+        submissions = [make_submission(f'Student {i}') for i in range(len(scores) + 1)]
+        for submission, (written, interview) in zip(submissions, scores):
+            Submission.objects.filter(id=submission.id).update(
+                status='complete', written_score=written, interview_score=interview,
+                overall_score=(written + interview) // 2,
+            )
+
+        stats = rebuild_homework_stats(submissions[0].homework_id)
+
+        expected = Counter()
+        for snapshot in snapshots_for([submission.id for submission in submissions]).values():
+            expected.update(submission_counters(snapshot))
+        for field in HomeworkStats.counter_fields():
+            self.assertEqual(getattr(stats, field.name), expected[field.name], field.name)
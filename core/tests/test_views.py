@@ -0,0 +1,32 @@
+from django.contrib.messages import get_messages
+from django.test import TestCase
+from django.urls import reverse
+from core.jobs import enqueue_job
+from core.models import AnalysisJob, Submission
+from core.tests import make_submission
+
+
+class ReviewStatusTests(TestCase):
+    def setUp(self):
+        submission = make_submission()
+        job = enqueue_job(submission, 'written_analysis')
+        AnalysisJob.objects.filter(id=job.id).update(status='failed', last_error='timeout')
+        Submission.objects.filter(id=submission.id).update(status='error')
+        session = self.client.session
+        session['submission_id'] = submission.id
+        session.save()
+
+    def test_polling_reports_the_error_without_flashing_it(self):
+        for _ in range(3):
+            response = self.client.get(reverse('student_review_status'))
+            self.assertEqual(response.json()['error'], 'timeout')
+
+        self.assertEqual(list(get_messages(response.wsgi_request)), [])
+
+    def test_progress_page_flashes_the_error_once(self):
+        self.client.get(reverse('student_review_status'))
+
+        response = self.client.get(reverse('student_review_progress'), follow=True)
+
+        self.assertRedirects(response, reverse('student_code_entry'))
+        self.assertEqual([str(m) for m in response.context['messages']], ['AI analysis failed: timeout'])
@@ -0,0 +1,94 @@
+"""
+Token counting and token-bounded chunking for AI prompts
+Uses tiktoken when it is installed (exact counts for OpenAI models); otherwise
+estimates ~4 characters per token, which is close for English text.
+"""
+import re
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def _encoding(model):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('o200k_base')
+
+
+def count_tokens(text, model=None):
+    """Number of tokens in text for the given model"""
+    if not text:
+        return 0
+    if tiktoken is not None and model:
+        return len(_encoding(model).encode(text))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _hard_split(text, max_tokens, model):
+    """Split a single piece with no usable break points"""
+    if tiktoken is not None and model:
+        encoding = _encoding(model)
+        tokens = encoding.encode(text)
+        return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
+    size = max_tokens * CHARS_PER_TOKEN
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def truncate_tokens(text, max_tokens, model=None):
+    """The first max_tokens of text (unchanged if it already fits)"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    return _hard_split(text, max_tokens, model)[0]
+
+
+def split_by_tokens(text, max_tokens, model=None):
+    """
+    Split text into chunks of at most max_tokens
+    Breaks at paragraphs first, then lines, then sentences; only a single piece
+    longer than the budget is cut mid-sentence.
+    Returns: list of chunks (one chunk if the text already fits)
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return [text]
+
+    chunks, current, current_tokens = [], [], 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append(''.join(current).strip())
+        current, current_tokens = [], 0
+
+    for piece in _pieces(text, max_tokens, model):
+        tokens = count_tokens(piece, model)
+        if current and current_tokens + tokens > max_tokens:
+            flush()
+        current.append(piece)
+        current_tokens += tokens
+    flush()
+    return [chunk for chunk in chunks if chunk]
+
+
+def _pieces(text, max_tokens, model, separators=(r'(?<=\n\n)', r'(?<=\n)', r'(?<=[.!?] )')):
+    """Break text into pieces that each fit max_tokens, keeping separators attached"""
+    if count_tokens(text, model) <= max_tokens:
+        return [text]
+    if not separators:
+        return _hard_split(text, max_tokens, model)
+
+    parts = [part for part in re.split(separators[0], text) if part]
+    if len(parts) == 1:
+        return _pieces(text, max_tokens, model, separators[1:])
+
+    pieces = []
+    for part in parts:
+        pieces.extend(_pieces(part, max_tokens, model, separators[1:]))
+    return pieces
@@ -1,37 +1,27 @@
 """
-Speech-to-Text Transcription Service using Hugging Face InferenceClient
+Speech-to-Text Transcription Service
+The ASR backend (Hugging Face API, local Whisper pool or stub) is selected with ASR_BACKEND
 """
-from huggingface_hub import InferenceClient
-from django.conf import settings
+import os
+from .asr_backends import get_asr_backend
+from .metrics import span
 
 
 class TranscriptionService:
-    def __init__(self):
-        """Initialize Hugging Face InferenceClient for ASR"""
-        self.api_key = settings.HUGGINGFACE_API_KEY
-        
-        if not self.api_key:
-            raise ValueError(
-                "❌ HUGGINGFACE_API_KEY not configured!\n\n"
-                "Set your API key in .env file:\n"
-                "  1. Copy .env.example to .env\n"
-                "  2. Edit .env and set: HUGGINGFACE_API_KEY=hf_your-key\n"
-                "  3. Restart the server\n\n"
-                "Get key from: https://huggingface.co/settings/tokens"
-            )
-        
-        self.model = settings.HUGGINGFACE_ASR_MODEL
-        # Use official Hugging Face InferenceClient (recommended way)
-        self.client = InferenceClient(token=self.api_key)
-        print(f"[OK] Transcription Service initialized with model: {self.model}")
-        print(f"[OK] Using Hugging Face InferenceClient (official library)")
+    def __init__(self, backend=None):
+        """Initialize the configured ASR backend (see core/asr_backends.py)"""
+        self.backend = get_asr_backend(backend)
+        self.model = getattr(self.backend, 'model', None)
+        print(f"[OK] Transcription Service initialized with backend: {self.backend.name}"
+              + (f", model: {self.model}" if self.model else ""))
     
-    def transcribe_audio(self, audio_file_path):
+    def transcribe_audio(self, audio_file_path, allow_empty=False):
         """
-        Transcribe audio file to text using Hugging Face Whisper via InferenceClient
+        Transcribe audio file to text with the configured ASR backend
         
         Args:
             audio_file_path: Path to audio/video file (will extract audio)
+            allow_empty: Return '' instead of failing on silence (used for short windows)
         
         Returns:
             str: Transcribed text
@@ -44,12 +34,8 @@ class TranscriptionService:
         try:
             print(f"[AUDIO] Transcribing audio file: {audio_file_path}")
             
-            # Use InferenceClient for automatic speech recognition
-            # Pass file directly - client handles file reading and API calls
-            result = self.client.automatic_speech_recognition(
-                audio_file_path,
-                model=self.model
-            )
+            with span('transcribe_audio', backend=self.backend.name, bytes=os.path.getsize(audio_file_path)):
+                result = self.backend.transcribe(audio_file_path)
             
             # Result can be a string or dict depending on model
             if isinstance(result, dict):
@@ -58,6 +44,8 @@ class TranscriptionService:
                 transcription = str(result)
             
             if not transcription:
+                if allow_empty:
+                    return ''
                 raise ValueError("Empty transcription returned from API")
             
             print(f"[OK] Transcription successful: {len(transcription)} characters")
@@ -79,11 +67,7 @@ class TranscriptionService:
         """
         try:
             # Try to get timestamps if model supports it
-            result = self.client.automatic_speech_recognition(
-                audio_file_path,
-                model=self.model,
-                parameters={"return_timestamps": True}
-            )
+            result = self.backend.transcribe(audio_file_path, return_timestamps=True)
             
             print(f"[OK] Transcription with timestamps successful")
             return result
@@ -4,17 +4,25 @@ from . import views
 urlpatterns = [
     # Home
     path('', views.home, name='home'),
+    path('health/ready/', views.health_ready, name='health_ready'),
+    path('metrics/', views.metrics, name='metrics'),
     
     # Student URLs
     path('student/', views.student_home, name='student_home'),
     path('student/code/', views.student_code_entry, name='student_code_entry'),
     path('student/upload/', views.student_upload, name='student_upload'),
     path('student/review/', views.student_review_progress, name='student_review_progress'),
+    path('student/review/status/', views.student_review_status, name='student_review_status'),
     path('student/feedback/', views.student_feedback, name='student_feedback'),
+    path('student/feedback/stream/', views.student_feedback_stream, name='student_feedback_stream'),
     path('student/interview/prep/', views.student_interview_prep, name='student_interview_prep'),
     path('student/interview/', views.student_interview, name='student_interview'),
     path('student/results/', views.student_final_results, name='student_final_results'),
+    path('student/results/status/', views.student_results_status, name='student_results_status'),
     path('student/save-recording/', views.save_interview_recording, name='save_interview_recording'),
+    path('student/recording/chunk/', views.upload_recording_chunk, name='upload_recording_chunk'),
+    path('student/recording/finalize/', views.finalize_recording_upload, name='finalize_recording_upload'),
+    path('student/recording/restart/', views.restart_recording_upload, name='restart_recording_upload'),
     
     # Teacher URLs
     path('teacher/login/', views.teacher_login, name='teacher_login'),
@@ -23,5 +31,6 @@ urlpatterns = [
     path('teacher/homework/<int:homework_id>/created/', views.teacher_homework_created, name='teacher_homework_created'),
     path('teacher/homework/<int:homework_id>/results/', views.teacher_view_results, name='teacher_view_results'),
     path('teacher/submission/<int:submission_id>/', views.teacher_student_report, name='teacher_student_report'),
+    path('teacher/submission/<int:submission_id>/regrade/', views.teacher_regrade_submission, name='teacher_regrade_submission'),
 ]
 
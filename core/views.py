@@ -4,46 +4,53 @@ from django.contrib.auth import login, authenticate
 from django.contrib import messages
 from django.utils import timezone
 from django.db import models
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
 from django.core.files.base import ContentFile
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 from .models import (
     Homework, HomeworkFile, Submission, InterviewSession,
-    QuestionFeedback, InterviewQuestion, StudyPlan
+    StudyPlan, QuestionFeedback
 )
-from .ai_service import AIFeedbackService
-from .transcription_service import TranscriptionService
+from .recording import (
+    append_chunk, finalize_recording, restart_recording, upload_state,
+    ChunkOutOfOrder, MAX_CHUNK_SIZE
+)
+from .stats import homework_stats, teacher_summary
+from .insights import priority_topics, question_performance, recurring_points
+from .repository import feedback_graph, reset_interview, save_interview_questions
+from .services import service_status
+from .metrics import render as render_metrics, span
+from .question_sets import questions_for
+from .jobs import (
+    enqueue_job, enqueue_mark_scheme_indexing, first_stage, latest_job, start_interview_pipeline, pipeline_status,
+    maybe_transcribe_window
+)
+import asyncio
+import json
 import random
 import string
-import json
 import os
-
-# Initialize AI service on module load
-try:
-    ai_service = AIFeedbackService()
-except Exception as e:
-    print(f"\n{'='*80}")
-    print(f"⚠️  AI SERVICE INITIALIZATION FAILED")
-    print(f"{'='*80}")
-    print(f"{e}")
-    print(f"{'='*80}\n")
-    ai_service = None
-
-# Initialize transcription service on module load  
-try:
-    transcription_service = TranscriptionService()
-except Exception as e:
-    print(f"\n{'='*80}")
-    print(f"⚠️  TRANSCRIPTION SERVICE INITIALIZATION FAILED")
-    print(f"{'='*80}")
-    print(f"{e}")
-    print(f"{'='*80}\n")
-    transcription_service = None
+import time
 
 # Home/Landing
 def home(request):
     return render(request, 'home.html')
 
+def health_ready(request):
+    """Readiness probe: 200 once the AI and transcription services are initialized, 503 otherwise"""
+    status = service_status()
+    ready = all(service['ready'] for service in status.values())
+    return JsonResponse({'ready': ready, 'services': status}, status=200 if ready else 503)
+
+def metrics(request):
+    """Prometheus scrape endpoint: stage latency histograms and percentiles, token and byte counters"""
+    if settings.METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {settings.METRICS_TOKEN}":
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 # Student Views
 def student_home(request):
     return render(request, 'student/home.html')
@@ -131,106 +138,129 @@ def student_review_progress(request):
     
     submission = get_object_or_404(Submission, id=submission_id)
     
-    # Run AI analysis if not already done
+    # Analysis failed - review_progress.html reloads this page once it sees the error,
+    # so the message is flashed here, once, rather than by every status poll
+    if submission.status == 'error':
+        job = latest_job(submission, 'written_analysis') or latest_job(submission, 'text_extraction')
+        messages.error(request, f"AI analysis failed: {job.last_error if job else 'Unknown error'}")
+        return redirect('student_code_entry')
+    
+    # Queue AI analysis if not already done - a background worker runs it
+    # (file-only submissions have their text extracted first)
     if submission.status == 'analyzing' and not submission.analysis_completed_at:
-        try:
-            # Prepare homework data for AI
-            homework_data = {
-                'subject': submission.homework.subject,
-                'level': submission.homework.level,
-                'title': submission.homework.title,
-                'total_marks': submission.homework.total_marks,
-                'num_questions': submission.homework.num_questions,
-                'instructions': submission.homework.instructions,
-            }
-            
-            # Get answer text (MUST have actual content - no placeholders)
-            answer_text = submission.answer_text
-            if not answer_text and submission.answer_file:
-                # For file submissions, we need to extract text or inform AI about file
-                # In production, you'd use OCR/PDF parsing here
-                messages.error(request, 'File processing not yet implemented. Please type your answers in the text box.')
-                submission.status = 'error'
-                submission.save()
-                return redirect('student_upload')
-            
-            if not answer_text:
-                raise Exception("No answer text provided")
-            
-            # Run AI analysis - REQUIRED
-            if not ai_service:
-                raise Exception("AI service not initialized. Check OpenAI API key configuration.")
-            
-            feedback = ai_service.analyze_written_work(homework_data, answer_text)
-            
-            # Store overall feedback
-            submission.written_score = feedback['overall_score']
-            submission.overall_score = feedback['overall_score']
-            submission.overall_strengths = json.dumps(feedback['overall_strengths'])
-            submission.overall_improvements = json.dumps(feedback['overall_improvements'])
-            submission.analysis_completed_at = timezone.now()
-            submission.status = 'analyzed'
-            submission.save()
-            
-            # Store question-level feedback
-            for q_feedback in feedback.get('questions', []):
-                QuestionFeedback.objects.create(
-                    submission=submission,
-                    question_number=q_feedback['number'],
-                    question_title=q_feedback['title'],
-                    marks_awarded=q_feedback['marks_awarded'],
-                    marks_total=q_feedback['marks_total'],
-                    percentage=q_feedback['percentage'],
-                    strengths=json.dumps(q_feedback['strengths']),
-                    improvements=json.dumps(q_feedback['improvements']),
-                    detailed_analysis=q_feedback.get('detailed_analysis', '')
-                )
-        except Exception as e:
-            print(f"[ERROR] Error during AI analysis: {e}")
-            submission.status = 'error'
-            submission.save()
-            messages.error(request, f"AI analysis failed: {str(e)}")
-            return redirect('student_code_entry')
+        enqueue_job(submission, first_stage(submission))
     
     return render(request, 'student/review_progress.html', {'submission': submission})
 
+def student_review_status(request):
+    """JSON status of the written analysis, polled by review_progress.html"""
+    submission_id = request.session.get('submission_id')
+    if not submission_id:
+        return JsonResponse({'error': 'No submission in session'}, status=400)
+    
+    submission = get_object_or_404(Submission, id=submission_id)
+    job = latest_job(submission, 'written_analysis') or latest_job(submission, 'text_extraction')
+    
+    data = {
+        'status': submission.status,
+        'stage': job.kind if job else None,
+        'ready': submission.analysis_completed_at is not None,
+        # Streamed questions already stored - the feedback page can open early
+        'questions_ready': submission.question_feedbacks.count(),
+        'job_status': job.status if job else None,
+        'attempts': job.attempts if job else 0,
+    }
+    
+    if submission.status == 'error':
+        data['error'] = job.last_error if job else 'Unknown error'
+    
+    return JsonResponse(data)
+
 def student_feedback(request):
     submission_id = request.session.get('submission_id')
     if not submission_id:
         return redirect('student_code_entry')
     
-    submission = get_object_or_404(Submission, id=submission_id)
+    submission = get_object_or_404(feedback_graph(), id=submission_id)
     
     # Get question feedbacks from database
     question_feedbacks = submission.question_feedbacks.all()
     
-    # Parse JSON fields for template
-    questions_feedback = []
-    for qf in question_feedbacks:
-        questions_feedback.append({
-            'number': qf.question_number,
-            'title': qf.question_title,
-            'marks': qf.marks_awarded,
-            'total': qf.marks_total,
-            'percentage': qf.percentage,
-            'strengths': json.loads(qf.strengths) if qf.strengths else [],
-            'improvements': json.loads(qf.improvements) if qf.improvements else []
-        })
-    
-    # Parse overall feedback
-    overall_strengths = json.loads(submission.overall_strengths) if submission.overall_strengths else []
-    overall_improvements = json.loads(submission.overall_improvements) if submission.overall_improvements else []
+    questions_feedback = [_question_card(qf) for qf in question_feedbacks]
     
     context = {
         'submission': submission,
         'homework': submission.homework,
         'questions_feedback': questions_feedback,
-        'overall_strengths': overall_strengths,
-        'overall_improvements': overall_improvements,
+        'overall_strengths': submission.overall_strengths,
+        'overall_improvements': submission.overall_improvements,
+        # Still being graded: the page listens to student_feedback_stream for the rest
+        'streaming': submission.analysis_completed_at is None and submission.status != 'error',
     }
     
     return render(request, 'student/feedback.html', context)
 
+def _question_card(qf):
+    """Question feedback as shown on the student feedback page"""
+    return {
+        'number': qf.question_number,
+        'title': qf.question_title,
+        'marks': qf.marks_awarded,
+        'total': qf.marks_total,
+        'percentage': qf.percentage,
+        'strengths': qf.strengths,
+        'improvements': qf.improvements
+    }
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def student_feedback_stream(request):
+    """
+    Server-sent events with each question's feedback as soon as the worker has stored it
+    The analysis runs in a worker process, so new rows are picked up by polling the database.
+    Async so a watching student costs a coroutine, not a server thread: served under ASGI
+    (buddybud/asgi.py). Under WSGI it answers 204 and the page polls student_review_status.
+    The stream closes after FEEDBACK_STREAM_TIMEOUT seconds and the browser reconnects.
+    Events: question (one card), done (analysis complete), error
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    submission_id = await sync_to_async(request.session.get)('submission_id')
+    if not submission_id:
+        return JsonResponse({'error': 'No submission in session'}, status=400)
+    
+    # Question numbers the page already rendered
+    sent = {int(n) for n in request.GET.get('have', '').split(',') if n.isdigit()}
+    
+    async def events():
+        # Reconnect delay for the browser once the stream is closed
+        yield f"retry: {int(settings.FEEDBACK_STREAM_POLL_SECONDS * 1000) + 1000}\n\n"
+        deadline = time.monotonic() + settings.FEEDBACK_STREAM_TIMEOUT
+        while time.monotonic() < deadline:
+            submission = await Submission.objects.filter(id=submission_id).values('status', 'analysis_completed_at').afirst()
+            if submission is None:
+                yield _sse('error', {'error': 'Submission not found'})
+                return
+            
+            async for qf in QuestionFeedback.objects.filter(submission_id=submission_id).exclude(question_number__in=sent):
+                sent.add(qf.question_number)
+                yield _sse('question', _question_card(qf))
+            
+            if submission['analysis_completed_at'] is not None:
+                yield _sse('done', {})
+                return
+            if submission['status'] == 'error':
+                yield _sse('error', {'error': 'AI analysis failed'})
+                return
+            await asyncio.sleep(settings.FEEDBACK_STREAM_POLL_SECONDS)
+    
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Don't let nginx buffer the stream
+    return response
+
 def student_interview_prep(request):
     submission_id = request.session.get('submission_id')
     if not submission_id:
@@ -244,56 +274,38 @@ def student_interview_prep(request):
             submission=submission,
             defaults={'status': 'in_progress'}
         )
+        regenerate = request.POST.get('regenerate') == '1'
         
-        # If interview already exists, reset it for fresh start
+        # Questions prepared after the written analysis (or from an earlier attempt) are reused
         if not created:
-            interview.status = 'in_progress'
-            interview.completed_at = None
-            interview.transcription = None
-            interview.save()
-            # Delete old questions
-            interview.questions.all().delete()
+            reset_interview(interview, keep_questions=not regenerate)
         
-        # Generate personalized interview questions using AI
-        try:
-            homework_data = {
-                'subject': submission.homework.subject,
-                'level': submission.homework.level,
-                'title': submission.homework.title,
-            }
-            
-            written_feedback = {
-                'overall_improvements': json.loads(submission.overall_improvements) if submission.overall_improvements else []
-            }
-            
-            # Generate AI questions - REQUIRED
-            if not ai_service:
-                raise Exception("AI service not initialized. Check OpenAI API key configuration.")
-            
-            questions = ai_service.generate_interview_questions(homework_data, written_feedback)
-            
-            # DEBUG: Log generated questions
-            print(f"[DEBUG] AI generated {len(questions)} questions")
-            for q in questions:
-                print(f"[DEBUG] Q{q.get('number', '?')}: {q.get('question', '?')[:50]}...")
-            
-            # Store questions in database
-            for q in questions:
-                InterviewQuestion.objects.create(
-                    interview=interview,
-                    question_number=q['number'],
-                    question_type=q['type'],
-                    question_text=q['question']
-                )
-            
-            print(f"[DEBUG] Stored {interview.questions.count()} questions in database")
-        except Exception as e:
-            print(f"[ERROR] Error generating questions: {e}")
-            messages.error(request, f"Failed to generate interview questions: {str(e)}")
+        if regenerate or not interview.questions.exists():
+            # Not prepared yet (or the student asked for new ones) - generate them now
+            try:
+                # A set shared with classmates of similar weak areas, or AI-generated
+                # (raises ServiceUnavailable without an API key)
+                questions = questions_for(submission, fresh=regenerate)
+                
+                # DEBUG: Log generated questions
+                print(f"[DEBUG] AI generated {len(questions)} questions")
+                for q in questions:
+                    print(f"[DEBUG] Q{q.get('number', '?')}: {q.get('question', '?')[:50]}...")
+                
+                # Store questions in database (one transaction, one insert)
+                stored = save_interview_questions(interview, questions)
+                
+                print(f"[DEBUG] Stored {len(stored)} questions in database")
+            except Exception as e:
+                print(f"[ERROR] Error generating questions: {e}")
+                messages.error(request, f"Failed to generate interview questions: {str(e)}")
         
         return redirect('student_interview')
     
-    return render(request, 'student/interview_prep.html', {'submission': submission})
+    # Offer new questions only to a student retaking the interview
+    retake = InterviewSession.objects.filter(submission=submission).exclude(status='pending').exists()
+    
+    return render(request, 'student/interview_prep.html', {'submission': submission, 'retake': retake})
 
 def student_interview(request):
     submission_id = request.session.get('submission_id')
@@ -337,126 +349,34 @@ def student_interview(request):
         print(f"[ERROR] Duplicates: {set(duplicates)}")
     
     if request.method == 'POST':
-        # Complete interview and run analysis
+        # Complete interview and hand the analysis off to the background pipeline
         # REFRESH interview from database to get recording saved via AJAX
         interview.refresh_from_db()
         
+        if not interview.recording or not os.path.exists(interview.recording.path):
+            print(f"[ERROR] Transcription failed: no interview recording for submission {submission.id}")
+            submission.status = 'error'
+            submission.save()
+            messages.error(request, "Failed to transcribe interview: No interview recording found to transcribe")
+            return redirect('student_code_entry')
+        
+        # Upload cut short (connection dropped, finalize failed): the size and the last chunk
+        # were never checked, so the recording must not be transcribed
+        if not interview.recording_finalized:
+            print(f"[WARNING] Interview recording for submission {submission.id} was not finalized")
+            messages.error(request, "Your recording did not finish uploading. Please record the interview again.")
+            return redirect('student_interview')
+        
         interview.status = 'completed'
         interview.completed_at = timezone.now()
         interview.duration_seconds = (timezone.now() - interview.started_at).seconds
         interview.save()
         
-        # TRANSCRIBE the interview recording to text
-        transcription = None
-        try:
-            # Debug logging
-            print(f"[DEBUG] Interview recording field: {interview.recording}")
-            if interview.recording:
-                print(f"[DEBUG] Recording path: {interview.recording.path}")
-                print(f"[DEBUG] File exists: {os.path.exists(interview.recording.path)}")
-            
-            if interview.recording and os.path.exists(interview.recording.path):
-                if not transcription_service:
-                    raise Exception("Transcription service not initialized. Check HUGGINGFACE_API_KEY configuration.")
-                
-                print(f"[AUDIO] Transcribing interview recording...")
-                print(f"[AUDIO] File: {interview.recording.path}")
-                transcription = transcription_service.transcribe_audio(interview.recording.path)
-                
-                # Store transcription in database
-                interview.transcription = transcription
-                interview.save()
-                print(f"[OK] Transcription saved: {len(transcription)} characters")
-            else:
-                raise Exception("No interview recording found to transcribe")
-        except Exception as e:
-            print(f"[ERROR] Transcription failed: {e}")
-            submission.status = 'error'
-            submission.save()
-            messages.error(request, f"Failed to transcribe interview: {str(e)}")
-            return redirect('student_code_entry')
+        submission.status = 'interview_processing'
+        submission.save()
         
-        # Run AI analysis of interview using TRANSCRIPTION
-        try:
-            homework_data = {
-                'subject': submission.homework.subject,
-                'level': submission.homework.level,
-            }
-            
-            # Run AI analysis - REQUIRED with transcription
-            if not ai_service:
-                raise Exception("AI service not initialized. Check OpenAI API key configuration.")
-            
-            analysis = ai_service.analyze_interview_performance(
-                homework_data,
-                submission.written_score,
-                interview.duration_seconds,
-                transcription=transcription  # Pass REAL transcription
-            )
-            
-            # Store interview analysis
-            interview.problem_solving_score = analysis['problem_solving_score']
-            interview.conceptual_understanding_score = analysis['conceptual_understanding_score']
-            interview.creative_application_score = analysis['creative_application_score']
-            interview.strong_moments = json.dumps(analysis['strong_moments'])
-            interview.development_areas = json.dumps(analysis['development_areas'])
-            interview.overall_analysis = analysis['overall_analysis']
-            interview.save()
-            
-            # Update submission scores
-            submission.interview_score = analysis['interview_score']
-            submission.overall_score = (submission.written_score + submission.interview_score) // 2
-            submission.status = 'complete'
-            submission.save()
-            
-        except Exception as e:
-            print(f"[ERROR] Error analyzing interview: {e}")
-            submission.status = 'error'
-            submission.save()
-            messages.error(request, f"Interview analysis failed: {str(e)}")
-            return redirect('student_code_entry')
-        
-        # Generate study plan
-        try:
-            question_feedbacks = [
-                {
-                    'title': qf.question_title,
-                    'percentage': qf.percentage,
-                }
-                for qf in submission.question_feedbacks.all()
-            ]
-            
-            submission_data = {
-                'written_score': submission.written_score,
-                'interview_score': submission.interview_score,
-            }
-            
-            interview_analysis = {
-                'problem_solving_score': interview.problem_solving_score,
-                'conceptual_understanding_score': interview.conceptual_understanding_score,
-            }
-            
-            # Generate study plan - REQUIRED
-            if not ai_service:
-                raise Exception("AI service not initialized. Check OpenAI API key configuration.")
-            
-            study_plan_data = ai_service.generate_study_plan(
-                submission_data,
-                question_feedbacks,
-                interview_analysis
-            )
-            
-            # Store study plan
-            StudyPlan.objects.create(
-                submission=submission,
-                priority_topics=json.dumps(study_plan_data['priority_topics']),
-                strength_topics=json.dumps(study_plan_data['strength_topics']),
-                written_vs_verbal_analysis=study_plan_data['written_vs_verbal_analysis'],
-                learning_style_insights=study_plan_data['learning_style_insights']
-            )
-        except Exception as e:
-            print(f"[ERROR] Error generating study plan: {e}")
-            # Study plan is optional, continue without it
+        # Transcribe -> analyze, with the study plan starting from the written feedback
+        start_interview_pipeline(submission)
         
         return redirect('student_final_results')
     
@@ -472,9 +392,10 @@ def student_final_results(request):
     if not submission_id:
         return redirect('student_code_entry')
     
-    submission = get_object_or_404(Submission, id=submission_id)
+    # Whole feedback graph in a fixed number of queries
+    submission = get_object_or_404(feedback_graph(), id=submission_id)
     
-    # Get all feedback data with parsed JSON
+    # Get all feedback data
     question_feedbacks_parsed = []
     for qf in submission.question_feedbacks.all():
         question_feedbacks_parsed.append({
@@ -483,43 +404,82 @@ def student_final_results(request):
             'marks_awarded': qf.marks_awarded,
             'marks_total': qf.marks_total,
             'percentage': qf.percentage,
-            'strengths': json.loads(qf.strengths) if qf.strengths else [],
-            'improvements': json.loads(qf.improvements) if qf.improvements else [],
+            'strengths': qf.strengths,
+            'improvements': qf.improvements,
         })
     
     try:
         interview = submission.interview
+    except InterviewSession.DoesNotExist:
+        interview = None
+    
+    # Interview data is only shown once the analysis stage has stored it
+    interview_data = None
+    if interview and interview.overall_analysis:
         interview_data = {
             'problem_solving_score': interview.problem_solving_score,
             'conceptual_understanding_score': interview.conceptual_understanding_score,
             'creative_application_score': interview.creative_application_score,
-            'strong_moments': json.loads(interview.strong_moments) if interview.strong_moments else [],
-            'development_areas': json.loads(interview.development_areas) if interview.development_areas else [],
+            'strong_moments': interview.strong_moments,
+            'development_areas': interview.development_areas,
         }
-    except InterviewSession.DoesNotExist:
-        interview_data = None
     
     try:
         study_plan = submission.study_plan
         study_plan_data = {
-            'priority_topics': json.loads(study_plan.priority_topics) if study_plan.priority_topics else [],
-            'strength_topics': json.loads(study_plan.strength_topics) if study_plan.strength_topics else [],
+            'priority_topics': study_plan.priority_topics,
+            'strength_topics': study_plan.strength_topics,
             'written_vs_verbal_analysis': study_plan.written_vs_verbal_analysis,
             'learning_style_insights': study_plan.learning_style_insights,
+            'includes_interview': study_plan.includes_interview,
         }
     except StudyPlan.DoesNotExist:
         study_plan_data = None
     
+    # Stages still running render as "processing" and the page polls for updates
+    pipeline = pipeline_status(submission)
+    
     context = {
         'submission': submission,
         'homework': submission.homework,
         'question_feedbacks': question_feedbacks_parsed,
         'interview_data': interview_data,
         'study_plan_data': study_plan_data,
+        'pipeline': pipeline,
+        'pipeline_running': any(status in ('queued', 'running') for status in pipeline.values()),
+        'study_plan_state': _study_plan_state(submission),
     }
     
     return render(request, 'student/final_results.html', context)
 
+def _study_plan_state(submission):
+    """'none', 'topics' (insights still being written) or 'complete'"""
+    try:
+        study_plan = submission.study_plan
+    except StudyPlan.DoesNotExist:
+        return 'none'
+    return 'complete' if study_plan.written_vs_verbal_analysis else 'topics'
+
+def student_results_status(request):
+    """JSON status of the end-of-interview pipeline, polled by final_results.html"""
+    submission_id = request.session.get('submission_id')
+    if not submission_id:
+        return JsonResponse({'error': 'No submission in session'}, status=400)
+    
+    submission = get_object_or_404(Submission, id=submission_id)
+    
+    try:
+        includes_interview = submission.study_plan.includes_interview
+    except StudyPlan.DoesNotExist:
+        includes_interview = None
+    
+    return JsonResponse({
+        'status': submission.status,
+        'stages': pipeline_status(submission),
+        'study_plan': _study_plan_state(submission),
+        'study_plan_includes_interview': includes_interview,
+    })
+
 def save_interview_recording(request):
     """Save video recording from interview session with validation"""
     if request.method == 'POST':
@@ -554,11 +514,14 @@ def save_interview_recording(request):
                 return JsonResponse({'error': 'Video too short. Please record a proper interview response.'}, status=400)
             
             # Save video file
-            interview.recording.save(
-                f'interview_{submission.id}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.webm',
-                video_file,
-                save=True
-            )
+            with span('save_interview_recording', bytes=video_file.size):
+                interview.recording_bytes = video_file.size
+                interview.recording_finalized = True
+                interview.recording.save(
+                    f'interview_{submission.id}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.webm',
+                    video_file,
+                    save=True
+                )
             
             return JsonResponse({'success': True, 'message': 'Recording saved successfully'})
             
@@ -568,6 +531,97 @@ def save_interview_recording(request):
     
     return JsonResponse({'error': 'Invalid request method'}, status=400)
 
+def _session_interview(request):
+    """Interview of the submission in the student's session, or None"""
+    submission_id = request.session.get('submission_id')
+    if not submission_id:
+        return None
+    return InterviewSession.objects.filter(submission_id=submission_id).first()
+
+def upload_recording_chunk(request):
+    """
+    Append one MediaRecorder chunk to the interview recording
+    GET returns the acknowledged position so an interrupted upload can resume.
+    POST fields: seq, offset, chunk (file), duration (seconds recorded up to the end of the chunk).
+    Returns 409 with the server position if out of order.
+    """
+    interview = _session_interview(request)
+    if not interview:
+        return JsonResponse({'error': 'No interview session found. Please start interview first.'}, status=400)
+    
+    if request.method == 'GET':
+        return JsonResponse(upload_state(interview))
+    
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=400)
+    
+    chunk = request.FILES.get('chunk')
+    try:
+        seq = int(request.POST.get('seq', ''))
+        offset = int(request.POST.get('offset', ''))
+        duration = float(request.POST['duration']) if request.POST.get('duration') else None
+    except ValueError:
+        return JsonResponse({'error': 'Missing or invalid seq/offset/duration'}, status=400)
+    if duration is not None and not 0 <= duration < 24 * 3600:
+        return JsonResponse({'error': 'Invalid duration'}, status=400)
+    
+    # VALIDATION: Chunk must be video data of a sane size
+    if not chunk:
+        return JsonResponse({'error': 'Missing chunk'}, status=400)
+    if chunk.content_type and not chunk.content_type.startswith(('video/', 'application/octet-stream')):
+        return JsonResponse({'error': 'Invalid file type. Must be a video file.'}, status=400)
+    if chunk.size > MAX_CHUNK_SIZE:
+        return JsonResponse({'error': 'Chunk too large.'}, status=400)
+    
+    try:
+        interview = append_chunk(interview.id, seq, offset, chunk.read(), recorded_seconds=duration)
+        # Transcribe completed audio windows while the interview is still going
+        maybe_transcribe_window(interview)
+    except ChunkOutOfOrder as e:
+        return JsonResponse(dict(upload_state(e.interview), error=str(e)), status=409)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        print(f"[ERROR] Error saving recording chunk: {e}")
+        return JsonResponse({'error': f'Failed to save recording chunk: {str(e)}'}, status=500)
+    
+    return JsonResponse(upload_state(interview))
+
+def restart_recording_upload(request):
+    """Discard the partial recording after the interview page was reloaded (a new recording starts)"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=400)
+    
+    interview = _session_interview(request)
+    if not interview:
+        return JsonResponse({'error': 'No interview session found. Please start interview first.'}, status=400)
+    
+    try:
+        interview = restart_recording(interview.id)
+    except ValueError as e:
+        return JsonResponse(dict(upload_state(interview), error=str(e)), status=409)
+    
+    return JsonResponse(upload_state(interview))
+
+def finalize_recording_upload(request):
+    """Mark the chunked recording as complete. POST field: total_bytes"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=400)
+    
+    interview = _session_interview(request)
+    if not interview:
+        return JsonResponse({'error': 'No interview session found. Please start interview first.'}, status=400)
+    
+    total_bytes = request.POST.get('total_bytes')
+    try:
+        interview = finalize_recording(interview.id, int(total_bytes) if total_bytes else None)
+    except ChunkOutOfOrder as e:
+        return JsonResponse(dict(upload_state(e.interview), error=str(e)), status=409)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse(dict(upload_state(interview), success=True, message='Recording saved successfully'))
+
 # Teacher Views
 def teacher_login(request):
     # Skip login - redirect directly to dashboard
@@ -589,23 +643,21 @@ def teacher_dashboard(request):
             is_staff=True
         )
     
-    homeworks = Homework.objects.filter(teacher=teacher_user).order_by('-created_at')
-    
-    # Calculate stats
-    total_students = Submission.objects.filter(homework__teacher=teacher_user).values('student_name').distinct().count()
+    # One query for the homework list with per-homework counts
+    homeworks = list(
+        Homework.objects.filter(teacher=teacher_user)
+        .annotate(submission_count=models.Count('submissions'))
+        .order_by('-created_at')
+    )
     
-    all_submissions = Submission.objects.filter(homework__teacher=teacher_user, status='complete')
-    avg_score = all_submissions.aggregate(models.Avg('overall_score'))['overall_score__avg'] or 0
-    
-    total_possible = Submission.objects.filter(homework__teacher=teacher_user).count()
-    completed = all_submissions.count()
-    completion_rate = (completed / total_possible * 100) if total_possible > 0 else 0
+    # Class-wide stats, cached per teacher until a submission changes
+    summary = teacher_summary(teacher_user)
     
     context = {
         'homeworks': homeworks,
-        'total_students': total_students,
-        'avg_score': int(avg_score),
-        'completion_rate': int(completion_rate),
+        'total_students': summary['total_students'],
+        'avg_score': summary['avg_score'],
+        'completion_rate': summary['completion_rate'],
     }
     
     return render(request, 'teacher/dashboard.html', context)
@@ -725,6 +777,9 @@ def teacher_create_homework(request):
                 file_name=mark_scheme_file.name
             )
         
+        # A worker splits the question paper / mark scheme per question, so grading only reads the index
+        enqueue_mark_scheme_indexing(homework)
+        
         return redirect('teacher_homework_created', homework_id=homework.id)
     
     return render(request, 'teacher/create_homework.html')
@@ -736,52 +791,47 @@ def teacher_homework_created(request, homework_id):
 def teacher_view_results(request, homework_id):
     homework = get_object_or_404(Homework, id=homework_id)
     
-    submissions = homework.submissions.all()
-    completed_submissions = submissions.filter(status='complete')
-    
-    # Calculate stats
-    avg_score = completed_submissions.aggregate(models.Avg('overall_score'))['overall_score__avg'] or 0
-    completion_rate = (completed_submissions.count() / submissions.count() * 100) if submissions.count() > 0 else 0
-    
-    # Score distribution
-    submissions_90_100 = completed_submissions.filter(overall_score__gte=90).count()
-    submissions_80_89 = completed_submissions.filter(overall_score__gte=80, overall_score__lt=90).count()
-    submissions_70_79 = completed_submissions.filter(overall_score__gte=70, overall_score__lt=80).count()
-    submissions_60_69 = completed_submissions.filter(overall_score__gte=60, overall_score__lt=70).count()
-    submissions_below_60 = completed_submissions.filter(overall_score__lt=60).count()
-    
-    # Interview insights
-    higher_verbal = 0
-    higher_written = 0
-    consistent = 0
-    
-    for sub in completed_submissions:
-        diff = abs(sub.written_score - sub.interview_score)
-        if diff <= 5:
-            consistent += 1
-        elif sub.interview_score > sub.written_score:
-            higher_verbal += 1
-        else:
-            higher_written += 1
+    # Materialized class stats - one row, kept up to date as submissions change
+    stats = homework_stats(homework)
     
     context = {
         'homework': homework,
-        'avg_score': int(avg_score),
-        'completion_rate': int(completion_rate),
-        'submissions_90_100': submissions_90_100,
-        'submissions_80_89': submissions_80_89,
-        'submissions_70_79': submissions_70_79,
-        'submissions_60_69': submissions_60_69,
-        'submissions_below_60': submissions_below_60,
-        'higher_verbal': higher_verbal,
-        'higher_written': higher_written,
-        'consistent': consistent,
+        'submissions': homework.submissions.all(),
+        'total_submissions': stats.total_submissions,
+        'avg_score': stats.average_score,
+        'completion_rate': stats.completion_rate,
+        'submissions_90_100': stats.score_90_100,
+        'submissions_80_89': stats.score_80_89,
+        'submissions_70_79': stats.score_70_79,
+        'submissions_60_69': stats.score_60_69,
+        'submissions_below_60': stats.score_below_60,
+        'higher_verbal': stats.higher_verbal,
+        'higher_written': stats.higher_written,
+        'consistent': stats.consistent,
+        # Class-wide insights aggregated in SQL from the normalized feedback tables
+        'question_performance': question_performance(homework),
+        'recurring_improvements': recurring_points(homework, 'improvement'),
+        'interview_struggles': recurring_points(homework, 'development_area'),
+        'priority_topics': priority_topics(homework),
     }
     
     return render(request, 'teacher/view_results.html', context)
 
-def teacher_student_report(request, submission_id):
+def teacher_regrade_submission(request, submission_id):
+    """Re-run the written analysis with a fresh AI call (bypasses the response cache)"""
     submission = get_object_or_404(Submission, id=submission_id)
+    
+    if request.method == 'POST':
+        if not submission.answer_text:
+            messages.error(request, 'This submission has no answer text to regrade.')
+        else:
+            enqueue_job(submission, 'written_analysis', force_fresh=True)
+            messages.success(request, 'Regrade queued. Refresh this page in a minute to see the new feedback.')
+    
+    return redirect('teacher_student_report', submission_id=submission.id)
+
+def teacher_student_report(request, submission_id):
+    submission = get_object_or_404(feedback_graph(), id=submission_id)
     homework = submission.homework
     
     # Get question feedbacks